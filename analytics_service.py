@@ -0,0 +1,312 @@
+"""
+Analytics service for the supervisor dashboard.
+Indexes the analytics/<username>/ stores of every miner and serves them from the
+supervisor process, so the miners don't need to start their own AnalyticsServer.
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+
+from flask import Blueprint, Response, abort, jsonify, render_template, render_template_string, request, send_from_directory, url_for
+
+from program_registry import PROGRAMS_DIR
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for ?wait= on long-poll requests, and keep-alive period of the SSE streams
+MAX_LONG_POLL = 60
+SSE_KEEPALIVE = 15
+
+# Miners launched by the supervisor read this and skip their own analytics server
+DISABLE_MINER_ANALYTICS_ENV = 'TWITCH_MINER_DISABLE_ANALYTICS_SERVER'
+
+# Bundled miner copies, the shared analytics code is loaded from them
+MINERS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), PROGRAMS_DIR)
+
+
+def load_miner_module(name, programs_dir=MINERS_DIR):
+    """One of the miner's self-contained analytics modules, from the first program that ships it.
+    Importing the TwitchChannelPointsMiner package itself would start loading the whole miner."""
+    for entry in sorted(os.listdir(programs_dir)):
+        path = os.path.join(programs_dir, entry, 'TwitchChannelPointsMiner', 'classes', f'{name}.py')
+        if os.path.isfile(path):
+            spec = importlib.util.spec_from_file_location(f'miner_{name}', path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return module
+    raise ImportError(f"{name}.py не найден ни в одной программе {programs_dir}")
+
+
+# The parsing, filtering and response code is the miner's own, both dashboards answer the same way
+_store = load_miner_module('AnalyticsStore')
+_responses = load_miner_module('AnalyticsResponse')
+AnalyticsStore = _store.AnalyticsStore
+delta_datas = _store.delta_datas
+filter_datas = _store.filter_datas
+parse_cursor = _store.parse_cursor
+cached_json_response = _responses.cached_json_response
+json_array = _responses.json_array
+json_response = _responses.json_response
+
+
+class AnalyticsIndex:
+    """Index of every account's analytics store with a cache of parsed files"""
+
+    def __init__(self, program_paths, rescan_interval=10):
+        # program_paths: callable returning the directories of the supervised miners
+        self.program_paths = program_paths
+        self.rescan_interval = rescan_interval
+        self._accounts = {}
+        self._scanned_at = 0
+        self._lock = threading.Lock()
+
+    def accounts(self):
+        """Map account -> {'program': program dir, 'path': analytics dir}, rescanned every few seconds"""
+        with self._lock:
+            if time.time() - self._scanned_at < self.rescan_interval:
+                return self._accounts
+
+            accounts = {}
+            for program_path in self.program_paths():
+                analytics_root = os.path.join(os.path.abspath(program_path), 'analytics')
+                if not os.path.isdir(analytics_root):
+                    continue
+                for username in sorted(os.listdir(analytics_root)):
+                    path = os.path.join(analytics_root, username)
+                    if not os.path.isdir(path):
+                        continue
+                    account = username if username not in accounts else f"{username}@{os.path.basename(program_path)}"
+                    accounts[account] = {'program': os.path.abspath(program_path), 'path': path}
+
+            self._accounts = accounts
+            self._scanned_at = time.time()
+            return accounts
+
+    def streamers(self, account):
+        path = self.accounts()[account]['path']
+        return sorted(f[:-len('.json')] for f in os.listdir(path) if f.endswith('.json'))
+
+    def file_path(self, account, streamer):
+        streamer = streamer[:-len('.json')] if streamer.endswith('.json') else streamer
+        if os.path.basename(streamer) != streamer:
+            raise FileNotFoundError(streamer)
+        return os.path.join(self.accounts()[account]['path'], f"{streamer}.json")
+
+    def load(self, account, streamer):
+        """Parsed file (the miner's StreamerAnalytics), re-read only when its mtime or size changed"""
+        return AnalyticsStore.load(self.file_path(account, streamer))
+
+    def summary(self):
+        """Accounts with their streamers count and current points total"""
+        summary = []
+        for account, info in self.accounts().items():
+            points = 0
+            streamers = self.streamers(account)
+            for streamer in streamers:
+                try:
+                    last_point = self.load(account, streamer).last_point()
+                except (OSError, ValueError):
+                    continue
+                points += last_point['y'] if last_point else 0
+            summary.append({
+                'account': account,
+                'program': os.path.basename(info['program']),
+                'streamers': len(streamers),
+                'points': points,
+            })
+        return summary
+
+
+def create_analytics_blueprint(index):
+    """Blueprint serving every account's analytics under /analytics"""
+    bp = Blueprint('analytics', __name__, url_prefix='/analytics')
+
+    def get_account(account):
+        if account not in index.accounts():
+            abort(404)
+        return account
+
+    def file_or_404(account, streamer):
+        try:
+            fname = index.file_path(get_account(account), streamer)
+        except FileNotFoundError:
+            abort(404)
+        if not os.path.isfile(fname):
+            abort(404)
+        return fname
+
+    def load_or_404(account, streamer):
+        try:
+            return index.load(get_account(account), streamer)
+        except FileNotFoundError:
+            abort(404)
+
+    def wait_for_delta(account, streamer, since, timeout):
+        # Files are written by the miners' processes, nothing wakes us up: re-check them every couple of seconds
+        return _store.wait_for_delta(lambda: index.load(account, streamer), since, timeout, recheck=2)
+
+    @bp.route('/')
+    def analytics_index():
+        """Accounts overview page"""
+        return render_template('analytics.html', accounts=index.summary())
+
+    @bp.route('/api/accounts')
+    def accounts():
+        """Accounts with their streamers count and points total"""
+        return jsonify(index.summary())
+
+    @bp.route('/api/combined')
+    def combined():
+        """Every streamer of every account, in the date range or after ?since="""
+        since = request.args.get('since', type=parse_cursor)
+        if since is not None:
+            # One cursor for every file, only its timestamp applies: each delta carries its own cursor
+            since = (since[0], None, None)
+        start_date, end_date = request.args.get('startDate'), request.args.get('endDate')
+        pairs = [(account, streamer) for account in index.accounts() for streamer in index.streamers(account)]
+
+        def generate():
+            for account, streamer in pairs:
+                try:
+                    analytics = index.load(account, streamer)
+                except (OSError, ValueError):
+                    continue
+                if since is not None:
+                    datas = delta_datas(since, analytics)
+                    if not datas['series'] and not datas['annotations']:
+                        continue
+                else:
+                    datas = filter_datas(start_date, end_date, analytics)
+                yield {'account': account, 'name': streamer, 'data': datas}
+
+        if since is not None:
+            return json_response(json_array(generate()))
+        return cached_json_response(
+            [index.file_path(account, streamer) for account, streamer in pairs],
+            lambda: json_array(generate()),
+        )
+
+    @bp.route('/api/combined/<string:streamer>')
+    def combined_streamer(streamer):
+        """One streamer as seen by every account that watches it"""
+        start_date, end_date = request.args.get('startDate'), request.args.get('endDate')
+        accounts = [account for account in index.accounts() if os.path.isfile(index.file_path(account, streamer))]
+        if not accounts:
+            abort(404)
+
+        def generate():
+            for account in accounts:
+                try:
+                    yield {'account': account, 'data': filter_datas(start_date, end_date, index.load(account, streamer))}
+                except (OSError, ValueError):
+                    continue
+
+        return cached_json_response(
+            [index.file_path(account, streamer) for account in accounts],
+            lambda: json_array(generate()),
+        )
+
+    @bp.route('/<string:account>/')
+    def account_dashboard(account):
+        """The miner's own charts page, served for one account"""
+        assets = os.path.join(index.accounts()[get_account(account)]['program'], 'assets')
+        if not os.path.isfile(os.path.join(assets, 'charts.html')):
+            abort(404)
+        with open(os.path.join(assets, 'charts.html'), 'r', encoding='utf-8') as template:
+            source = template.read()
+
+        # charts.html links its files with url_for('static'), point them to this account's assets
+        def account_url_for(endpoint, **values):
+            if endpoint == 'static':
+                return url_for('analytics.account_assets', account=account, filename=values['filename'])
+            return url_for(endpoint, **values)
+
+        return render_template_string(
+            source,
+            url_for=account_url_for,
+            refresh=5 * 60 * 1000,
+            daysAgo=request.args.get('daysAgo', default=7, type=int),
+            logs=False,  # The miner's /log routes read its own log file, they are not served here
+        )
+
+    @bp.route('/<string:account>/assets/<path:filename>')
+    def account_assets(account, filename):
+        return send_from_directory(os.path.join(index.accounts()[get_account(account)]['program'], 'assets'), filename)
+
+    @bp.route('/<string:account>/streamers')
+    def account_streamers(account):
+        """Same payload as the miner's /streamers"""
+        datas = []
+        for streamer in index.streamers(get_account(account)):
+            try:
+                last_point = index.load(account, streamer).last_point()
+            except (OSError, ValueError):
+                last_point = None
+            datas.append({
+                'name': f"{streamer}.json",
+                'points': last_point['y'] if last_point else 0,
+                'last_activity': last_point['x'] if last_point else 0,
+            })
+        return jsonify(datas)
+
+    @bp.route('/<string:account>/json/<string:streamer>')
+    def account_json(account, streamer):
+        """Range query, or only what is newer than the ?since= cursor (long-polling up to ?wait= seconds)"""
+        since = request.args.get('since', type=parse_cursor)
+        if since is not None:
+            # Not parsed here, the miner may be rewriting the file: wait_for_delta() retries it
+            file_or_404(account, streamer)
+            wait = min(request.args.get('wait', default=0, type=int), MAX_LONG_POLL)
+            return json_response([json.dumps(wait_for_delta(account, streamer, since, wait))])
+
+        analytics = load_or_404(account, streamer)
+        start_date, end_date = request.args.get('startDate'), request.args.get('endDate')
+        return cached_json_response(
+            [index.file_path(account, streamer)],
+            lambda: [json.dumps(filter_datas(start_date, end_date, analytics))],
+        )
+
+    @bp.route('/<string:account>/json_all')
+    def account_json_all(account):
+        start_date, end_date = request.args.get('startDate'), request.args.get('endDate')
+        streamers = index.streamers(get_account(account))
+
+        def generate():
+            for streamer in streamers:
+                try:
+                    yield {'name': streamer, 'data': filter_datas(start_date, end_date, index.load(account, streamer))}
+                except (OSError, ValueError):
+                    continue
+
+        return cached_json_response(
+            [index.file_path(account, streamer) for streamer in streamers],
+            lambda: json_array(generate()),
+        )
+
+    @bp.route('/<string:account>/events/<string:streamer>')
+    def account_events(account, streamer):
+        """Server-Sent Events with the points and annotations written after the cursor"""
+        file_or_404(account, streamer)
+        since = request.headers.get('Last-Event-ID', type=parse_cursor)
+        if since is None:
+            since = request.args.get('since', default=(time.time() * 1000, None, None), type=parse_cursor)
+
+        def generate(cursor):
+            while True:
+                datas = wait_for_delta(account, streamer, cursor, SSE_KEEPALIVE)
+                if not os.path.isfile(index.file_path(account, streamer)):
+                    logger.error(f"Поток аналитики {account}/{streamer} остановлен: файл удален")
+                    return
+                if datas['series'] or datas['annotations']:
+                    cursor = datas['cursor']
+                    yield f"id: {cursor}\ndata: {json.dumps(datas)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+
+        return Response(generate(since), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+    return bp
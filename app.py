@@ -63,10 +63,16 @@ def get_program_logs(program_id):
 @app.route('/api/programs/<int:program_id>/logs/stream')
 def stream_program_logs(program_id):
     """Stream logs for a specific program using Server-Sent Events"""
+    # EventSource sends the last received id back when it reconnects
+    after_seq = request.headers.get('Last-Event-ID', type=int)
+
     def generate():
         try:
-            for log_line in program_manager.stream_program_logs(program_id):
-                yield f"data: {log_line}\n\n"
+            for entry in program_manager.stream_program_logs(program_id, after_seq):
+                if entry is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"id: {entry.seq}\ndata: {entry.line}\n\n"
         except Exception as e:
             app.logger.error(f"Error streaming logs for program {program_id}: {str(e)}")
             yield f"data: Error: {str(e)}\n\n"
@@ -0,0 +1,331 @@
+"""
+Fork server: a process that imports the miners' heavy dependencies once and forks a ready
+interpreter for every program start, instead of a cold `python run.py`.
+
+The supervisor talks to it over a SOCK_SEQPACKET Unix socket, one connection per start:
+the request is {"script", "cwd", "env", "pass_fds"} with the child's stdout and inherited
+pipes attached as SCM_RIGHTS; the answers are {"pid": ...}, then {"returncode": ...} when
+the program ends. The programs import their own TwitchChannelPointsMiner copy, only the
+shared third-party packages are preloaded.
+"""
+
+import importlib
+import json
+import logging
+import os
+import runpy
+import select
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+
+FORK_SERVER_ENV = 'FORK_SERVER'
+PRELOAD_ENV = 'FORK_SERVER_PRELOAD'
+# Imported by every miner (see programs/*/requirements.txt), pandas only by the analytics
+DEFAULT_PRELOAD = (
+    'requests', 'dateutil.parser', 'irc.bot', 'websocket', 'emoji', 'colorama',
+    'pytz', 'validators', 'millify', 'flask', 'pandas'
+)
+# Received fds are moved above this number before being placed where the child expects them
+FD_STAGING = 200
+MAX_MESSAGE = 1 << 20
+# Seconds the preloading may take before the supervisor gives up and starts programs with plain Popen
+STARTUP_TIMEOUT = 60
+
+
+class ForkServerError(RuntimeError):
+    """The fork server can't start a program, the caller falls back to subprocess"""
+
+
+def preload(modules):
+    """Import what can be imported, returns the modules that failed"""
+    failed = []
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception:
+            failed.append(module)
+    return failed
+
+
+def _run_child(request, fds):
+    """In the forked child: set up stdio, cwd, environment and run the script; never returns"""
+    try:
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+        stdout_fd, inherited = fds[0], fds[1:]
+        staged = [os.dup2(fd, FD_STAGING + index) for index, fd in enumerate(inherited)]
+        null_fd = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(null_fd, 0)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stdout_fd, 2)
+        for fd, target in zip(staged, request['pass_fds']):
+            os.dup2(fd, target)  # dup2 clears close-on-exec, the miner may spawn helpers
+        keep = {0, 1, 2, *request['pass_fds']}
+        for fd in [null_fd, *fds, *staged]:
+            if fd not in keep:
+                os.close(fd)
+
+        os.chdir(request['cwd'])
+        os.environ.clear()
+        os.environ.update(request['env'])
+        script = os.path.abspath(request['script'])
+        sys.argv = [script]
+        sys.path[0] = os.path.dirname(script)
+        code = 0
+        try:
+            runpy.run_path(script, run_name='__main__')
+        except SystemExit as e:
+            if e.code is None or isinstance(e.code, int):
+                code = e.code or 0
+            else:
+                print(e.code, file=sys.stderr)
+                code = 1
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+
+def serve(socket_path, modules):
+    """Fork server main loop, single-threaded so that forking is safe; ends when stdin closes"""
+    failed = preload(modules)
+    if failed:
+        print(f"fork server: not preloaded: {', '.join(failed)}", file=sys.stderr, flush=True)
+
+    # Bound under a temporary name: the socket path only appears once it accepts connections
+    temp_path = f"{socket_path}.tmp"
+    for path in (socket_path, temp_path):
+        if os.path.exists(path):
+            os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    listener.bind(temp_path)
+    os.chmod(temp_path, 0o600)
+    listener.listen(16)
+    os.rename(temp_path, socket_path)
+    children = {}  # pid -> connection waiting for the exit status
+
+    try:
+        while True:
+            readable, _, _ = select.select([listener, sys.stdin], [], [], 0.5)
+            if sys.stdin in readable and not os.read(sys.stdin.fileno(), 1):
+                break  # The supervisor is gone
+
+            if listener in readable:
+                connection, _ = listener.accept()
+                try:
+                    data, fds, _, _ = socket.recv_fds(connection, MAX_MESSAGE, 16)
+                    request = json.loads(data)
+                    pid = os.fork()
+                    if pid == 0:
+                        listener.close()
+                        connection.close()
+                        for other in children.values():
+                            other.close()
+                        _run_child(request, fds)
+                    for fd in fds:
+                        os.close(fd)
+                    connection.sendall(json.dumps({'pid': pid}).encode())
+                    children[pid] = connection
+                except Exception as e:
+                    try:
+                        connection.sendall(json.dumps({'error': str(e)}).encode())
+                    except OSError:
+                        pass
+                    connection.close()
+
+            # Reap the programs that ended and tell their supervisor connection
+            while children:
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    break
+                if pid == 0:
+                    break
+                connection = children.pop(pid, None)
+                if connection is not None:
+                    try:
+                        connection.sendall(json.dumps({
+                            'returncode': os.waitstatus_to_exitcode(status)
+                        }).encode())
+                    except OSError:
+                        pass
+                    connection.close()
+    finally:
+        listener.close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+
+class ForkedProcess:
+    """subprocess.Popen look-alike for a program forked by the fork server"""
+
+    def __init__(self, pid, connection, stdout):
+        self.pid = pid
+        self.stdout = stdout
+        self.returncode = None
+        self._connection = connection
+        self._lock = threading.Lock()
+
+    def _read_status(self, timeout):
+        with self._lock:
+            if self.returncode is not None:
+                return
+            connection = self._connection
+            if connection is None:
+                # The fork server died and the exit status with it, only tell whether it still runs
+                if not self._alive():
+                    self.returncode = 1
+                return
+        # Waited for without the lock: poll() from the status and monitor threads never queues behind a wait()
+        try:
+            readable, _, _ = select.select([connection], [], [], timeout)
+        except (OSError, ValueError):
+            return  # Closed by another thread that read the status meanwhile
+        if not readable:
+            return
+        with self._lock:
+            if self._connection is not connection:
+                return
+            data = self._connection.recv(MAX_MESSAGE)
+            self._connection.close()
+            self._connection = None
+            if data:
+                self.returncode = json.loads(data)['returncode']
+
+    def _alive(self):
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def poll(self):
+        self._read_status(0)
+        return self.returncode
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._read_status(0)
+            if self.returncode is not None:
+                return self.returncode
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise subprocess.TimeoutExpired(str(self.pid), timeout)
+            # Short slices, so that poll() from another thread is never blocked for long
+            step = 0.5 if remaining is None else min(remaining, 0.5)
+            if self._connection is None:
+                time.sleep(step)
+            else:
+                self._read_status(step)
+
+    def send_signal(self, signum):
+        if self.poll() is None:
+            try:
+                os.kill(self.pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class ForkServer:
+    """Supervisor side: starts the fork server on first use and asks it for programs"""
+
+    def __init__(self, modules=DEFAULT_PRELOAD, startup_timeout=STARTUP_TIMEOUT):
+        self.modules = modules
+        self.startup_timeout = startup_timeout
+        self.logger = logging.getLogger(f"{__name__}.ForkServer")
+        self.socket_path = os.path.join(tempfile.gettempdir(), f"fork-server-{os.getpid()}.sock")
+        self.process = None
+        # Set when the fork server didn't come up in time, the programs are started without it from then on
+        self.disabled = False
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self.disabled:
+                raise ForkServerError("fork-сервер отключен после неудачного запуска")
+            if self.process is not None and self.process.poll() is None:
+                return
+            started = time.monotonic()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)  # Left by a fork server that died
+            self.process = subprocess.Popen(
+                [sys.executable, os.path.abspath(__file__), self.socket_path, ','.join(self.modules)],
+                stdin=subprocess.PIPE,
+                start_new_session=True  # Ctrl+C in the supervisor's terminal must not reach it
+            )
+            # The socket appears once the imports are done
+            while not os.path.exists(self.socket_path):
+                if self.process.poll() is not None:
+                    self.disabled = True
+                    raise ForkServerError(f"fork-сервер завершился с кодом {self.process.returncode}")
+                if time.monotonic() - started > self.startup_timeout:
+                    # Hung while preloading: every start would wait behind it
+                    self.disabled = True
+                    self.process.kill()
+                    self.process.wait()
+                    raise ForkServerError(f"fork-сервер не запустился за {self.startup_timeout} с")
+                time.sleep(0.05)
+            self.logger.info(f"Fork-сервер запущен за {time.monotonic() - started:.1f} с (PID: {self.process.pid})")
+
+    def spawn(self, script, cwd, env, pass_fds=()):
+        """Start `script` like Popen(stdout=PIPE, stderr=STDOUT, pass_fds=...), returns a ForkedProcess;
+        raises ForkServerError when the fork server can't do it"""
+        self._ensure_started()
+        read_fd, write_fd = os.pipe()
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            request = {'script': script, 'cwd': cwd, 'env': env, 'pass_fds': list(pass_fds)}
+            try:
+                connection.connect(self.socket_path)
+                socket.send_fds(connection, [json.dumps(request).encode()], [write_fd, *pass_fds])
+            except OSError as e:
+                raise ForkServerError(f"fork-сервер недоступен: {str(e)}")  # Nothing was started
+            answer = json.loads(connection.recv(MAX_MESSAGE) or b'{"error": "no answer"}')
+            if 'error' in answer:
+                raise ForkServerError(f"fork-сервер: {answer['error']}")
+        except BaseException:
+            connection.close()
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        return ForkedProcess(answer['pid'], connection, os.fdopen(read_fd, 'rb'))
+
+    def close(self):
+        with self._lock:
+            if self.process is not None and self.process.poll() is None:
+                self.process.stdin.close()
+                try:
+                    self.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1], [module for module in sys.argv[2].split(',') if module])
@@ -0,0 +1,115 @@
+"""
+In-memory log storage for the supervised programs.
+Every line gets a sequence number so clients can ask for "everything after N".
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+LogEntry = namedtuple('LogEntry', ['seq', 'timestamp', 'line'])
+
+
+class LogBuffer:
+    """Fixed-size ring buffer of (seq, timestamp, line) entries with cursor reads"""
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._ring = [None] * capacity
+        self._first_seq = 1  # oldest entry still in the ring
+        self._next_seq = 1   # seq of the next appended entry
+        # Subscribers sleep on the condition until a producer appends something
+        self._lock = threading.Condition()
+
+    def __len__(self):
+        with self._lock:
+            return self._next_seq - self._first_seq
+
+    @property
+    def last_seq(self):
+        """Sequence number of the newest entry, 0 when nothing was ever appended"""
+        with self._lock:
+            return self._next_seq - 1
+
+    def append(self, line, timestamp=None):
+        """Add one line, returns its sequence number"""
+        return self.extend([line], timestamp)
+
+    def extend(self, lines, timestamp=None):
+        """Add a batch of lines under a single lock, returns the last sequence number"""
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            for line in lines:
+                seq = self._next_seq
+                self._ring[seq % self.capacity] = LogEntry(seq, timestamp, line)
+                self._next_seq = seq + 1
+            self._first_seq = max(self._first_seq, self._next_seq - self.capacity)
+            self._lock.notify_all()
+            return self._next_seq - 1
+
+    def after(self, after_seq=0, limit=None):
+        """Entries with seq > after_seq, oldest first; O(returned entries)"""
+        with self._lock:
+            start = max(after_seq + 1, self._first_seq)
+            end = self._next_seq if limit is None else min(self._next_seq, start + limit)
+            return [self._ring[seq % self.capacity] for seq in range(start, end)]
+
+    def wait(self, after_seq, timeout=None):
+        """Block until an entry newer than after_seq exists, False on timeout"""
+        with self._lock:
+            return self._lock.wait_for(lambda: self._next_seq - 1 > after_seq, timeout)
+
+    def subscribe(self, after_seq=None, backlog=50, max_backlog=None):
+        """Cursor for a streaming client, starting with the last `backlog` lines unless after_seq is given"""
+        last_seq = self.last_seq
+        if after_seq is None or after_seq > last_seq:
+            # A cursor ahead of the buffer was handed out before a restart (sequences start over):
+            # the client starts again like a new one
+            after_seq = max(last_seq - backlog, 0)
+        return LogSubscription(self, after_seq, max_backlog or self.capacity)
+
+    def tail(self, count):
+        """The newest `count` entries, oldest first"""
+        with self._lock:
+            start = max(self._next_seq - count, self._first_seq)
+            return [self._ring[seq % self.capacity] for seq in range(start, self._next_seq)]
+
+    def lines(self):
+        """Every line still in the buffer"""
+        return [entry.line for entry in self.after(0)]
+
+    def clear(self):
+        """Drop every entry, sequence numbers keep growing so cursors stay valid"""
+        with self._lock:
+            self._first_seq = self._next_seq
+
+
+class LogSubscription:
+    """One subscriber of a LogBuffer: a sequence cursor with a bounded backlog"""
+
+    def __init__(self, buffer, after_seq, max_backlog):
+        self.buffer = buffer
+        self.cursor = after_seq
+        self.max_backlog = max_backlog
+
+    def poll(self, timeout=None):
+        """Wait for new entries, returns (entries, missed) where missed counts lines that were dropped"""
+        if not self.buffer.wait(self.cursor, timeout):
+            return [], 0
+
+        last_seq = self.buffer.last_seq
+        missed = 0
+        if last_seq - self.cursor > self.max_backlog:
+            # Too slow a reader: skip ahead instead of holding back the producers
+            missed = last_seq - self.max_backlog - self.cursor
+            self.cursor = last_seq - self.max_backlog
+
+        entries = self.buffer.after(self.cursor)
+        if entries:
+            # Lines that fell out of the ring while we were waiting are lost too
+            missed += entries[0].seq - self.cursor - 1
+            self.cursor = entries[-1].seq
+        else:
+            # The buffer was cleared under us
+            self.cursor = last_seq
+        return entries, missed
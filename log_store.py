@@ -0,0 +1,390 @@
+"""
+Searchable on-disk history of the programs' output.
+Every program writes fixed-size segments; a closed segment gets a sidecar index with a trigram
+bloom filter and the sets of levels, functions, events and streamers it contains, so a query
+only reads the segments that can match.
+Lines are written by a background thread, appending never waits for the disk.
+"""
+
+import base64
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import zlib
+
+# Set by the supervisor so the miner tags event lines with the event name
+LOG_EVENTS_ENV = 'TWITCH_MINER_LOG_EVENTS'
+
+# Lines per segment file
+SEGMENT_LINES = 10000
+# Bloom filter of the trigrams of a segment: 2^18 bits (32 KB), two hash functions
+BLOOM_BITS = 1 << 18
+# Oldest segments beyond this are deleted
+MAX_SEGMENTS = 500
+# Batches waiting for the writer thread, beyond this the history loses lines rather than slowing down the output
+WRITE_QUEUE_SIZE = 10000
+
+# Miner console line: "19/10/26 03:50:05 - INFO - [on_message]: [GAIN_FOR_WATCH] message",
+# prefixed by the supervisor with "[2026-10-19 03:50:05] "
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+MINER_LINE = re.compile(
+    r'^(?:\[[^\]]+\] )?\S+ \S+ - (?P<level>[A-Z]+) - \[(?P<logger>[^\]]+)\]: '
+    r'(?:\[(?P<event>[A-Z_]+)\] )?(?P<message>.*)$'
+)
+STREAMER_NAME = re.compile(r'Streamer\(username=([A-Za-z0-9_]+)')
+
+
+def parse_line(line):
+    """Fields of a log line: level, logger (the miner's function name), event, streamers"""
+    match = MINER_LINE.match(line)
+    if match is None:
+        return None, None, None, []
+    return match.group('level'), match.group('logger'), match.group('event'), \
+        STREAMER_NAME.findall(match.group('message'))
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _bloom_positions(trigram):
+    data = trigram.encode('utf-8')
+    first = zlib.crc32(data)
+    return first % BLOOM_BITS, zlib.crc32(data, first) % BLOOM_BITS
+
+
+class SegmentIndex:
+    """What a segment contains, enough to skip it for most queries"""
+
+    def __init__(self, first_seq):
+        self.first_seq = first_seq
+        self.last_seq = first_seq - 1
+        self.first_ts = None
+        self.last_ts = None
+        self.bloom = bytearray(BLOOM_BITS // 8)
+        self.levels = set()
+        self.loggers = set()
+        self.events = set()
+        self.streamers = set()
+
+    def __len__(self):
+        return self.last_seq - self.first_seq + 1
+
+    def add(self, seq, timestamp, line):
+        self.last_seq = seq
+        if self.first_ts is None:
+            self.first_ts = timestamp
+        self.last_ts = timestamp
+        for trigram in trigrams(line.lower()):
+            for position in _bloom_positions(trigram):
+                self.bloom[position >> 3] |= 1 << (position & 7)
+        level, logger, event, streamers = parse_line(line)
+        if level is not None:
+            self.levels.add(level)
+            self.loggers.add(logger)
+        if event is not None:
+            self.events.add(event)
+        self.streamers.update(name.lower() for name in streamers)
+
+    def may_contain(self, query):
+        if query.level and query.level not in self.levels:
+            return False
+        if query.logger and query.logger not in self.loggers:
+            return False
+        if query.event and query.event not in self.events:
+            return False
+        if query.streamer and query.streamer not in self.streamers:
+            return False
+        for trigram in query.trigrams:
+            for position in _bloom_positions(trigram):
+                if not self.bloom[position >> 3] & (1 << (position & 7)):
+                    return False
+        return True
+
+    def to_dict(self):
+        return {
+            'first_seq': self.first_seq,
+            'last_seq': self.last_seq,
+            'first_ts': self.first_ts,
+            'last_ts': self.last_ts,
+            'bloom': base64.b64encode(bytes(self.bloom)).decode('ascii'),
+            'levels': sorted(self.levels),
+            'loggers': sorted(self.loggers),
+            'events': sorted(self.events),
+            'streamers': sorted(self.streamers)
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data['first_seq'])
+        index.last_seq = data['last_seq']
+        index.first_ts = data['first_ts']
+        index.last_ts = data['last_ts']
+        index.bloom = bytearray(base64.b64decode(data['bloom']))
+        index.levels = set(data['levels'])
+        index.loggers = set(data['loggers'])
+        index.events = set(data['events'])
+        index.streamers = set(data['streamers'])
+        return index
+
+
+class LogQuery:
+    """Search criteria, every given field must match"""
+
+    def __init__(self, text=None, level=None, logger=None, event=None, streamer=None):
+        self.text = (text or '').lower()
+        self.level = (level or '').upper() or None
+        self.logger = logger or None
+        self.event = (event or '').upper() or None
+        self.streamer = (streamer or '').lower() or None
+        self.trigrams = trigrams(self.text)
+        # Substrings every matching line contains, checked before parsing the line;
+        # usually the rarest first, the first one is searched in the raw segment bytes
+        self.needles = [needle for needle in (
+            self.text,
+            self.streamer and f"username={self.streamer}",
+            self.event and f"[{self.event.lower()}] ",
+            self.logger and f"[{self.logger.lower()}]: ",
+            self.level and f" - {self.level.lower()} - "
+        ) if needle]
+        self.needle = self.needles[0] if self.needles else None
+
+    def matches(self, line):
+        lowered = line.lower()
+        if not all(needle in lowered for needle in self.needles):
+            return False
+        if not (self.level or self.logger or self.event or self.streamer):
+            return True
+        level, logger, event, streamers = parse_line(line)
+        if self.level and level != self.level:
+            return False
+        if self.logger and logger != self.logger:
+            return False
+        if self.event and event != self.event:
+            return False
+        if self.streamer and self.streamer not in (name.lower() for name in streamers):
+            return False
+        return True
+
+
+class ProgramLog:
+    """Segments of one program: closed ones with a sidecar index, plus the one being written"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.closed = []  # SegmentIndex of the closed segments, oldest first
+        self.active = None
+        self._file = None
+        self._load()
+
+    def _path(self, first_seq, suffix='log'):
+        return os.path.join(self.directory, f"segment-{first_seq:012d}.{suffix}")
+
+    def _load(self):
+        segments = sorted(name for name in os.listdir(self.directory) if name.endswith('.log'))
+        for name in segments:
+            first_seq = int(name[len('segment-'):-len('.log')])
+            try:
+                with open(self._path(first_seq, 'idx'), 'r', encoding='utf-8') as file:
+                    self.closed.append(SegmentIndex.from_dict(json.load(file)))
+                continue
+            except (OSError, ValueError, KeyError):
+                pass
+            # No sidecar: the segment being written when the supervisor stopped
+            index = SegmentIndex(first_seq)
+            for seq, timestamp, line in self._read(first_seq):
+                index.add(seq, timestamp, line)
+            if name == segments[-1] and len(index) < SEGMENT_LINES:
+                self.active = index
+            else:
+                self._write_index(index)
+                self.closed.append(index)
+
+        if self.active is None:
+            last_seq = self.closed[-1].last_seq if self.closed else 0
+            self.active = SegmentIndex(last_seq + 1)
+        self._file = open(self._path(self.active.first_seq), 'a', encoding='utf-8')
+
+    def _write_index(self, index):
+        temp_path = self._path(index.first_seq, 'idx.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(index.to_dict(), file)
+        os.replace(temp_path, self._path(index.first_seq, 'idx'))
+
+    def _read(self, first_seq, size=None, needle=None):
+        """(seq, timestamp, line) records of a segment, oldest first; only lines containing `needle` if given"""
+        with open(self._path(first_seq), 'rb') as file:
+            data = file.read() if size is None else file.read(size)
+        if needle is not None and needle.isascii():
+            lines = self._lines_containing(data, needle.encode('ascii'))
+        else:
+            # bytes.lower() only folds ASCII, other needles are checked line by line
+            lines = data.decode('utf-8', errors='replace').split('\n')
+        records = []
+        for record in lines:
+            parts = record.split('\t', 2)
+            if len(parts) == 3:
+                records.append((int(parts[0]), float(parts[1]), parts[2]))
+        return records
+
+    @staticmethod
+    def _lines_containing(data, needle):
+        # Case-insensitive bytes search, only the matching lines are decoded
+        haystack = data.lower()
+        lines = []
+        position = haystack.find(needle)
+        while position != -1:
+            start = haystack.rfind(b'\n', 0, position) + 1
+            end = haystack.find(b'\n', position)
+            if end == -1:
+                end = len(haystack)
+            lines.append(data[start:end].decode('utf-8', errors='replace'))
+            position = haystack.find(needle, end)
+        return lines
+
+    def append(self, timestamp, lines):
+        with self._lock:
+            for line in lines:
+                line = ANSI_ESCAPE.sub('', line).replace('\n', ' ')
+                seq = self.active.last_seq + 1
+                self._file.write(f"{seq}\t{timestamp:.3f}\t{line}\n")
+                self.active.add(seq, timestamp, line)
+                if len(self.active) >= SEGMENT_LINES:
+                    self._rotate()
+            self._file.flush()
+
+    def _rotate(self):
+        self._file.close()
+        self._write_index(self.active)
+        self.closed.append(self.active)
+        self.active = SegmentIndex(self.active.last_seq + 1)
+        self._file = open(self._path(self.active.first_seq), 'a', encoding='utf-8')
+        while len(self.closed) > MAX_SEGMENTS:
+            oldest = self.closed.pop(0)
+            for suffix in ('log', 'idx'):
+                try:
+                    os.remove(self._path(oldest.first_seq, suffix))
+                except OSError:
+                    pass
+
+    def search(self, query, before=None, limit=100):
+        """Newest matching records with seq < before, returns (records, next cursor or None, segments read)"""
+        with self._lock:
+            # The active segment is only read up to what is flushed now
+            segments = [(index, None) for index in self.closed]
+            segments.append((self.active, self._file.tell()))
+
+        results = []
+        scanned = 0
+        for index, size in reversed(segments):
+            if before is not None and index.first_seq >= before:
+                continue
+            if len(index) == 0 or not index.may_contain(query):
+                continue
+            scanned += 1
+            try:
+                records = self._read(index.first_seq, size, query.needle)
+            except OSError:
+                continue  # Deleted by the retention meanwhile
+            for seq, timestamp, line in reversed(records):
+                if before is not None and seq >= before:
+                    continue
+                if query.matches(line):
+                    results.append({'seq': seq, 'timestamp': timestamp, 'line': line})
+                    if len(results) > limit:
+                        results.pop()
+                        return results, results[-1]['seq'], scanned
+        return results, None, scanned
+
+    def facets(self):
+        """Every level, function, event and streamer seen, to fill the search form"""
+        with self._lock:
+            indexes = self.closed + [self.active]
+            return {
+                'levels': sorted(set().union(*(index.levels for index in indexes))),
+                'loggers': sorted(set().union(*(index.loggers for index in indexes))),
+                'events': sorted(set().union(*(index.events for index in indexes))),
+                'streamers': sorted(set().union(*(index.streamers for index in indexes)))
+            }
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class LogStore:
+    """One ProgramLog per program under a common directory"""
+
+    def __init__(self, root='log_store'):
+        self.root = root
+        self.logger = logging.getLogger(f"{__name__}.LogStore")
+        self._programs = {}
+        self._lock = threading.Lock()
+        # Appends come from the output pump: segment writes and indexing happen in the writer thread
+        self._queue = queue.Queue(WRITE_QUEUE_SIZE)
+        self._dropped = 0
+        self._writer = threading.Thread(target=self._write, name='Log store writer', daemon=True)
+        self._writer.start()
+
+    def program(self, program_id):
+        program_log = self._programs.get(program_id)
+        if program_log is None:
+            with self._lock:
+                program_log = self._programs.get(program_id)
+                if program_log is None:
+                    program_log = ProgramLog(os.path.join(self.root, str(program_id)))
+                    self._programs[program_id] = program_log
+        return program_log
+
+    def append(self, program_id, timestamp, lines):
+        """Queue lines for the writer thread, never blocks"""
+        try:
+            self._queue.put_nowait((program_id, timestamp, lines))
+        except queue.Full:
+            with self._lock:
+                self._dropped += len(lines)
+
+    def _write(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+                program_id, timestamp, lines = batch
+                self.program(program_id).append(timestamp, lines)
+            except Exception as e:
+                self.logger.error(f"Ошибка записи истории логов программы {program_id}: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+            if self._dropped:
+                with self._lock:
+                    dropped, self._dropped = self._dropped, 0
+                self.logger.warning(f"В историю логов не попало {dropped} строк: запись не успевает за выводом")
+
+    def flush(self):
+        """Wait until every queued line is written"""
+        self._queue.join()
+
+    def close(self, timeout=None):
+        """Write what is queued, stop the writer thread and close the segments"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+        with self._lock:
+            for program_log in self._programs.values():
+                program_log.close()
+
+    def search(self, program_id, text=None, level=None, logger=None, event=None, streamer=None,
+               before=None, limit=100):
+        query = LogQuery(text, level, logger, event, streamer)
+        results, next_cursor, scanned = self.program(program_id).search(query, before, limit)
+        return {'results': results, 'next': next_cursor, 'segments_scanned': scanned}
+
+    def facets(self, program_id):
+        return self.program(program_id).facets()
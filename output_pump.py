@@ -0,0 +1,112 @@
+"""
+Single I/O thread reading the output of every supervised program.
+Pipes are watched with selectors, so this needs a POSIX system.
+"""
+
+import logging
+import os
+import selectors
+import threading
+
+# Bytes read from a pipe per wakeup
+READ_SIZE = 64 * 1024
+
+
+class OutputPump:
+    """Reads the stdout of every child in one thread and hands out complete lines in batches"""
+
+    def __init__(self, on_lines, on_eof):
+        # on_lines(owner, lines) gets every batch of decoded lines,
+        # on_eof(owner) is called once the child closed its end of the pipe
+        self.on_lines = on_lines
+        self.on_eof = on_eof
+        self.logger = logging.getLogger(f"{__name__}.OutputPump")
+        self.selector = selectors.DefaultSelector()
+        self._pending = []
+        self._lock = threading.Lock()
+
+        # Self-pipe used to wake the selector when a stream is added
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_r, False)
+        os.set_blocking(self._wakeup_w, False)
+        self.selector.register(self._wakeup_r, selectors.EVENT_READ, None)
+
+        self.thread = threading.Thread(target=self._run, name='Output pump', daemon=True)
+        self.thread.start()
+
+    def add(self, owner, stream, on_lines=None, on_eof=None, flush_partial=True):
+        """Start pumping a binary pipe, `owner` is passed back to the callbacks; a pipe may have its own callbacks.
+        An unterminated last line is handed out at EOF unless flush_partial is False (a pipe of records)"""
+        os.set_blocking(stream.fileno(), False)
+        with self._lock:
+            self._pending.append((owner, stream, on_lines or self.on_lines, on_eof or self.on_eof, flush_partial))
+        try:
+            os.write(self._wakeup_w, b'\0')
+        except BlockingIOError:
+            pass  # Already woken up
+
+    def _register_pending(self):
+        try:
+            while os.read(self._wakeup_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for owner, stream, on_lines, on_eof, flush_partial in pending:
+            self.selector.register(stream, selectors.EVENT_READ, {
+                'owner': owner, 'partial': b'', 'on_lines': on_lines, 'on_eof': on_eof, 'flush_partial': flush_partial
+            })
+
+    def _run(self):
+        while True:
+            for key, _ in self.selector.select():
+                if key.data is None:
+                    self._register_pending()
+                    continue
+                # Never raises: this thread is the only reader of every program's output
+                self._read(key)
+
+    def _read(self, key):
+        try:
+            data = os.read(key.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            self.logger.error(f"Ошибка чтения вывода программы {key.data['owner']}: {str(e)}")
+            data = b''
+
+        if not data:
+            # EOF (or a broken pipe): flush an unterminated last line
+            if key.data['partial'] and key.data['flush_partial']:
+                self._emit(key, [key.data['partial']])
+            self._close(key)
+            return
+
+        lines = (key.data['partial'] + data).split(b'\n')
+        key.data['partial'] = lines.pop()
+        if lines:
+            self._emit(key, lines)
+
+    def _emit(self, key, lines):
+        # Decode the whole batch at once
+        text = b'\n'.join(lines).decode('utf-8', errors='replace')
+        try:
+            key.data['on_lines'](key.data['owner'], [line.strip() for line in text.split('\n')])
+        except Exception as e:
+            # The program is still running, keep reading its pipe
+            self.logger.error(f"Ошибка обработки вывода программы {key.data['owner']}: {str(e)}")
+
+    def _close(self, key):
+        try:
+            self.selector.unregister(key.fileobj)
+        except (KeyError, ValueError):
+            return  # Closed already, on_eof was called then
+        try:
+            key.fileobj.close()
+        except OSError:
+            pass
+        try:
+            key.data['on_eof'](key.data['owner'])
+        except Exception as e:
+            self.logger.error(f"Ошибка завершения вывода программы {key.data['owner']}: {str(e)}")
@@ -4,45 +4,25 @@ import threading
 import time
 import logging
 from datetime import datetime
-from collections import deque
 import signal
 import psutil
 
+from log_buffer import LogBuffer
+from program_registry import ProgramRegistry
+
 class ProgramManager:
     def __init__(self):
+        # Same program list as run.py: programs.json, created from programs.example.json on the first run
         self.programs = {
-            1: {
-                'name': 'Program 1',
-                'path': 'programs/program1',
-                'script': 'main.py',
-                'process': None,
-                'logs': deque(maxlen=1000),  # Keep last 1000 log lines
-                'status': 'stopped'
-            },
-            2: {
-                'name': 'Program 2', 
-                'path': 'programs/program2',
-                'script': 'main.py',
-                'process': None,
-                'logs': deque(maxlen=1000),
-                'status': 'stopped'
-            },
-            3: {
-                'name': 'Program 3',
-                'path': 'programs/program3', 
-                'script': 'main.py',
-                'process': None,
-                'logs': deque(maxlen=1000),
-                'status': 'stopped'
-            },
-            4: {
-                'name': 'Program 4',
-                'path': 'programs/program4',
-                'script': 'main.py', 
+            program_id: {
+                'name': config['name'],
+                'path': config['path'],
+                'script': config['script'],
                 'process': None,
-                'logs': deque(maxlen=1000),
+                'logs': LogBuffer(1000),  # Keep last 1000 log lines
                 'status': 'stopped'
             }
+            for program_id, config in ProgramRegistry().load().items()
         }
         self.logger = logging.getLogger(__name__)
         
@@ -157,32 +137,24 @@ class ProgramManager:
         """Get logs for a specific program"""
         if program_id not in self.programs:
             return []
-        return list(self.programs[program_id]['logs'])
+        return self.programs[program_id]['logs'].lines()
 
-    def stream_program_logs(self, program_id):
-        """Generator that yields new log lines for a program"""
+    def stream_program_logs(self, program_id, after_seq=None, keepalive=15):
+        """Generator that yields new log entries for a program, None every `keepalive` idle seconds"""
         if program_id not in self.programs:
             return
-            
-        # Yield existing logs first
-        existing_logs = list(self.programs[program_id]['logs'])
-        for log in existing_logs[-50:]:  # Send last 50 logs
-            yield log
-        
-        # Monitor for new logs
-        last_count = len(self.programs[program_id]['logs'])
+
+        # Start with the last 50 logs unless the client resumes from its cursor,
+        # then sleep until the output monitor appends something
+        subscription = self.programs[program_id]['logs'].subscribe(after_seq, backlog=50)
         while True:
-            current_logs = self.programs[program_id]['logs']
-            current_count = len(current_logs)
-            
-            if current_count > last_count:
-                # Yield new logs
-                new_logs = list(current_logs)[last_count:]
-                for log in new_logs:
-                    yield log
-                last_count = current_count
-            
-            time.sleep(0.5)  # Poll every 500ms
+            entries, missed = subscription.poll(timeout=keepalive)
+            if missed:
+                self.logger.warning(f"Log stream of program {program_id} skipped {missed} lines")
+            if not entries:
+                yield None
+            for entry in entries:
+                yield entry
 
     def clear_program_logs(self, program_id):
         """Clear logs for a specific program"""
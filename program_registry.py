@@ -0,0 +1,153 @@
+"""
+List of the supervised programs.
+Programs are read from programs.json. The first run creates it from programs.example.json, or from
+every programs/* directory with a run script when there is no example, so that names and ids stay fixed.
+Every program lives under programs/, the API can't point anywhere else.
+"""
+
+import json
+import logging
+import os
+import threading
+
+CONFIG_FILE = 'programs.json'
+EXAMPLE_FILE = 'programs.example.json'
+PROGRAMS_DIR = 'programs'
+DEFAULT_SCRIPT = 'run.py'
+
+
+class RegistryError(ValueError):
+    """Invalid program configuration"""
+
+
+def inside_dir(root, path):
+    """True when `path` resolves (symlinks included) to something below `root`"""
+    root = os.path.realpath(root)
+    path = os.path.realpath(path)
+    return path != root and os.path.commonpath([root, path]) == root
+
+
+def scan_programs(programs_dir=PROGRAMS_DIR, script=DEFAULT_SCRIPT):
+    """One config per programs/<name>/ directory that has a run script"""
+    configs = []
+    if not os.path.isdir(programs_dir):
+        return configs
+    for entry in sorted(os.scandir(programs_dir), key=lambda entry: entry.name):
+        if entry.is_dir() and inside_dir(programs_dir, os.path.join(entry.path, script)) and \
+                os.path.exists(os.path.join(entry.path, script)):
+            configs.append({
+                'id': len(configs) + 1,
+                'name': entry.name,
+                'path': os.path.join(programs_dir, entry.name),
+                'script': script
+            })
+    return configs
+
+
+class ProgramRegistry:
+    """Program configs backed by a JSON file, rewritten atomically on every change"""
+
+    def __init__(self, config_path=CONFIG_FILE, programs_dir=PROGRAMS_DIR, example_path=None):
+        self.config_path = config_path
+        self.programs_dir = programs_dir
+        # Default programs of a fresh checkout, next to the config file
+        self.example_path = example_path or os.path.join(os.path.dirname(config_path), EXAMPLE_FILE)
+        self.logger = logging.getLogger(f"{__name__}.ProgramRegistry")
+        self._lock = threading.Lock()
+        self._configs = {}
+        # Ids are never reused (next_id is saved with the programs), log cursors and histories are keyed by id
+        self._next_id = 1
+
+    def load(self):
+        """Read the config file, creating it on the first run; returns the configs by id"""
+        with self._lock:
+            created = not os.path.exists(self.config_path)
+            if not created:
+                data = self._read(self.config_path)
+            elif os.path.exists(self.example_path):
+                data = self._read(self.example_path)
+            else:
+                data = {'programs': scan_programs(self.programs_dir)}
+            configs = data.get('programs', [])
+            next_id = int(data.get('next_id', 1))
+            configs = [self.validate(config, check_files=False) for config in configs]
+            self._configs = {config['id']: config for config in configs if 'id' in config}
+            # The id of a removed program is never given again, even after a restart: its log history stays its own
+            self._next_id = max(next_id, max(self._configs, default=0) + 1)
+            # Hand-written entries may come without an id
+            for config in configs:
+                if 'id' not in config:
+                    config['id'] = self._next_id
+                    self._next_id += 1
+                    self._configs[config['id']] = config
+            if created:
+                # Saved right away: a directory added or renamed later must not renumber the programs,
+                # their log history and restart state are keyed by id
+                try:
+                    self._save()
+                except OSError as e:
+                    self.logger.error(f"Не удалось создать {self.config_path}: {str(e)}")
+            return dict(self._configs)
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def configs(self):
+        with self._lock:
+            return dict(self._configs)
+
+    def validate(self, config, check_files=True):
+        """Normalized copy of a program config, raises RegistryError when it is unusable"""
+        if not isinstance(config, dict):
+            raise RegistryError("Описание программы должно быть объектом")
+        name = str(config.get('name') or '').strip()
+        path = str(config.get('path') or '').strip()
+        script = str(config.get('script') or DEFAULT_SCRIPT).strip()
+        if not name or not path:
+            raise RegistryError("Нужно указать name и path")
+        if os.path.isabs(script) or '..' in script.replace('\\', '/').split('/'):
+            raise RegistryError(f"Недопустимый скрипт: {script}")
+        # Symlinks are resolved, a link inside programs/ can't lead out of it either
+        if not inside_dir(self.programs_dir, path) or not inside_dir(self.programs_dir, os.path.join(path, script)):
+            raise RegistryError(f"Программа должна находиться в {self.programs_dir}/: {path}")
+        if check_files and not os.path.isfile(os.path.join(path, script)):
+            raise RegistryError(f"Скрипт не найден: {os.path.join(path, script)}")
+
+        normalized = {'name': name, 'path': path, 'script': script}
+        if 'id' in config:
+            normalized['id'] = int(config['id'])
+        if config.get('restart') is not None:
+            if not isinstance(config['restart'], dict):
+                raise RegistryError("restart должен быть объектом")
+            normalized['restart'] = config['restart']
+        return normalized
+
+    def add(self, config):
+        """Validate, assign the next id and persist; returns the stored config"""
+        config = self.validate(config)
+        with self._lock:
+            script_path = os.path.realpath(os.path.join(config['path'], config['script']))
+            if any(os.path.realpath(os.path.join(other['path'], other['script'])) == script_path
+                   for other in self._configs.values()):
+                raise RegistryError(f"Программа {config['path']} уже добавлена")
+            config['id'] = self._next_id
+            self._next_id += 1
+            self._configs[config['id']] = config
+            self._save()
+            return dict(config)
+
+    def remove(self, program_id):
+        with self._lock:
+            if self._configs.pop(program_id, None) is None:
+                return False
+            self._save()
+            return True
+
+    def _save(self):
+        configs = sorted(self._configs.values(), key=lambda config: config['id'])
+        temp_path = f"{self.config_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump({'next_id': self._next_id, 'programs': configs}, file, ensure_ascii=False, indent=4)
+        os.replace(temp_path, self.config_path)
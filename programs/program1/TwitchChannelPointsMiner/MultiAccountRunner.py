@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import logging
+import signal
+import sys
+import threading
+import time
+
+from TwitchChannelPointsMiner.classes.PubSubHub import PubSubHub
+from TwitchChannelPointsMiner.classes.Settings import FollowersOrder
+from TwitchChannelPointsMiner.classes.SharedResources import SharedResources
+from TwitchChannelPointsMiner.classes.StopEvent import StopEvent
+from TwitchChannelPointsMiner.logger import LoggerSettings, configure_loggers
+from TwitchChannelPointsMiner.TwitchChannelPointsMiner import (
+    TwitchChannelPointsMiner,
+    check_latest_version,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MultiAccountRunner:
+    # Several accounts in one interpreter: the libraries are loaded once and the accounts share
+    # the HTTP connection pool, the channel id and client version caches, the PubSub connections
+    # of the channel topics, the log queue and the notifiers. Each account keeps its own login,
+    # cookies, streamers, user topics and analytics.
+    # LoggerSettings and the process wide switches (enable_analytics, disable_ssl_cert_verification,
+    # disable_at_in_nickname) are the same for every account.
+    __slots__ = ["logger_settings", "shared", "accounts", "running", "stop_event"]
+
+    def __init__(
+        self,
+        name: str = "accounts",
+        logger_settings: LoggerSettings = LoggerSettings(),
+        pool_size: int = 20,
+    ):
+        self.logger_settings = logger_settings
+        self.shared = SharedResources(pool_size=pool_size)
+        self.shared.connectivity.start()
+        self.shared.pubsub_hub = PubSubHub(self.shared.connectivity)
+        # The log file is named after the runner, not after an account
+        self.shared.logs_file, self.shared.queue_listener = configure_loggers(
+            name, logger_settings
+        )
+        check_latest_version()
+
+        self.accounts = []
+        self.running = False
+        self.stop_event = StopEvent()
+
+        for sign in [signal.SIGINT, signal.SIGSEGV, signal.SIGTERM]:
+            signal.signal(sign, self.end)
+
+    def add_account(
+        self,
+        username: str,
+        password: str = None,
+        streamers: list = [],
+        blacklist: list = [],
+        followers: bool = False,
+        followers_order: FollowersOrder = FollowersOrder.ASC,
+        **kwargs,
+    ):
+        # kwargs are the other TwitchChannelPointsMiner options: priority, streamer_settings, ...
+        miner = TwitchChannelPointsMiner(
+            username,
+            password,
+            logger_settings=self.logger_settings,
+            shared=self.shared,
+            **kwargs,
+        )
+        self.accounts.append(
+            (
+                miner,
+                {
+                    "streamers": streamers,
+                    "blacklist": blacklist,
+                    "followers": followers,
+                    "followers_order": followers_order,
+                },
+            )
+        )
+        return miner
+
+    def mine(self):
+        # A login may ask for an activation code, log in one account at a time before mining
+        for miner, _ in self.accounts:
+            miner.twitch.login()
+
+        self.running = True
+        threads = []
+        for miner, options in self.accounts:
+            thread = threading.Thread(
+                target=miner.run, kwargs=options, name=f"Account {miner.username}"
+            )
+            thread.start()
+            threads.append(thread)
+
+        # The main thread only waits, so that it can receive the signals,
+        # and watches the hub connections like every miner watches its own
+        last_check = time.time()
+        while self.running and any(thread.is_alive() for thread in threads):
+            if self.stop_event.sleep(5):
+                break
+            if time.time() - last_check >= 60:
+                last_check = time.time()
+                self.shared.pubsub_hub.check_connections()
+
+        if self.running:
+            self.running = False
+            self.shared.pubsub_hub.end()
+            self.shared.queue_listener.stop()
+
+    def end(self, signum, frame):
+        if not self.running:
+            return
+        self.running = False
+        self.stop_event.set()
+
+        logger.info("CTRL+C Detected! Please wait just a moment!")
+
+        self.shared.connectivity.close()
+
+        # Every account waits for its own threads, stop them all at once
+        stoppers = [
+            threading.Thread(target=miner.stop, name=f"Stop {miner.username}")
+            for miner, _ in self.accounts
+        ]
+        for stopper in stoppers:
+            stopper.start()
+        for stopper in stoppers:
+            stopper.join()
+        self.shared.pubsub_hub.end()
+
+        # Stop the queue listener to make sure all messages have been logged
+        self.shared.queue_listener.stop()
+
+        sys.exit(0)
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 __version__ = "1.9.9"
 from .TwitchChannelPointsMiner import TwitchChannelPointsMiner
+from .MultiAccountRunner import MultiAccountRunner
 
 __all__ = [
     "TwitchChannelPointsMiner",
+    "MultiAccountRunner",
 ]
@@ -1,19 +1,38 @@
 import json
 import logging
 import os
-from datetime import datetime
+import time
 from pathlib import Path
 from threading import Thread
 
-import pandas as pd
 from flask import Flask, Response, cli, render_template, request
 
+from TwitchChannelPointsMiner.classes.AnalyticsResponse import (
+    cached_json_response,
+    json_array,
+    json_response,
+)
+from TwitchChannelPointsMiner.classes.AnalyticsStore import (
+    AnalyticsStore,
+    delta_datas,
+    filter_datas,
+    parse_cursor,
+    wait_for_delta,
+)
 from TwitchChannelPointsMiner.classes.Settings import Settings
+from TwitchChannelPointsMiner.logger import LogFileNotifier
 from TwitchChannelPointsMiner.utils import download_file
 
 cli.show_server_banner = lambda *_: None
 logger = logging.getLogger(__name__)
 
+# Upper bound for ?wait= on long-poll requests, and keep-alive period of the SSE stream
+MAX_LONG_POLL = 60
+SSE_KEEPALIVE = 15
+
+# Largest piece of log sent by one /log response or one /log/stream event
+MAX_LOG_CHUNK = 256 * 1024
+
 
 def streamers_available():
     path = Settings.analytics_path
@@ -25,6 +44,9 @@ def streamers_available():
 
 
 def aggregate(df, freq="30Min"):
+    # pandas is only needed here, keep it optional for the analytics server
+    import pandas as pd
+
     df_base_events = df[(df.z == "Watch") | (df.z == "Claim")]
     df_other_events = df[(df.z != "Watch") & (df.z != "Claim")]
 
@@ -40,66 +62,10 @@ def aggregate(df, freq="30Min"):
     return result
 
 
-def filter_datas(start_date, end_date, datas):
-    # Note: https://stackoverflow.com/questions/4676195/why-do-i-need-to-multiply-unix-timestamps-by-1000-in-javascript
-    start_date = (
-        datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000
-        if start_date is not None
-        else 0
-    )
-    end_date = (
-        datetime.strptime(end_date, "%Y-%m-%d")
-        if end_date is not None
-        else datetime.now()
-    ).replace(hour=23, minute=59, second=59).timestamp() * 1000
-
-    original_series = datas["series"]
-
-    if "series" in datas:
-        df = pd.DataFrame(datas["series"])
-        df["datetime"] = pd.to_datetime(df.x // 1000, unit="s")
-
-        df = df[(df.x >= start_date) & (df.x <= end_date)]
-
-        datas["series"] = (
-            df.drop(columns="datetime")
-            .sort_values(by=["x", "y"], ascending=True)
-            .to_dict("records")
-        )
-    else:
-        datas["series"] = []
-
-    # If no data is found within the timeframe, that usually means the streamer hasn't streamed within that timeframe
-    # We create a series that shows up as a straight line on the dashboard, with 'No Stream' as labels
-    if len(datas["series"]) == 0:
-        new_end_date = start_date
-        new_start_date = 0
-        df = pd.DataFrame(original_series)
-        df["datetime"] = pd.to_datetime(df.x // 1000, unit="s")
-
-        # Attempt to get the last known balance from before the provided timeframe
-        df = df[(df.x >= new_start_date) & (df.x <= new_end_date)]
-        last_balance = df.drop(columns="datetime").sort_values(
-            by=["x", "y"], ascending=True).to_dict("records")[-1]['y']
-
-        datas["series"] = [{'x': start_date, 'y': last_balance, 'z': 'No Stream'}, {
-            'x': end_date, 'y': last_balance, 'z': 'No Stream'}]
-
-    if "annotations" in datas:
-        df = pd.DataFrame(datas["annotations"])
-        df["datetime"] = pd.to_datetime(df.x // 1000, unit="s")
-
-        df = df[(df.x >= start_date) & (df.x <= end_date)]
-
-        datas["annotations"] = (
-            df.drop(columns="datetime")
-            .sort_values(by="x", ascending=True)
-            .to_dict("records")
-        )
-    else:
-        datas["annotations"] = []
-
-    return datas
+def load_analytics(streamer):
+    path = Settings.analytics_path
+    streamer = streamer if streamer.endswith(".json") else f"{streamer}.json"
+    return AnalyticsStore.load(os.path.join(path, streamer))
 
 
 def read_json(streamer, return_response=True):
@@ -119,8 +85,7 @@ def read_json(streamer, return_response=True):
             return {"error": error_message}
 
     try:
-        with open(os.path.join(path, streamer), 'r') as file:
-            data = json.load(file)
+        analytics = load_analytics(streamer)
     except json.JSONDecodeError as e:
         error_message = f"Error decoding JSON in file '{streamer}': {str(e)}"
         logger.error(error_message)
@@ -130,40 +95,108 @@ def read_json(streamer, return_response=True):
             return {"error": error_message}
 
     # Handle filtering data, if applicable
-    filtered_data = filter_datas(start_date, end_date, data)
+    since = request.args.get("since", type=parse_cursor)
+    if since is not None:
+        wait = min(request.args.get("wait", default=0, type=int), MAX_LONG_POLL)
+        filtered_data = wait_for_delta(lambda: load_analytics(streamer), since, wait)
+    else:
+        filtered_data = filter_datas(start_date, end_date, analytics)
     if return_response:
-        return Response(json.dumps(filtered_data), status=200, mimetype="application/json")
+        if since is not None:
+            return json_response([json.dumps(filtered_data)])
+        return cached_json_response(
+            [os.path.join(path, streamer)],
+            lambda: [json.dumps(filtered_data)],
+        )
     else:
         return filtered_data
 
 
+def get_last_point(streamer):
+    try:
+        return load_analytics(streamer).last_point()
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
 def get_challenge_points(streamer):
-    datas = read_json(streamer, return_response=False)
-    if "series" in datas and datas["series"]:
-        return datas["series"][-1]["y"]
-    return 0  # Default value when 'series' key is not found or empty
+    last_point = get_last_point(streamer)
+    return last_point["y"] if last_point is not None else 0  # Default value when 'series' key is not found or empty
 
 
 def get_last_activity(streamer):
-    datas = read_json(streamer, return_response=False)
-    if "series" in datas and datas["series"]:
-        return datas["series"][-1]["x"]
-    return 0  # Default value when 'series' key is not found or empty
+    last_point = get_last_point(streamer)
+    return last_point["x"] if last_point is not None else 0  # Default value when 'series' key is not found or empty
 
 
 def json_all():
+    since = request.args.get("since", type=parse_cursor)
+    if since is not None:
+        # Only the streamers with something new since the client's cursor. One cursor
+        # for every file, only its timestamp applies: each delta carries its own cursor
+        since = (since[0], None, None)
+        datas = []
+        for streamer in streamers_available():
+            try:
+                delta = delta_datas(since, load_analytics(streamer))
+            except json.JSONDecodeError as e:
+                delta = {"error": f"Error decoding JSON in file '{streamer}': {str(e)}"}
+            except OSError:
+                continue
+            if delta.get("series") != [] or delta.get("annotations") != []:
+                datas.append({"name": streamer.strip(".json"), "data": delta})
+        return json_response([json.dumps(datas)])
+
+    start_date = request.args.get("startDate", type=str)
+    end_date = request.args.get("endDate", type=str)
+    streamers = streamers_available()
+
+    def generate():
+        for streamer in streamers:
+            try:
+                data = filter_datas(start_date, end_date, load_analytics(streamer))
+            except json.JSONDecodeError as e:
+                data = {"error": f"Error decoding JSON in file '{streamer}': {str(e)}"}
+            except OSError:
+                continue
+            yield {"name": streamer.strip(".json"), "data": data}
+
+    return cached_json_response(
+        [os.path.join(Settings.analytics_path, streamer) for streamer in streamers],
+        lambda: json_array(generate()),
+    )
+
+
+def stream_json(streamer):
+    path = Settings.analytics_path
+    streamer = streamer if streamer.endswith(".json") else f"{streamer}.json"
+    if not os.path.exists(os.path.join(path, streamer)):
+        error_message = f"File '{streamer}' not found."
+        logger.error(error_message)
+        return Response(json.dumps({"error": error_message}), status=404, mimetype="application/json")
+
+    # EventSource sends back the last cursor as Last-Event-ID when it reconnects
+    since = request.headers.get("Last-Event-ID", type=parse_cursor)
+    if since is None:
+        since = request.args.get("since", default=(time.time() * 1000, None, None), type=parse_cursor)
+
+    def generate(cursor):
+        while True:
+            datas = wait_for_delta(lambda: load_analytics(streamer), cursor, SSE_KEEPALIVE)
+            if not os.path.exists(os.path.join(path, streamer)):
+                logger.error(f"Stopped streaming '{streamer}': file removed")
+                return
+            if datas["series"] != [] or datas["annotations"] != []:
+                cursor = datas["cursor"]
+                yield f"id: {cursor}\ndata: {json.dumps(datas)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+
     return Response(
-        json.dumps(
-            [
-                {
-                    "name": streamer.strip(".json"),
-                    "data": read_json(streamer, return_response=False),
-                }
-                for streamer in streamers_available()
-            ]
-        ),
+        generate(since),
         status=200,
-        mimetype="application/json",
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
     )
 
 
@@ -172,6 +205,7 @@ def index(refresh=5, days_ago=7):
         "charts.html",
         refresh=(refresh * 60 * 1000),
         daysAgo=days_ago,
+        logs=True,
     )
 
 
@@ -222,7 +256,60 @@ def check_assets():
                 download_assets(assets_folder, required_files)
                 break
 
-last_sent_log_index = 0
+def rotated_log(log_file_path, inode):
+    # TimedRotatingFileHandler renames <username>.log to <username>.log.<date> at rollover
+    folder, name = os.path.split(log_file_path)
+    for f in os.listdir(folder):
+        fpath = os.path.join(folder, f)
+        if f.startswith(f"{name}.") and os.stat(fpath).st_ino == inode:
+            return fpath
+    return None
+
+
+def read_log_chunk(fpath, offset):
+    with open(fpath, "rb") as log_file:
+        log_file.seek(offset)
+        data = log_file.read(MAX_LOG_CHUNK)
+    # Return complete lines only, a multi-byte character is never split between two reads
+    end = data.rfind(b"\n") + 1
+    return data if end == 0 and len(data) == MAX_LOG_CHUNK else data[:end]
+
+
+def tail_log(log_file_path, inode=None, offset=None):
+    # Returns the text written after the client's cursor and the cursor to send next time
+    stat = os.stat(log_file_path)
+    if inode is None or offset is None:
+        # New client, start from the last lines of the current file
+        offset = max(stat.st_size - MAX_LOG_CHUNK, 0)
+        data = read_log_chunk(log_file_path, offset)
+        if offset > 0:
+            skip = data.find(b"\n") + 1
+            data, offset = data[skip:], offset + skip
+        return data.decode("utf-8", errors="replace"), stat.st_ino, offset + len(data)
+
+    if inode != stat.st_ino:
+        # The file rolled over since the last read, finish the rotated one first
+        rotated = rotated_log(log_file_path, inode)
+        data = read_log_chunk(rotated, offset) if rotated is not None else b""
+        if data != b"":
+            return data.decode("utf-8", errors="replace"), inode, offset + len(data)
+        inode, offset = stat.st_ino, 0
+    elif offset > stat.st_size:
+        # Truncated
+        offset = 0
+
+    data = read_log_chunk(log_file_path, offset)
+    return data.decode("utf-8", errors="replace"), inode, offset + len(data)
+
+
+def parse_log_cursor(cursor):
+    # "<inode>:<offset>", as sent in the SSE event id
+    try:
+        inode, offset = cursor.split(":")
+        return int(inode), int(offset)
+    except (AttributeError, ValueError):
+        return None, None
+
 
 class AnalyticsServer(Thread):
     def __init__(
@@ -243,27 +330,57 @@ class AnalyticsServer(Thread):
         self.days_ago = days_ago
         self.username = username
 
-        def generate_log():
-            global last_sent_log_index  # Use the global variable
+        log_file_path = os.path.join(Path().absolute(), "logs", f"{username}.log")
 
-            # Get the last received log index from the client request parameters
-            last_received_index = int(request.args.get("lastIndex", last_sent_log_index))
-
-            logs_path = os.path.join(Path().absolute(), "logs")
-            log_file_path = os.path.join(logs_path, f"{username}.log")
+        def generate_log():
+            # The cursor lives in the client (every tab has its own), the server is stateless
             try:
-                with open(log_file_path, "r", encoding="utf-8") as log_file:
-                    log_content = log_file.read()
-
-                # Extract new log entries since the last received index
-                new_log_entries = log_content[last_received_index:]
-                last_sent_log_index = len(log_content)  # Update the last sent index
-
-                return Response(new_log_entries, status=200, mimetype="text/plain")
-
+                log_content, inode, offset = tail_log(
+                    log_file_path,
+                    request.args.get("inode", type=int),
+                    request.args.get("offset", type=int),
+                )
             except FileNotFoundError:
                 return Response("Log file not found.", status=404, mimetype="text/plain")
 
+            return Response(
+                log_content,
+                status=200,
+                mimetype="text/plain",
+                headers={"X-Log-Inode": str(inode), "X-Log-Offset": str(offset)},
+            )
+
+        def stream_log():
+            inode, offset = parse_log_cursor(
+                request.headers.get("Last-Event-ID", request.args.get("cursor"))
+            )
+
+            def generate(inode, offset):
+                while True:
+                    # Read before the file, a line written meanwhile is not missed
+                    generation = LogFileNotifier.generation()
+                    try:
+                        log_content, inode, offset = tail_log(log_file_path, inode, offset)
+                    except FileNotFoundError:
+                        log_content = ""
+
+                    if log_content != "":
+                        yield f"id: {inode}:{offset}\n" + "".join(
+                            f"data: {line}\n" for line in log_content.splitlines()
+                        ) + "\n"
+                        continue
+
+                    # Sleep until the file handler writes something, idle clients cost nothing
+                    if LogFileNotifier.wait(generation, SSE_KEEPALIVE) is False:
+                        yield ": keep-alive\n\n"
+
+            return Response(
+                generate(inode, offset),
+                status=200,
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache"},
+            )
+
         self.app = Flask(
             __name__,
             template_folder=os.path.join(Path().absolute(), "assets"),
@@ -281,10 +398,15 @@ class AnalyticsServer(Thread):
         self.app.add_url_rule(
             "/json/<string:streamer>", "json", read_json, methods=["GET"]
         )
+        self.app.add_url_rule(
+            "/events/<string:streamer>", "events", stream_json, methods=["GET"]
+        )
         self.app.add_url_rule("/json_all", "json_all",
                               json_all, methods=["GET"])
         self.app.add_url_rule(
             "/log", "log", generate_log, methods=["GET"])
+        self.app.add_url_rule(
+            "/log/stream", "log_stream", stream_log, methods=["GET"])
 
     def run(self):
         logger.info(
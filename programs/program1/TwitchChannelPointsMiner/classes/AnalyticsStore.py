@@ -0,0 +1,211 @@
+import json
+import os
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from threading import Condition, Lock
+
+# Shared with the supervisor's analytics service, keep this module free of miner imports
+
+
+def _timestamps(records):
+    return [record["x"] for record in records]
+
+
+def _after(xs, x, seen):
+    # Index of the first record past the cursor: the `seen` first records at exactly x
+    # were sent already, or all of them if the cursor is a bare timestamp
+    end = bisect_right(xs, x)
+    return end if seen is None else min(bisect_left(xs, x) + seen, end)
+
+
+def _sorted_by_x(records):
+    # Series are appended in time order by Streamer.persistent_series(),
+    # only legacy or hand-edited files need to be sorted once at load time
+    xs = _timestamps(records)
+    if any(xs[i] > xs[i + 1] for i in range(0, len(xs) - 1)):
+        records = sorted(records, key=lambda record: record["x"])
+        xs = _timestamps(records)
+    return records, xs
+
+
+class StreamerAnalytics(object):
+    __slots__ = [
+        "series",
+        "series_x",
+        "annotations",
+        "annotations_x",
+        "mtime",
+        "size",
+    ]
+
+    def __init__(self, datas: dict, mtime: int = 0, size: int = 0):
+        self.series, self.series_x = _sorted_by_x(datas.get("series", []))
+        self.annotations, self.annotations_x = _sorted_by_x(
+            datas.get("annotations", [])
+        )
+        self.mtime = mtime
+        self.size = size
+
+    def __repr__(self):
+        return f"StreamerAnalytics(series={len(self.series)}, annotations={len(self.annotations)})"
+
+    def series_between(self, start, end) -> list:
+        return self.series[
+            bisect_left(self.series_x, start): bisect_right(self.series_x, end)  # noqa: E203
+        ]
+
+    def annotations_between(self, start, end) -> list:
+        return self.annotations[
+            bisect_left(self.annotations_x, start): bisect_right(self.annotations_x, end)  # noqa: E203
+        ]
+
+    def series_after(self, x, seen=None) -> list:
+        return self.series[_after(self.series_x, x, seen):]
+
+    def annotations_after(self, x, seen=None) -> list:
+        return self.annotations[_after(self.annotations_x, x, seen):]
+
+    def cursor(self, x=0) -> str:
+        # Delta cursor past the last record: its timestamp and how many records of each
+        # list share it. Several records get the same x, it's rounded down to the second
+        x = max([xs[-1] for xs in (self.series_x, self.annotations_x) if xs != []] + [x])
+        return format_cursor(
+            x,
+            len(self.series_x) - bisect_left(self.series_x, x),
+            len(self.annotations_x) - bisect_left(self.annotations_x, x),
+        )
+
+    def last_point_before(self, x):
+        # Last point with a timestamp <= x, None if the series starts after x
+        index = bisect_right(self.series_x, x)
+        return self.series[index - 1] if index > 0 else None
+
+    def last_point(self):
+        return self.series[-1] if self.series != [] else None
+
+
+class AnalyticsStore(object):
+    # Parsed analytics files, reloaded only when the file on disk changes
+    __cache = {}
+    __lock = Lock()
+
+    # Bumped by the miner after every write, wakes up long-poll and SSE clients
+    __changed = Condition()
+    __generation = 0
+
+    @classmethod
+    def load(cls, fname) -> StreamerAnalytics:
+        stat = os.stat(fname)
+        cached = cls.__cache.get(fname)
+        if (
+            cached is not None
+            and cached.mtime == stat.st_mtime_ns
+            and cached.size == stat.st_size
+        ):
+            return cached
+
+        with open(fname, "r") as file:
+            analytics = StreamerAnalytics(
+                json.load(file), mtime=stat.st_mtime_ns, size=stat.st_size
+            )
+
+        with cls.__lock:
+            cls.__cache[fname] = analytics
+        return analytics
+
+    @classmethod
+    def generation(cls) -> int:
+        with cls.__changed:
+            return cls.__generation
+
+    @classmethod
+    def notify(cls):
+        with cls.__changed:
+            cls.__generation += 1
+            cls.__changed.notify_all()
+
+    @classmethod
+    def wait(cls, generation, timeout) -> bool:
+        # True if something was written after `generation` was read
+        with cls.__changed:
+            return cls.__changed.wait_for(
+                lambda: cls.__generation != generation, timeout
+            )
+
+
+def parse_cursor(cursor):
+    # "<x>:<series>:<annotations>" as built by StreamerAnalytics.cursor(), or a bare
+    # timestamp: everything up to it was seen. Raises ValueError like float(), so that
+    # it can be the type= of request.args.get()
+    x, *seen = str(cursor).split(":")
+    if len(seen) not in (0, 2):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    series, annotations = [int(n) for n in seen] if seen != [] else (None, None)
+    return float(x), series, annotations
+
+
+def format_cursor(x, series=None, annotations=None) -> str:
+    x = int(x) if x == int(x) else x
+    return f"{x}" if series is None else f"{x}:{series}:{annotations}"
+
+
+def filter_datas(start_date, end_date, analytics: StreamerAnalytics):
+    # Note: https://stackoverflow.com/questions/4676195/why-do-i-need-to-multiply-unix-timestamps-by-1000-in-javascript
+    start_date = (
+        datetime.strptime(start_date, "%Y-%m-%d").timestamp() * 1000
+        if start_date is not None
+        else 0
+    )
+    end_date = (
+        datetime.strptime(end_date, "%Y-%m-%d")
+        if end_date is not None
+        else datetime.now()
+    ).replace(hour=23, minute=59, second=59).timestamp() * 1000
+
+    datas = {
+        "series": analytics.series_between(start_date, end_date),
+        "annotations": analytics.annotations_between(start_date, end_date),
+        # Where the live updates of a range ending today start from
+        "cursor": analytics.cursor(),
+    }
+
+    # If no data is found within the timeframe, that usually means the streamer hasn't streamed within that timeframe
+    # We create a series that shows up as a straight line on the dashboard, with 'No Stream' as labels
+    if len(datas["series"]) == 0:
+        # Attempt to get the last known balance from before the provided timeframe
+        last_point = analytics.last_point_before(start_date)
+        if last_point is not None:
+            last_balance = last_point["y"]
+            datas["series"] = [{'x': start_date, 'y': last_balance, 'z': 'No Stream'}, {
+                'x': end_date, 'y': last_balance, 'z': 'No Stream'}]
+
+    return datas
+
+
+def delta_datas(since, analytics: StreamerAnalytics):
+    # Only the points and annotations added after the client's cursor (see parse_cursor)
+    x, series_seen, annotations_seen = since
+    return {
+        "series": analytics.series_after(x, series_seen),
+        "annotations": analytics.annotations_after(x, annotations_seen),
+        # Everything up to the end of both lists is sent now
+        "cursor": analytics.cursor(x),
+    }
+
+
+def wait_for_delta(load, since, timeout=0, recheck=5):
+    # load() returns the StreamerAnalytics to look at, since is a parsed cursor
+    deadline = time.time() + timeout
+    while True:
+        generation = AnalyticsStore.generation()
+        try:
+            datas = delta_datas(since, load())
+        except (OSError, json.JSONDecodeError):
+            # The miner is rewriting the file, nothing new until the next write
+            datas = {"series": [], "annotations": [], "cursor": format_cursor(*since)}
+        remaining = deadline - time.time()
+        if datas["series"] != [] or datas["annotations"] != [] or remaining <= 0:
+            return datas
+        # Re-check the file every few seconds anyway, it may be written by another process
+        AnalyticsStore.wait(generation, min(remaining, recheck))
@@ -0,0 +1,34 @@
+from threading import Event, Lock
+
+from TwitchChannelPointsMiner.classes.Settings import Settings
+
+
+class StopEvent(Event):
+    # Set when the miner ends. The long waits of its threads are waits on it instead of
+    # time.sleep(), they return as soon as it's set and don't wake up in between.
+    # Through Settings.clock, so that the simulation can fast-forward them.
+    def __init__(self):
+        super().__init__()
+        # Waits on another condition that must end with the miner too (see ConnectivityMonitor.wait)
+        self.__callbacks = []
+        self.__callbacks_lock = Lock()
+
+    def set(self):
+        super().set()
+        with self.__callbacks_lock:
+            callbacks = list(self.__callbacks)
+        for callback in callbacks:
+            callback()
+
+    def add_callback(self, callback):
+        with self.__callbacks_lock:
+            self.__callbacks.append(callback)
+
+    def remove_callback(self, callback):
+        with self.__callbacks_lock:
+            if callback in self.__callbacks:
+                self.__callbacks.remove(callback)
+
+    def sleep(self, seconds):
+        # Returns True when the miner is ending
+        return Settings.clock.wait(self, seconds)
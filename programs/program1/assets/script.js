@@ -82,6 +82,7 @@ var options = {
 var chart = new ApexCharts(document.querySelector("#chart"), options);
 var currentStreamer = null;
 var annotations = [];
+var liveUpdates = null;
 
 var streamersList = [];
 var sortBy = "Name ascending";
@@ -98,8 +99,9 @@ $(document).ready(function () {
     // Variable to keep track of whether auto-update log is active
     var autoUpdateLog = true;
 
-    // Variable to keep track of the last received log index
-    var lastReceivedLogIndex = 0;
+    // Byte cursor of this tab in the log file ("<inode>:<offset>"), empty until the first answer
+    var logCursor = '';
+    var logStream = null;
 
     $('#auto-update-log').click(() => {
         autoUpdateLog = !autoUpdateLog;
@@ -107,25 +109,40 @@ $(document).ready(function () {
 
         if (autoUpdateLog) {
             getLog();
+        } else {
+            stopLog();
         }
     });
 
-    // Function to get the full log content
+    function appendLog(data) {
+        // Process and display the new log entries received
+        $("#log-content").append(document.createTextNode(data));
+        // Scroll to the bottom of the log content
+        $("#log-content").scrollTop($("#log-content")[0].scrollHeight);
+    }
+
+    function stopLog() {
+        if (logStream !== null) logStream.close();
+        logStream = null;
+    }
+
+    // Function to follow the log content
     function getLog() {
-        if (isLogCheckboxChecked) {
-            $.get(`/log?lastIndex=${lastReceivedLogIndex}`, function (data) {
-                // Process and display the new log entries received
-                $("#log-content").append(data);
-                // Scroll to the bottom of the log content
-                $("#log-content").scrollTop($("#log-content")[0].scrollHeight);
-
-                // Update the last received log index
-                lastReceivedLogIndex += data.length;
-
-                if (autoUpdateLog) {
-                    // Call getLog() again after a certain interval (e.g., 1 second)
-                    setTimeout(getLog, 1000);
-                }
+        if (!isLogCheckboxChecked || !autoUpdateLog) return;
+        if (window.EventSource) {
+            if (logStream !== null) return;
+            logStream = new EventSource(`./log/stream?cursor=${encodeURIComponent(logCursor)}`);
+            logStream.onmessage = function (event) {
+                logCursor = event.lastEventId;
+                appendLog(event.data + "\n");
+            };
+        } else {
+            var [inode, offset] = logCursor ? logCursor.split(':') : ['', ''];
+            $.get('./log', { inode: inode, offset: offset }, function (data, status, xhr) {
+                logCursor = `${xhr.getResponseHeader('X-Log-Inode')}:${xhr.getResponseHeader('X-Log-Offset')}`;
+                appendLog(data);
+                // Call getLog() again after a certain interval (e.g., 1 second)
+                setTimeout(getLog, 1000);
             });
         }
     }
@@ -193,7 +210,8 @@ $(document).ready(function () {
     toggleDarkMode();
 
     // Retrieve log checkbox state from localStorage and update UI accordingly
-    var logCheckboxState = localStorage.getItem('logCheckboxState');
+    // (the page has no log panel when it is served by a supervisor without the log file)
+    var logCheckboxState = $('#log').length > 0 ? localStorage.getItem('logCheckboxState') : null;
     $('#log').prop('checked', logCheckboxState === 'true');
     if (logCheckboxState === 'true') {
         isLogCheckboxChecked = true;
@@ -214,6 +232,7 @@ $(document).ready(function () {
             getLog();
             $('html, body').scrollTop($(document).height());
         } else {
+            stopLog();
             $('#log-box').hide();
             $('#auto-update-log').hide();
             // Clear log content when checkbox is unchecked
@@ -251,6 +270,7 @@ function changeStreamer(streamer, index) {
 
 function getStreamerData(streamer) {
     if (currentStreamer == streamer) {
+        stopLiveUpdates();
         $.getJSON(`./json/${streamer}`, {
             startDate: formatDate(startDate),
             endDate: formatDate(endDate)
@@ -262,13 +282,68 @@ function getStreamerData(streamer) {
             clearAnnotations();
             annotations = response["annotations"];
             updateAnnotations();
-            setTimeout(function () {
-                getStreamerData(streamer);
-            }, 300000); // 5 minutes
+            // Only a range that includes today can receive new points
+            if (formatDate(endDate) >= formatDate(new Date())) {
+                startLiveUpdates(streamer, response["cursor"] || lastTimestamp(response));
+            }
         });
     }
 }
 
+// Cursor for the live updates when the server didn't send one: the most recent x already drawn on the chart
+function lastTimestamp(response) {
+    var timestamps = response["series"]
+        .filter(point => point.z !== "No Stream")
+        .concat(response["annotations"])
+        .map(point => point.x);
+    return timestamps.length > 0 ? Math.max(...timestamps) : Date.now();
+}
+
+function stopLiveUpdates() {
+    if (liveUpdates !== null) liveUpdates.close();
+    liveUpdates = null;
+}
+
+function startLiveUpdates(streamer, since) {
+    if (window.EventSource) {
+        var source = new EventSource(`./events/${streamer}?since=${encodeURIComponent(since)}`);
+        source.onmessage = function (event) {
+            appendStreamerData(streamer, JSON.parse(event.data));
+        };
+        liveUpdates = source;
+    } else {
+        // Long-poll fallback, the server answers as soon as something new is written
+        var active = true;
+        liveUpdates = { close: () => active = false };
+        (function poll(cursor) {
+            $.getJSON(`./json/${streamer}`, { since: cursor, wait: 60 }, function (delta) {
+                if (!active) return;
+                appendStreamerData(streamer, delta);
+                poll(delta["cursor"]);
+            }).fail(function () {
+                if (active) setTimeout(() => poll(cursor), refresh);
+            });
+        })(since);
+    }
+}
+
+function appendStreamerData(streamer, delta) {
+    if (currentStreamer != streamer) return;
+    if (delta["series"].length > 0) {
+        var current = chart.w.config.series[0] ? chart.w.config.series[0].data : [];
+        if (current.length > 0 && current[0].z === "No Stream") {
+            // The flat 'No Stream' placeholder can't be extended, reload the whole range
+            getStreamerData(streamer);
+            return;
+        }
+        chart.appendData([{ data: delta["series"] }]);
+    }
+    if (delta["annotations"].length > 0) {
+        annotations = (annotations || []).concat(delta["annotations"]);
+        updateAnnotations();
+    }
+}
+
 function getAllStreamersData() {
     $.getJSON(`./json_all`, function (response) {
         for (var i in response) {
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+
+# Run the miner's scheduling against a simulated Twitch on a virtual clock and print what it earned.
+# The minute watcher, the priorities and the PubSub handling are the real ones, Twitch is a world
+# model answering from fixtures (see TwitchChannelPointsMiner/Simulation.py), e.g.
+#   python simulate.py                                  # 500 streamers, 24 hours
+#   python simulate.py --priority ORDER --seed 1
+#   python simulate.py --dump-fixtures day.json         # save the generated streams, edit, then
+#   python simulate.py --fixtures day.json              # replay them, with scripted PubSub/GQL
+
+import argparse
+import json
+import logging
+
+from TwitchChannelPointsMiner.classes.Settings import Priority
+from TwitchChannelPointsMiner.Simulation import Simulation, generate_fixtures
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Simulate a day of mining")
+    arg_parser.add_argument("--streamers", type=int, default=500, help="generated streamers (default: 500)")
+    arg_parser.add_argument("--hours", type=float, default=24, help="simulated hours (default: 24)")
+    arg_parser.add_argument("--seed", type=int, default=0, help="seed of the generated streams (default: 0)")
+    arg_parser.add_argument(
+        "--priority", nargs="+", default=["STREAK", "DROPS", "ORDER"],
+        choices=[priority.name for priority in Priority],
+        help="priorities of the minute watcher (default: STREAK DROPS ORDER)"
+    )
+    arg_parser.add_argument("--fixtures", help="JSON fixtures to replay instead of generated streams")
+    arg_parser.add_argument("--dump-fixtures", metavar="FILE", help="write the fixtures used to FILE")
+    arg_parser.add_argument("--verbose", action="store_true", help="print the miner's logs")
+    args = arg_parser.parse_args()
+
+    # The miner logs every gain, keep only the problems unless asked
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    logging.getLogger("TwitchChannelPointsMiner").setLevel(
+        logging.INFO if args.verbose else logging.WARNING
+    )
+
+    if args.fixtures is not None:
+        with open(args.fixtures, encoding="utf-8") as f:
+            fixtures = json.load(f)
+    else:
+        fixtures = generate_fixtures(args.streamers, args.hours, args.seed)
+    if args.dump_fixtures is not None:
+        with open(args.dump_fixtures, "w", encoding="utf-8") as f:
+            json.dump(fixtures, f, indent=2)
+
+    report = Simulation(
+        fixtures,
+        hours=args.hours,
+        priority=[Priority[priority] for priority in args.priority],
+    ).run()
+    print(json.dumps(report, indent=2))
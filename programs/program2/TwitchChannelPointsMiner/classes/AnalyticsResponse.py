@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+import zlib
+from datetime import datetime, timezone
+
+from flask import Response, request
+
+# Shared with the supervisor's analytics service, keep this module free of miner imports
+
+
+def file_validators(fnames):
+    # Weak ETag over every file the response is built from, plus the query string
+    # (date range) and today's date (the default end of the range)
+    stats = []
+    for fname in sorted(fnames):
+        try:
+            stats.append((fname, os.stat(fname)))
+        except OSError:
+            continue  # Removed meanwhile, the response won't include it either
+    fingerprint = hashlib.sha1(
+        repr(
+            (
+                [(f, st.st_mtime_ns, st.st_size) for f, st in stats],
+                request.query_string,
+                datetime.now().date(),
+            )
+        ).encode()
+    ).hexdigest()[:20]
+    last_modified = max([st.st_mtime for _, st in stats], default=0)
+    return fingerprint, datetime.fromtimestamp(int(last_modified), timezone.utc)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def json_array(items):
+    # Encode one item at a time, the whole array is never held in memory
+    separator = "["
+    for item in items:
+        yield separator + json.dumps(item)
+        separator = ","
+    yield "]" if separator == "," else "[]"
+
+
+def json_response(chunks):
+    headers = {}
+    if "gzip" in request.headers.get("Accept-Encoding", ""):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    headers["Vary"] = "Accept-Encoding"
+    return Response(chunks, status=200, mimetype="application/json", headers=headers)
+
+
+def cached_json_response(fnames, generate):
+    etag, last_modified = file_validators(fnames)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = (
+            request.if_modified_since is not None
+            and last_modified <= request.if_modified_since
+        )
+
+    response = (
+        Response(status=304) if not_modified else json_response(generate())
+    )
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
@@ -0,0 +1,62 @@
+import heapq
+import time
+from datetime import datetime
+from threading import Timer
+
+
+class Clock(object):
+    # Wall-clock time. The scheduling code reads the time, waits and sets timers through
+    # Settings.clock, so that the simulation can replace it with a VirtualClock.
+    __slots__ = []
+
+    def time(self):
+        return time.time()
+
+    def now(self):
+        return datetime.now()
+
+    def wait(self, event, seconds):
+        # Returns True when the event is set before the end of the wait
+        return event.wait(max(seconds, 0))
+
+    def call_later(self, seconds, function, args=()):
+        timer = Timer(seconds, function, args)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+
+class VirtualClock(Clock):
+    # Time that moves only when the thread driving the simulation waits: wait() jumps to the end
+    # of the wait and runs on the way, in order, the callbacks that are due (schedule(),
+    # call_later()). Deterministic, as long as a single thread uses it.
+    __slots__ = ["current", "queue", "counter"]
+
+    def __init__(self, start=0):
+        self.current = start
+        self.queue = []
+        self.counter = 0  # Callbacks due at the same time run in scheduling order
+
+    def time(self):
+        return self.current
+
+    def now(self):
+        return datetime.fromtimestamp(self.current)
+
+    def schedule(self, at, function, args=()):
+        self.counter += 1
+        heapq.heappush(self.queue, (max(at, self.current), self.counter, function, args))
+
+    def call_later(self, seconds, function, args=()):
+        self.schedule(self.current + seconds, function, args)
+
+    def wait(self, event, seconds):
+        deadline = self.current + max(seconds, 0)
+        while event.is_set() is False and self.queue and self.queue[0][0] <= deadline:
+            at, _, function, args = heapq.heappop(self.queue)
+            self.current = at
+            function(*args)
+        if event.is_set() is True:
+            return True
+        self.current = deadline
+        return False
@@ -0,0 +1,140 @@
+import logging
+from threading import Condition, Thread
+
+from TwitchChannelPointsMiner.utils import internet_connection_available
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectivityMonitor(object):
+    # Whether Twitch can be reached, one per process (see SharedResources).
+    # The state is inferred from the outcome of the requests that are made anyway
+    # (report_success / report_failure), Twitch is probed only while it's unreachable.
+    # The subsystems wait for the state to change instead of sleeping and probing on their own.
+    __slots__ = [
+        "host",
+        "port",
+        "interval",
+        "max_interval",
+        "failure_threshold",
+        "failures",
+        "reachable",
+        "probing",
+        "closed",
+        "condition",
+    ]
+
+    def __init__(
+        self,
+        host="twitch.tv",
+        port=443,
+        interval=5,
+        max_interval=180,
+        failure_threshold=2,
+    ):
+        self.host = host
+        self.port = port
+        # Between two probes, doubled after every failed probe up to max_interval
+        self.interval = interval
+        self.max_interval = max_interval
+        # Consecutive failed requests before Twitch is considered unreachable
+        self.failure_threshold = failure_threshold
+        self.failures = 0
+        # Unknown until the first probe
+        self.reachable = False
+        self.probing = False
+        # Set on shutdown, the waiters give up
+        self.closed = False
+        self.condition = Condition()
+
+    def start(self):
+        with self.condition:
+            if self.reachable is False:
+                self.__start_probe()
+
+    def is_ready(self):
+        return self.reachable
+
+    def wait(self, timeout=None, stop_event=None):
+        # Blocks until Twitch is reachable, returns False on timeout, after close()
+        # or once stop_event (a StopEvent of a miner that may end before the monitor) is set
+        with self.condition:
+            if self.reachable is False and self.closed is False:
+                self.__start_probe()
+            if stop_event is None:
+                self.condition.wait_for(lambda: self.reachable or self.closed, timeout)
+                return self.reachable
+        stop_event.add_callback(self.__wake)
+        try:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: self.reachable or self.closed or stop_event.is_set(),
+                    timeout,
+                )
+                return self.reachable
+        finally:
+            stop_event.remove_callback(self.__wake)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def report_success(self):
+        with self.condition:
+            self.failures = 0
+            if self.reachable is False:
+                self.__set_reachable(True)
+
+    def report_failure(self):
+        with self.condition:
+            self.failures += 1
+            if self.reachable is True and self.failures >= self.failure_threshold:
+                logger.warning(
+                    f"Twitch is unreachable after {self.failures} failed requests, waiting for the connection to come back",
+                    extra={"emoji": ":electric_plug:"},
+                )
+                self.__set_reachable(False)
+                self.__start_probe()
+
+    def __wake(self):
+        # StopEvent callback, the waiters re-check their stop_event
+        with self.condition:
+            self.condition.notify_all()
+
+    def __set_reachable(self, reachable):
+        # Called with the condition held
+        self.reachable = reachable
+        self.condition.notify_all()
+
+    def __start_probe(self):
+        # Called with the condition held
+        if self.probing is False:
+            self.probing = True
+            thread = Thread(target=self.__probe, name="Connectivity probe")
+            thread.daemon = True
+            thread.start()
+
+    def __probe(self):
+        interval = self.interval
+        error_printed = False
+        while True:
+            connected = internet_connection_available(host=self.host, port=self.port)
+            with self.condition:
+                # A request that succeeded in the meantime settled it already
+                if connected is True or self.reachable is True or self.closed is True:
+                    self.probing = False
+                    if self.reachable is False and connected is True:
+                        self.failures = 0
+                        self.__set_reachable(True)
+                    break
+                if error_printed is False:
+                    logger.error(f"Waiting for {self.host} connectivity...")
+                    error_printed = True
+                # Woken up early by a successful request or by close()
+                self.condition.wait_for(lambda: self.reachable or self.closed, interval)
+            interval = min(interval * 2, self.max_interval)
+        if error_printed is True and self.reachable is True:
+            logger.info(
+                f"{self.host} is reachable", extra={"emoji": ":electric_plug:"}
+            )
@@ -0,0 +1,98 @@
+from http.cookiejar import DefaultCookiePolicy
+from threading import Lock
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from TwitchChannelPointsMiner.classes.ConnectivityMonitor import ConnectivityMonitor
+from TwitchChannelPointsMiner.constants import CLIENT_VERSION, URL
+
+# Twitch ships a new web build a few times a day, the main page is fetched at most this often
+CLIENT_VERSION_TTL = 15 * 60
+
+
+class ReadyHTTPAdapter(HTTPAdapter):
+    # Holds the requests back while Twitch is unreachable and tells the monitor how they went
+    def __init__(self, connectivity, **kwargs):
+        self.connectivity = connectivity
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        # Waiting for Twitch counts against the request's own timeout (connect part of a tuple)
+        timeout = kwargs.get("timeout")
+        if isinstance(timeout, tuple):
+            timeout = timeout[0]
+        if self.connectivity.wait(timeout=timeout) is False:
+            raise requests.exceptions.ConnectionError(
+                "Twitch is unreachable", request=request
+            )
+        try:
+            response = super().send(request, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            self.connectivity.report_failure()
+            raise
+        self.connectivity.report_success()
+        return response
+
+
+class SharedResources(object):
+    # What the miners of one process share. Every miner has one; the miners hosted by a
+    # MultiAccountRunner share the runner's. Auth never goes through here: tokens are sent
+    # per request by each Twitch instance and the HTTP session doesn't keep cookies.
+    __slots__ = [
+        "http",
+        "connectivity",
+        "channel_ids",
+        "client_version",
+        "client_version_checked",
+        "pubsub_hub",
+        "logs_file",
+        "queue_listener",
+        "lock",
+    ]
+
+    def __init__(self, pool_size=10):
+        # Probed in the background by start(), then kept up to date by the requests
+        twitch = urlparse(URL)
+        self.connectivity = ConnectivityMonitor(
+            host=twitch.hostname,
+            port=twitch.port or (443 if twitch.scheme == "https" else 80),
+        )
+
+        self.http = requests.Session()
+        self.http.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = ReadyHTTPAdapter(
+            self.connectivity, pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.http.mount("https://", adapter)
+        self.http.mount("http://", adapter)
+
+        # Channel login -> channel id, they never change
+        self.channel_ids = {}
+        self.client_version = CLIENT_VERSION
+        self.client_version_checked = 0
+
+        # PubSubHub listening to the channel topics for every account, set by MultiAccountRunner
+        self.pubsub_hub = None
+
+        # Set by configure_loggers(): one log queue and one set of notifiers per process
+        self.logs_file = None
+        self.queue_listener = None
+
+        self.lock = Lock()
+
+    def get_channel_id(self, username):
+        return self.channel_ids.get(username)
+
+    def set_channel_id(self, username, channel_id):
+        with self.lock:
+            self.channel_ids[username] = channel_id
+
+    def client_version_expired(self, now):
+        # True for only one caller per period, the others keep using the cached version
+        with self.lock:
+            if now - self.client_version_checked < CLIENT_VERSION_TTL:
+                return False
+            self.client_version_checked = now
+            return True
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import select
+import time
+from threading import Event, Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+# File descriptor of a pipe opened by a supervisor, passed to the miner with pass_fds
+STATUS_FD_ENV = "TWITCH_MINER_STATUS_FD"
+
+
+class StatusPublisher(object):
+    # Writes the miner state as JSON lines: a snapshot, then only what changed.
+    # The state is sampled every `interval` seconds, a full snapshot is sent every `snapshot_every`.
+    # The pipe is non-blocking, a slow supervisor never stalls the miner: when it is full the
+    # message is dropped and the next one is a snapshot
+    __slots__ = [
+        "miner",
+        "fd",
+        "interval",
+        "snapshot_every",
+        "last_state",
+        "last_snapshot",
+        "seq",
+        "pending",
+        "lock",
+        "stop_event",
+        "thread",
+    ]
+
+    def __init__(self, miner, fd, interval=2, snapshot_every=60):
+        self.miner = miner
+        self.fd = fd
+        self.interval = interval
+        self.snapshot_every = snapshot_every
+        self.last_state = None
+        self.last_snapshot = 0
+        self.seq = 0
+        self.pending = b""  # End of a line the pipe only partly accepted
+        self.lock = Lock()  # One publish at a time, the final one may race the thread
+        self.stop_event = Event()
+        self.thread = None
+
+    @classmethod
+    def from_env(cls, miner):
+        fd = os.environ.get(STATUS_FD_ENV)
+        if not fd:
+            return None
+        try:
+            fd = int(fd)
+            os.set_blocking(fd, False)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unable to open the status channel {fd}: {e}")
+            return None
+        return cls(miner, fd)
+
+    def start(self):
+        self.thread = Thread(target=self.__run, name="Status publisher", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join(timeout=self.interval * 2)
+        with self.lock:
+            if self.fd is None:
+                return
+            self.__publish(final=True)
+            # The rest of a partly written line, closing now would cut a record in two
+            self.__flush(timeout=self.interval)
+            try:
+                os.close(self.fd)
+            except OSError:
+                pass
+            self.fd = None
+
+    def __run(self):
+        while not self.stop_event.wait(self.interval):
+            with self.lock:
+                if self.stop_event.is_set() is False:
+                    self.__publish()
+
+    def state(self) -> dict:
+        miner = self.miner
+        watching = list(getattr(miner.twitch, "streamers_watching", []))
+        ws = miner.ws_pool.ws if miner.ws_pool is not None else []
+        return {
+            "username": miner.username,
+            "running": miner.running,
+            "streamers": {
+                streamer.username: {
+                    "points": streamer.channel_points,
+                    "online": streamer.is_online,
+                    "watching": streamer.username in watching,
+                }
+                for streamer in miner.streamers
+            },
+            "watching": watching,
+            "queues": {
+                "pubsub_connections": len(ws),
+                "pubsub_topics": sum(len(socket.topics) for socket in ws),
+                "pending_predictions": sum(
+                    1
+                    for prediction in list(miner.events_predictions.values())
+                    if prediction.status == "ACTIVE"
+                ),
+                "log_queue": miner.queue_listener.queue.qsize()
+                if miner.queue_listener is not None
+                else 0,
+            },
+        }
+
+    def __publish(self, final=False):
+        try:
+            state = self.state()
+        except Exception as e:
+            # Lists can change under us while the miner is starting, try again next time
+            logger.debug(f"Unable to read the miner state: {e}")
+            return
+
+        now = time.time()
+        if self.last_state is None or now - self.last_snapshot >= self.snapshot_every:
+            message = {"type": "snapshot", "state": state}
+            snapshot = True
+        else:
+            changes = self.__diff(self.last_state, state)
+            if changes == {} and final is False:
+                return
+            message = {"type": "delta", "changes": changes}
+            snapshot = False
+
+        message.update({"seq": self.seq + 1, "time": now, "final": final})
+        try:
+            sent = self.__write((json.dumps(message, separators=(",", ":")) + "\n").encode("utf-8"))
+        except OSError:
+            # The supervisor is gone, keep mining without it
+            self.stop_event.set()
+            return
+        if sent is False:
+            # The supervisor is behind, it gets a snapshot once the pipe drains
+            self.last_state = None
+            return
+        self.seq += 1
+        self.last_state = state
+        if snapshot is True:
+            self.last_snapshot = now
+
+    def __write(self, data) -> bool:
+        # False if the pipe is full. Lines are never interleaved: the rest of a partly
+        # written line goes out before anything else
+        if self.fd is None:
+            return False
+        if self.pending != b"":
+            try:
+                self.pending = self.pending[os.write(self.fd, self.pending):]
+            except BlockingIOError:
+                return False
+            if self.pending != b"":
+                return False
+        try:
+            written = os.write(self.fd, data)
+        except BlockingIOError:
+            return False
+        self.pending = data[written:]
+        return True
+
+    def __flush(self, timeout):
+        # Waits for the pipe to take self.pending, up to `timeout` seconds. The supervisor
+        # ignores an unterminated last line if it never does
+        deadline = time.time() + timeout
+        while self.pending != b"":
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            try:
+                select.select([], [self.fd], [], remaining)
+                self.pending = self.pending[os.write(self.fd, self.pending):]
+            except BlockingIOError:
+                continue
+            except OSError:
+                return  # The supervisor is gone
+
+    @staticmethod
+    def __diff(old, new) -> dict:
+        changes = {}
+        for key, value in new.items():
+            if key == "streamers":
+                streamers = {}
+                for username, fields in value.items():
+                    before = old["streamers"].get(username, {})
+                    changed = {
+                        field: fields[field]
+                        for field in fields
+                        if before.get(field) != fields[field]
+                    }
+                    if changed != {}:
+                        streamers[username] = changed
+                removed = [
+                    username for username in old["streamers"] if username not in value
+                ]
+                if streamers != {}:
+                    changes["streamers"] = streamers
+                if removed != []:
+                    changes["removed_streamers"] = removed
+            elif old.get(key) != value:
+                changes[key] = value
+        return changes
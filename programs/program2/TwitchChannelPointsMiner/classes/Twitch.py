@@ -10,9 +10,7 @@ import os
 import random
 import re
 import string
-import time
 import requests
-import validators
 # import json
 
 from pathlib import Path
@@ -35,17 +33,19 @@ from TwitchChannelPointsMiner.classes.Settings import (
     Priority,
     Settings,
 )
+from TwitchChannelPointsMiner.classes.SharedResources import SharedResources
+from TwitchChannelPointsMiner.classes.StopEvent import StopEvent
 from TwitchChannelPointsMiner.classes.TwitchLogin import TwitchLogin
 from TwitchChannelPointsMiner.constants import (
     CLIENT_ID,
     CLIENT_VERSION,
     URL,
+    USHER_URL,
     GQLOperations,
 )
 from TwitchChannelPointsMiner.utils import (
     _millify,
     create_chunks,
-    internet_connection_available,
 )
 
 logger = logging.getLogger(__name__)
@@ -64,9 +64,14 @@ class Twitch(object):
         "client_session",
         "client_version",
         "twilight_build_id_pattern",
+        "streamers_watching",
+        "shared",
+        "stop_event",
     ]
 
-    def __init__(self, username, user_agent, password=None):
+    def __init__(
+        self, username, user_agent, password=None, shared=None, stop_event=None
+    ):
         cookies_path = os.path.join(Path().absolute(), "cookies")
         Path(cookies_path).mkdir(parents=True, exist_ok=True)
         self.cookies_file = os.path.join(cookies_path, f"{username}.pkl")
@@ -85,9 +90,17 @@ class Twitch(object):
         self.twilight_build_id_pattern = re.compile(
             r'window\.__twilightBuildID\s*=\s*"([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})"'
         )
+        # Usernames picked by the minute watcher in its last round
+        self.streamers_watching = []
+        # HTTP connection pool and caches, shared with the other accounts of the process
+        self.shared = shared if shared is not None else SharedResources()
+        # Set by the miner when it ends, the loops below wait on it
+        self.stop_event = stop_event if stop_event is not None else StopEvent()
 
     def login(self):
         if not os.path.isfile(self.cookies_file):
+            # TwitchLogin has its own session, the shared one would wait by itself
+            self.shared.connectivity.wait()
             if self.twitch_login.login_flow():
                 self.twitch_login.save_cookies(self.cookies_file)
         else:
@@ -140,19 +153,20 @@ class Twitch(object):
 
             headers = {"User-Agent": USER_AGENTS["Linux"]["FIREFOX"]}
 
-            main_page_request = requests.get(
+            main_page_request = self.shared.http.get(
                 streamer.streamer_url, headers=headers)
             response = main_page_request.text
             # logger.info(response)
-            regex_settings = "(https://static.twitchcdn.net/config/settings.*?js|https://assets.twitch.tv/config/settings.*?.js)"
+            regex_settings = f"(https://static.twitchcdn.net/config/settings.*?js|https://assets.twitch.tv/config/settings.*?.js|{re.escape(URL)}/config/settings.*?js)"
             settings_url = re.search(regex_settings, response).group(1)
 
-            settings_request = requests.get(settings_url, headers=headers)
+            settings_request = self.shared.http.get(settings_url, headers=headers)
             response = settings_request.text
             regex_spade = '"spade_url":"(.*?)"'
             streamer.stream.spade_url = re.search(
                 regex_spade, response).group(1)
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, AttributeError) as e:
+            # AttributeError: no match, e.g. the page of an error
             logger.error(
                 f"Something went wrong during extraction of 'spade_url': {e}")
 
@@ -179,7 +193,7 @@ class Twitch(object):
                 return response["data"]["user"]
 
     def check_streamer_online(self, streamer):
-        if time.time() < streamer.offline_at + 60:
+        if Settings.clock.time() < streamer.offline_at + 60:
             return
 
         if streamer.is_online is False:
@@ -197,6 +211,9 @@ class Twitch(object):
                 streamer.set_offline()
 
     def get_channel_id(self, streamer_username):
+        channel_id = self.shared.get_channel_id(streamer_username)
+        if channel_id is not None:
+            return channel_id
         json_data = copy.deepcopy(GQLOperations.ReportMenuItem)
         json_data["variables"] = {"channelLogin": streamer_username}
         json_response = self.post_gql_request(json_data)
@@ -207,7 +224,9 @@ class Twitch(object):
         ):
             raise StreamerDoesNotExistException
         else:
-            return json_response["data"]["user"]["id"]
+            channel_id = json_response["data"]["user"]["id"]
+            self.shared.set_channel_id(streamer_username, channel_id)
+            return channel_id
 
     def get_followers(
         self, limit: int = 100, order: FollowersOrder = FollowersOrder.ASC
@@ -255,27 +274,15 @@ class Twitch(object):
             streamer.viewer_is_mod = False
 
     # === 'GLOBALS' METHODS === #
-    # Create chunk of sleep of speed-up the break loop after CTRL+C
-    def __chuncked_sleep(self, seconds, chunk_size=3):
-        sleep_time = max(seconds, 0) / chunk_size
-        for i in range(0, chunk_size):
-            time.sleep(sleep_time)
-            if self.running is False:
-                break
-
-    def __check_connection_handler(self, chunk_size):
+    def __check_connection_handler(self):
         # The success rate It's very hight usually. Why we have failed?
-        # Check internet connection ...
-        while internet_connection_available() is False:
-            random_sleep = random.randint(1, 3)
-            logger.warning(
-                f"No internet connection available! Retry after {random_sleep}m"
-            )
-            self.__chuncked_sleep(random_sleep * 60, chunk_size=chunk_size)
+        # The connectivity monitor saw the failed request, wait until it sees Twitch again.
+        # The monitor may be shared with other accounts that keep running, our own end wakes it too
+        self.shared.connectivity.wait(stop_event=self.stop_event)
 
     def post_gql_request(self, json_data):
         try:
-            response = requests.post(
+            response = self.shared.http.post(
                 GQLOperations.url,
                 json=json_data,
                 headers={
@@ -355,8 +362,12 @@ class Twitch(object):
             return False"""
 
     def update_client_version(self):
+        # Called for every GQL request, the main page is only fetched when the cached version expires
+        if self.shared.client_version_expired(Settings.clock.time()) is False:
+            self.client_version = self.shared.client_version
+            return self.client_version
         try:
-            response = requests.get(URL)
+            response = self.shared.http.get(URL)
             if response.status_code != 200:
                 logger.debug(
                     f"Error with update_client_version: {response.status_code}"
@@ -366,14 +377,17 @@ class Twitch(object):
             if not matcher:
                 logger.debug("Error with update_client_version: no match")
                 return self.client_version
-            self.client_version = matcher.group(1)
+            self.client_version = self.shared.client_version = matcher.group(1)
             logger.debug(f"Client version: {self.client_version}")
             return self.client_version
         except requests.exceptions.RequestException as e:
             logger.error(f"Error with update_client_version: {e}")
             return self.client_version
 
-    def send_minute_watched_events(self, streamers, priority, chunk_size=3):
+    def send_minute_watched_events(self, streamers, priority):
+        # Imported by the watcher thread rather than on the start-up path
+        import validators
+
         while self.running:
             try:
                 streamers_index = [
@@ -382,7 +396,7 @@ class Twitch(object):
                     if streamers[i].is_online is True
                     and (
                         streamers[i].online_at == 0
-                        or (time.time() - streamers[i].online_at) > 30
+                        or (Settings.clock.time() - streamers[i].online_at) > 30
                     )
                 ]
 
@@ -432,7 +446,7 @@ class Twitch(object):
                                 and (
                                     streamers[index].offline_at == 0
                                     or (
-                                        (time.time() -
+                                        (Settings.clock.time() -
                                          streamers[index].offline_at)
                                         // 60
                                     )
@@ -471,10 +485,13 @@ class Twitch(object):
                 We take the first two streamers from the list as they have the highest priority (based on order or WatchStreak).
                 """
                 streamers_watching = streamers_watching[:2]
+                self.streamers_watching = [
+                    streamers[index].username for index in streamers_watching
+                ]
 
                 for index in streamers_watching:
                     # next_iteration = time.time() + 60 / len(streamers_watching)
-                    next_iteration = time.time() + 20 / len(streamers_watching)
+                    next_iteration = Settings.clock.time() + 20 / len(streamers_watching)
 
                     try:
                         ####################################
@@ -522,10 +539,10 @@ class Twitch(object):
                         # encoded_value = quote(json.dumps(value))
 
                         # Construct the URL for the broadcast qualities
-                        RequestBroadcastQualitiesURL = f"https://usher.ttvnw.net/api/channel/hls/{streamers[index].username}.m3u8?sig={signature}&token={value}"
+                        RequestBroadcastQualitiesURL = f"{USHER_URL}/api/channel/hls/{streamers[index].username}.m3u8?sig={signature}&token={value}"
 
                         # Get list of video qualities
-                        responseBroadcastQualities = requests.get(
+                        responseBroadcastQualities = self.shared.http.get(
                             RequestBroadcastQualitiesURL,
                             headers={"User-Agent": self.user_agent},
                             timeout=20,
@@ -544,7 +561,7 @@ class Twitch(object):
                             continue
 
                         # Get list of video URLs
-                        responseStreamURLList = requests.get(
+                        responseStreamURLList = self.shared.http.get(
                             BroadcastLowestQualityURL,
                             headers={"User-Agent": self.user_agent},
                             timeout=20,
@@ -562,7 +579,7 @@ class Twitch(object):
                             continue
 
                         # Perform a HEAD request to simulate watching the stream
-                        responseStreamLowestQualityURL = requests.head(
+                        responseStreamLowestQualityURL = self.shared.http.head(
                             StreamLowestQualityURL,
                             headers={"User-Agent": self.user_agent},
                             timeout=20,
@@ -574,7 +591,7 @@ class Twitch(object):
                             continue
                         # End of fix for 2024/5 API Change
                         ##################################
-                        response = requests.post(
+                        response = self.shared.http.post(
                             streamers[index].stream.spade_url,
                             data=streamers[index].stream.encode_payload(),
                             headers={"User-Agent": self.user_agent},
@@ -644,18 +661,16 @@ class Twitch(object):
                     except requests.exceptions.ConnectionError as e:
                         logger.error(
                             f"Error while trying to send minute watched: {e}")
-                        self.__check_connection_handler(chunk_size)
+                        self.__check_connection_handler()
                     except requests.exceptions.Timeout as e:
                         logger.error(
                             f"Error while trying to send minute watched: {e}")
 
-                    self.__chuncked_sleep(
-                        next_iteration - time.time(), chunk_size=chunk_size
-                    )
+                    self.stop_event.sleep(next_iteration - Settings.clock.time())
 
                 if streamers_watching == []:
-                    # self.__chuncked_sleep(60, chunk_size=chunk_size)
-                    self.__chuncked_sleep(20, chunk_size=chunk_size)
+                    # self.stop_event.sleep(60)
+                    self.stop_event.sleep(20)
             except Exception:
                 logger.error(
                     "Exception raised in send minute watched", exc_info=True)
@@ -917,9 +932,10 @@ class Twitch(object):
                         drop.update(drop_dict["self"])
                         if drop.is_claimable is True:
                             drop.is_claimed = self.claim_drop(drop)
-                            time.sleep(random.uniform(5, 10))
+                            if self.stop_event.sleep(random.uniform(5, 10)):
+                                return
 
-    def sync_campaigns(self, streamers, chunk_size=3):
+    def sync_campaigns(self, streamers):
         campaigns_update = 0
         while self.running:
             try:
@@ -929,10 +945,10 @@ class Twitch(object):
                     # or ((time.time() - campaigns_update) / 60) > 60
                     # TEMPORARY AUTO DROP CLAIMING FIX
                     # 30 minutes instead of 60 minutes
-                    or ((time.time() - campaigns_update) / 30) > 30
+                    or ((Settings.clock.time() - campaigns_update) / 30) > 30
                     #####################################
                 ):
-                    campaigns_update = time.time()
+                    campaigns_update = Settings.clock.time()
 
                     # TEMPORARY AUTO DROP CLAIMING FIX
                     self.claim_all_drops_from_inventory()
@@ -977,9 +993,9 @@ class Twitch(object):
 
             except (ValueError, KeyError, requests.exceptions.ConnectionError) as e:
                 logger.error(f"Error while syncing inventory: {e}")
-                self.__check_connection_handler(chunk_size)
+                self.__check_connection_handler()
 
-            self.__chuncked_sleep(60, chunk_size=chunk_size)
+            self.stop_event.sleep(60)
 
     def contribute_to_community_goals(self, streamer):
         # Don't bother doing the request if no goal is currently started or in stock
@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+
+import heapq
+import json
+import logging
+import os
+import pickle
+import random
+import socket
+import struct
+import time
+from base64 import b64encode
+from hashlib import sha1
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from threading import Condition, Lock, Thread
+from urllib.parse import parse_qs, urlparse
+
+from TwitchChannelPointsMiner.classes.Clock import Clock
+from TwitchChannelPointsMiner.Simulation import USER_ID, SimulatedTwitch
+
+logger = logging.getLogger(__name__)
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+# Opcodes of the WebSocket frames
+TEXT, CLOSE, PING, PONG = 0x1, 0x8, 0x9, 0xA
+
+
+class RealtimeClock(Clock):
+    # Wall-clock time, with the callbacks of call_later() run by one thread under the lock of the
+    # fake Twitch: a day of stream events for hundreds of channels would be thousands of Timers
+    __slots__ = ["lock", "queue", "counter", "condition", "closed"]
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.queue = []
+        self.counter = 0
+        self.condition = Condition()
+        self.closed = False
+
+    def call_later(self, seconds, function, args=()):
+        with self.condition:
+            self.counter += 1
+            heapq.heappush(
+                self.queue, (self.time() + max(seconds, 0), self.counter, function, args)
+            )
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.closed is False and (
+                    self.queue == [] or self.queue[0][0] > self.time()
+                ):
+                    self.condition.wait(
+                        None if self.queue == [] else self.queue[0][0] - self.time()
+                    )
+                if self.closed is True:
+                    return
+                _, _, function, args = heapq.heappop(self.queue)
+            with self.lock:
+                try:
+                    function(*args)
+                except Exception:
+                    logger.error("Exception raised in a scheduled event", exc_info=True)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class PubSubConnection(object):
+    # One WebSocket client of the fake PubSub, on the socket of an HTTP request that upgraded
+    __slots__ = ["file", "connection", "topics", "lock", "closed"]
+
+    def __init__(self, file, connection):
+        self.file = file  # Buffered reader of the socket
+        self.connection = connection
+        self.topics = set()
+        self.lock = Lock()
+        self.closed = False
+
+    def receive(self):
+        # Returns (opcode, payload), the clients send unfragmented frames
+        header = self.file.read(2)
+        if len(header) < 2:
+            return CLOSE, b""
+        opcode = header[0] & 0x0F
+        length = header[1] & 0x7F
+        if length == 126:
+            length = struct.unpack("!H", self.file.read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", self.file.read(8))[0]
+        mask = self.file.read(4) if header[1] & 0x80 else b"\0\0\0\0"
+        payload = bytearray(self.file.read(length))
+        for index in range(0, len(payload)):
+            payload[index] ^= mask[index % 4]
+        return opcode, bytes(payload)
+
+    def send(self, payload, opcode=TEXT):
+        if isinstance(payload, dict):
+            payload = json.dumps(payload)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if len(payload) < 126:
+            header = struct.pack("!BB", 0x80 | opcode, len(payload))
+        elif len(payload) < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, len(payload))
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, len(payload))
+        with self.lock:
+            if self.closed is True:
+                return
+            try:
+                self.connection.sendall(header + payload)
+            except OSError:
+                self.closed = True
+
+    def close(self):
+        self.send(b"", CLOSE)
+        self.closed = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class FakeTwitch(object):
+    # A local Twitch for end-to-end tests of the miner, on two ports:
+    # - HTTP: GQL (batches too), the main and channel pages, usher, the playlists and spade,
+    #   answered by a SimulatedTwitch on the wall clock; PubSub, on /v1 of the same port
+    #   (LISTEN, UNLISTEN, PING, MESSAGE, RECONNECT)
+    # - IRC: enough of it for the chat to join and leave the channels
+    # The miner is pointed at it by the TWITCH_MINER_* variables of env().
+    # latency + uniform(0, jitter) seconds delay every HTTP answer, error_rate is the share of
+    # HTTP requests answered with a 503, reconnect_every sends RECONNECT to every PubSub client
+    # that many seconds after it connected.
+    __slots__ = [
+        "host",
+        "port",
+        "irc_port",
+        "latency",
+        "jitter",
+        "error_rate",
+        "reconnect_every",
+        "random",
+        "lock",
+        "clock",
+        "world",
+        "clients",
+        "http_server",
+        "irc_server",
+        "threads",
+    ]
+
+    def __init__(
+        self,
+        fixtures: dict,
+        host: str = "127.0.0.1",
+        port: int = 8080,
+        irc_port: int = 6667,
+        latency: float = 0,
+        jitter: float = 0,
+        error_rate: float = 0,
+        reconnect_every: float = None,
+        seed: int = None,
+    ):
+        self.host = host
+        self.port = port
+        self.irc_port = irc_port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.reconnect_every = reconnect_every
+        self.random = random.Random(seed)
+
+        self.lock = Lock()  # Held while the world model runs
+        self.clock = RealtimeClock(self.lock)
+        self.world = SimulatedTwitch(fixtures, self.clock, time.time())
+        self.world.deliver = self.deliver
+        self.clients = []
+        self.http_server = None
+        self.irc_server = None
+        self.threads = []
+
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def env(self):
+        return {
+            "TWITCH_MINER_URL": self.url(),
+            "TWITCH_MINER_GQL_URL": self.url(),
+            "TWITCH_MINER_USHER_URL": self.url(),
+            "TWITCH_MINER_WEBSOCKET": f"ws://{self.host}:{self.port}/v1",
+            "TWITCH_MINER_IRC": self.host,
+            "TWITCH_MINER_IRC_PORT": str(self.irc_port),
+        }
+
+    def start(self):
+        self.http_server = ThreadingHTTPServer((self.host, self.port), FakeTwitchHTTPHandler)
+        self.http_server.daemon_threads = True
+        self.http_server.fake = self
+        self.irc_server = FakeTwitchIRCServer((self.host, self.irc_port), FakeTwitchIRCHandler)
+        self.irc_server.fake = self
+        # The ports that were actually bound, when 0 was asked for
+        self.port = self.http_server.server_address[1]
+        self.irc_port = self.irc_server.server_address[1]
+        self.world.base = self.url()
+
+        self.world.start = time.time()
+        self.world.schedule_events()
+        for name, target in [
+            ("Fake Twitch HTTP", self.http_server.serve_forever),
+            ("Fake Twitch IRC", self.irc_server.serve_forever),
+            ("Fake Twitch events", self.clock.run),
+        ]:
+            thread = Thread(target=target, name=name)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.clock.close()
+        self.http_server.shutdown()
+        self.irc_server.shutdown()
+        with self.lock:
+            clients, self.clients = self.clients, []
+        for client in clients:
+            client.close()
+        self.http_server.server_close()
+        self.irc_server.server_close()
+        for thread in self.threads:
+            thread.join()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "uptime": round(time.time() - self.world.start),
+                "pubsub_clients": len(self.clients),
+                "bonus_claimed": self.world.claims,
+                "minutes_watched": round(
+                    sum(channel.watched for channel in self.world.channels.values()) / 60
+                ),
+                "requests": dict(sorted(self.world.requests.items())),
+            }
+
+    def write_cookies(self, username, directory="cookies"):
+        # A cookies file as TwitchLogin saves them, for an account of the fake Twitch:
+        # the miner loads it instead of logging in
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        cookies_file = os.path.join(directory, f"{username}.pkl")
+        with open(cookies_file, "wb") as f:
+            pickle.dump(
+                [
+                    {"name": "auth-token", "value": "fake"},
+                    {"name": "persistent", "value": f"{USER_ID}%3A%3Afake"},
+                ],
+                f,
+            )
+        return cookies_file
+
+    # === HTTP === #
+    def answer(self, method, path, body):
+        # Returns (status code, text), from the HTTP threads
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.random.random() < self.error_rate:
+            with self.lock:
+                self.world.requests["injected error"] += 1
+            return 503, ""
+        if path == "/_fake/stats":
+            return 200, json.dumps(self.stats())
+        if path == "/_fake/publish" and method == "POST":
+            # {"topic": ..., "channel": username, "type": ..., "data": {...}}, published at once
+            with self.lock:
+                try:
+                    topic_user = (
+                        USER_ID
+                        if body["topic"].endswith("-user-v1")
+                        else self.world.channels[body["channel"]].channel_id
+                    )
+                except (KeyError, TypeError) as e:
+                    return 400, f"Bad message: {e}"
+                self.world.publish(body["topic"], topic_user, body["type"], body.get("data"))
+            return 204, ""
+        with self.lock:
+            return self.world.answer(method, path, body)
+
+    # === PUBSUB === #
+    def serve_pubsub(self, client):
+        # Runs in the thread of the HTTP request that upgraded
+        with self.lock:
+            self.clients.append(client)
+            self.world.requests["pubsub connection"] += 1
+        if self.reconnect_every is not None:
+            self.clock.call_later(self.reconnect_every, client.send, ({"type": "RECONNECT"},))
+        try:
+            while client.closed is False:
+                opcode, payload = client.receive()
+                if opcode == CLOSE:
+                    break
+                elif opcode == PING:
+                    client.send(payload, PONG)
+                elif opcode == TEXT:
+                    self.pubsub_request(client, json.loads(payload))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                if client in self.clients:
+                    self.clients.remove(client)
+            client.close()
+
+    def pubsub_request(self, client, request):
+        with self.lock:
+            self.world.requests[f"pubsub {request['type']}"] += 1
+        if request["type"] == "PING":
+            client.send({"type": "PONG"})
+        elif request["type"] in ["LISTEN", "UNLISTEN"]:
+            topics = request.get("data", {}).get("topics", [])
+            error = ""
+            if request["type"] == "LISTEN":
+                if any(topic.split(".")[0].endswith("-user-v1") for topic in topics) and not request[
+                    "data"
+                ].get("auth_token"):
+                    error = "ERR_BADAUTH"
+                elif len(client.topics | set(topics)) > 50:
+                    error = "ERR_BADMESSAGE"
+                else:
+                    client.topics.update(topics)
+            else:
+                client.topics.difference_update(topics)
+            client.send({"type": "RESPONSE", "nonce": request.get("nonce"), "error": error})
+
+    def deliver(self, data):
+        # Called by the world model under the lock
+        for client in self.clients:
+            if data["topic"] in client.topics:
+                client.send({"type": "MESSAGE", "data": data})
+
+
+class FakeTwitchHTTPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the connection pools of the miner
+
+    def do_GET(self):
+        if self.path == "/v1" and self.headers.get("Upgrade", "").lower() == "websocket":
+            self.upgrade()
+        else:
+            self.answer()
+
+    def do_HEAD(self):
+        self.answer()
+
+    def do_POST(self):
+        self.answer()
+
+    def answer(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length) if length > 0 else b""
+        path = urlparse(self.path).path
+        body = None
+        if raw != b"":
+            # Spade takes form fields, the rest JSON
+            if path == "/track":
+                body = {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+            else:
+                body = json.loads(raw)
+        status, content = self.server.fake.answer(self.command, path, body)
+        content = content.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    def upgrade(self):
+        key = self.headers["Sec-WebSocket-Key"]
+        accept = b64encode(sha1((key + WEBSOCKET_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.server.fake.serve_pubsub(PubSubConnection(self.rfile, self.connection))
+        self.close_connection = True
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+class FakeTwitchIRCServer(ThreadingTCPServer):
+    # Like the HTTPServer, restarts don't wait for the sockets of the previous run
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FakeTwitchIRCHandler(StreamRequestHandler):
+    # PASS, NICK and USER, then the welcome; JOIN, PART, PING and QUIT
+    def handle(self):
+        fake = self.server.fake
+        nickname = None
+        for line in self.rfile:
+            command, _, argument = line.decode("utf-8", "replace").strip().partition(" ")
+            command = command.upper()
+            if command == "NICK":
+                nickname = argument
+            elif command == "USER":
+                self.send(f":tmi.twitch.tv 001 {nickname} :Welcome, GLHF!")
+            elif command in ["JOIN", "PART"]:
+                with fake.lock:
+                    fake.world.requests[f"irc {command}"] += 1
+                self.send(f":{nickname}!{nickname}@{nickname}.tmi.twitch.tv {command} {argument}")
+            elif command == "PING":
+                self.send(f"PONG {argument}")
+            elif command == "QUIT":
+                break
+
+    def send(self, line):
+        self.wfile.write(f"{line}\r\n".encode("utf-8"))
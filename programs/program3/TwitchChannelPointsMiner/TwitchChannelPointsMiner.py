@@ -19,15 +19,18 @@ from TwitchChannelPointsMiner.classes.entities.Streamer import (
 )
 from TwitchChannelPointsMiner.classes.Exceptions import StreamerDoesNotExistException
 from TwitchChannelPointsMiner.classes.Settings import FollowersOrder, Priority, Settings
+from TwitchChannelPointsMiner.classes.SharedResources import SharedResources
+from TwitchChannelPointsMiner.classes.StatusPublisher import StatusPublisher
+from TwitchChannelPointsMiner.classes.StopEvent import StopEvent
 from TwitchChannelPointsMiner.classes.Twitch import Twitch
 from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
 from TwitchChannelPointsMiner.logger import LoggerSettings, configure_loggers
 from TwitchChannelPointsMiner.utils import (
     _millify,
     at_least_one_value_in_settings_is,
-    check_versions,
+    get_current_version,
+    get_github_version,
     get_user_agent,
-    internet_connection_available,
     set_default_settings,
 )
 
@@ -49,6 +52,32 @@ logging.getLogger("websocket").setLevel(logging.ERROR)
 logger = logging.getLogger(__name__)
 
 
+def check_latest_version():
+    # Check for the latest version of the script, GitHub is asked in the background
+    current_version = get_current_version()
+
+    logger.info(
+        f"Twitch Channel Points Miner v2-{current_version} (fork by rdavydov)"
+    )
+    logger.info("https://github.com/rdavydov/Twitch-Channel-Points-Miner-v2")
+
+    def compare():
+        github_version = get_github_version(
+            cache_file=os.path.join(Path().absolute(), ".latest_version.json")
+        )
+        if github_version == "0.0.0":
+            logger.error(
+                "Unable to detect if you have the latest version of this script"
+            )
+        elif current_version != github_version:
+            logger.info(f"You are running version {current_version} of this script")
+            logger.info(f"The latest version on GitHub is {github_version}")
+
+    thread = threading.Thread(target=compare, name="Version check")
+    thread.daemon = True
+    thread.start()
+
+
 class TwitchChannelPointsMiner:
     __slots__ = [
         "username",
@@ -69,6 +98,13 @@ class TwitchChannelPointsMiner:
         "original_streamers",
         "logs_file",
         "queue_listener",
+        "heartbeat_file",
+        "status_publisher",
+        "stop_event",
+        "shared",
+        "hosted",
+        "streamer_settings",
+        "analytics_path",
     ]
 
     def __init__(
@@ -85,6 +121,8 @@ class TwitchChannelPointsMiner:
         logger_settings: LoggerSettings = LoggerSettings(),
         # Default values for all streamers
         streamer_settings: StreamerSettings = StreamerSettings(),
+        # Set by MultiAccountRunner, shared with the other accounts of the process
+        shared: SharedResources = None,
     ):
         # Fixes TypeError: 'NoneType' object is not subscriptable
         if not username or username == "your-twitch-username":
@@ -97,33 +135,23 @@ class TwitchChannelPointsMiner:
 
         Settings.disable_at_in_nickname = disable_at_in_nickname
 
-        import socket
+        # A hosted miner leaves the connectivity and version checks, the logs and the signals to its runner
+        self.hosted = shared is not None
+        self.shared = shared if shared is not None else SharedResources()
 
-        def is_connected():
-            try:
-                # resolve the IP address of the Twitch.tv domain name
-                socket.gethostbyname("twitch.tv")
-                return True
-            except OSError:
-                pass
-            return False
-
-        # check for Twitch.tv connectivity every 5 seconds
-        error_printed = False
-        while not is_connected():
-            if not error_printed:
-                logger.error("Waiting for Twitch.tv connectivity...")
-                error_printed = True
-            time.sleep(5)
+        # Login and streamer loading don't wait for it, their requests do
+        if self.hosted is False:
+            self.shared.connectivity.start()
 
         # Analytics switch
         Settings.enable_analytics = enable_analytics
 
+        self.analytics_path = None
         if enable_analytics is True:
-            Settings.analytics_path = os.path.join(
+            self.analytics_path = Settings.analytics_path = os.path.join(
                 Path().absolute(), "analytics", username
             )
-            Path(Settings.analytics_path).mkdir(parents=True, exist_ok=True)
+            Path(self.analytics_path).mkdir(parents=True, exist_ok=True)
 
         self.username = username
 
@@ -134,10 +162,19 @@ class TwitchChannelPointsMiner:
         streamer_settings.default()
         streamer_settings.bet.default()
         Settings.streamer_settings = streamer_settings
+        self.streamer_settings = streamer_settings
 
         # user_agent = get_user_agent("FIREFOX")
         user_agent = get_user_agent("CHROME")
-        self.twitch = Twitch(self.username, user_agent, password)
+        # Set by stop(), every long wait of the miner's threads is a wait on it
+        self.stop_event = StopEvent()
+        self.twitch = Twitch(
+            self.username,
+            user_agent,
+            password,
+            shared=self.shared,
+            stop_event=self.stop_event,
+        )
 
         self.claim_drops_startup = claim_drops_startup
         self.priority = priority if isinstance(priority, list) else [priority]
@@ -153,28 +190,23 @@ class TwitchChannelPointsMiner:
         self.start_datetime = None
         self.original_streamers = []
 
-        self.logs_file, self.queue_listener = configure_loggers(
-            self.username, logger_settings
-        )
-
-        # Check for the latest version of the script
-        current_version, github_version = check_versions()
-
-        logger.info(
-            f"Twitch Channel Points Miner v2-{current_version} (fork by rdavydov)"
-        )
-        logger.info("https://github.com/rdavydov/Twitch-Channel-Points-Miner-v2")
+        # Touched from the main loop so a supervisor can tell a hung miner from a quiet one
+        self.heartbeat_file = os.environ.get("TWITCH_MINER_HEARTBEAT_FILE")
+        # Structured state for a supervisor, only when it gave us a pipe
+        self.status_publisher = None
 
-        if github_version == "0.0.0":
-            logger.error(
-                "Unable to detect if you have the latest version of this script"
+        if self.shared.queue_listener is None:
+            self.shared.logs_file, self.shared.queue_listener = configure_loggers(
+                self.username, logger_settings
             )
-        elif current_version != github_version:
-            logger.info(f"You are running version {current_version} of this script")
-            logger.info(f"The latest version on GitHub is {github_version}")
+        self.logs_file = self.shared.logs_file
+        self.queue_listener = self.shared.queue_listener
+
+        if self.hosted is False:
+            check_latest_version()
 
-        for sign in [signal.SIGINT, signal.SIGSEGV, signal.SIGTERM]:
-            signal.signal(sign, self.end)
+            for sign in [signal.SIGINT, signal.SIGSEGV, signal.SIGTERM]:
+                signal.signal(sign, self.end)
 
     def analytics(
         self,
@@ -185,6 +217,13 @@ class TwitchChannelPointsMiner:
     ):
         # Analytics switch
         if Settings.enable_analytics is True:
+            # A supervisor that serves every account's analytics itself sets this variable
+            if os.environ.get("TWITCH_MINER_DISABLE_ANALYTICS_SERVER") == "1":
+                logger.info(
+                    "Analytics server disabled, the analytics are served by the supervisor"
+                )
+                return
+
             from TwitchChannelPointsMiner.classes.AnalyticsServer import AnalyticsServer
 
             days_ago = days_ago if days_ago <= 365 * 15 else 365 * 15
@@ -270,11 +309,12 @@ class TwitchChannelPointsMiner:
                         )
                         streamer.channel_id = self.twitch.get_channel_id(username)
                         streamer.settings = set_default_settings(
-                            streamer.settings, Settings.streamer_settings
+                            streamer.settings, self.streamer_settings
                         )
                         streamer.settings.bet = set_default_settings(
-                            streamer.settings.bet, Settings.streamer_settings.bet
+                            streamer.settings.bet, self.streamer_settings.bet
                         )
+                        streamer.analytics_path = self.analytics_path
                         if streamer.settings.chat != ChatPresence.NEVER:
                             streamer.irc_chat = ThreadChat(
                                 self.username,
@@ -319,7 +359,7 @@ class TwitchChannelPointsMiner:
                 )
                 self.sync_campaigns_thread.name = "Sync campaigns/inventory"
                 self.sync_campaigns_thread.start()
-                time.sleep(30)
+                self.stop_event.sleep(30)
 
             self.minute_watcher_thread = threading.Thread(
                 target=self.twitch.send_minute_watched_events,
@@ -332,6 +372,7 @@ class TwitchChannelPointsMiner:
                 twitch=self.twitch,
                 streamers=self.streamers,
                 events_predictions=self.events_predictions,
+                hub=self.shared.pubsub_hub,
             )
 
             # Subscribe to community-points-user. Get update for points spent or gains
@@ -382,35 +423,51 @@ class TwitchChannelPointsMiner:
                         PubsubTopic("community-points-channel-v1", streamer=streamer)
                     )
 
-            refresh_context = time.time()
+            # The status channel describes one miner, hosted miners don't have one
+            if self.hosted is False:
+                self.status_publisher = StatusPublisher.from_env(self)
+            if self.status_publisher is not None:
+                self.status_publisher.start()
+
+            refresh_context = Settings.clock.time()
             while self.running:
-                time.sleep(random.uniform(20, 60))
-                # Do an external control for WebSocket. Check if the thread is running
-                # Check if is not None because maybe we have already created a new connection on array+1 and now index is None
-                for index in range(0, len(self.ws_pool.ws)):
-                    if (
-                        self.ws_pool.ws[index].is_reconnecting is False
-                        and self.ws_pool.ws[index].elapsed_last_ping() > 10
-                        and internet_connection_available() is True
-                    ):
-                        logger.info(
-                            f"#{index} - The last PING was sent more than 10 minutes ago. Reconnecting to the WebSocket..."
-                        )
-                        WebSocketsPool.handle_reconnection(self.ws_pool.ws[index])
+                self.__heartbeat()
+                if self.stop_event.sleep(random.uniform(20, 60)):
+                    break
+                self.ws_pool.check_connections()
 
-                if ((time.time() - refresh_context) // 60) >= 30:
-                    refresh_context = time.time()
+                if ((Settings.clock.time() - refresh_context) // 60) >= 30:
+                    refresh_context = Settings.clock.time()
                     for index in range(0, len(self.streamers)):
                         if self.streamers[index].is_online:
                             self.twitch.load_channel_points_context(
                                 self.streamers[index]
                             )
 
+    def __heartbeat(self):
+        if self.heartbeat_file is not None:
+            try:
+                Path(self.heartbeat_file).touch()
+            except OSError as e:
+                logger.debug(f"Unable to write the heartbeat file: {e}")
+
     def end(self, signum, frame):
         if not self.running:
             return
-        
+
         logger.info("CTRL+C Detected! Please wait just a moment!")
+        self.stop()
+
+        # Stop the queue listener to make sure all messages have been logged
+        if self.hosted is False:
+            self.queue_listener.stop()
+
+        sys.exit(0)
+
+    def stop(self):
+        # Everything end() does but leaving the process, a runner hosting several accounts calls it
+        if not self.running:
+            return
 
         for streamer in self.streamers:
             if (
@@ -422,6 +479,10 @@ class TwitchChannelPointsMiner:
                     streamer.irc_chat.join()
 
         self.running = self.twitch.running = False
+        self.stop_event.set()
+        # Releases the requests and reconnections waiting for Twitch
+        if self.hosted is False:
+            self.shared.connectivity.close()
         if self.ws_pool is not None:
             self.ws_pool.end()
 
@@ -438,12 +499,10 @@ class TwitchChannelPointsMiner:
                 streamer.mutex.acquire()
                 streamer.mutex.release()
 
-        self.__print_report()
-
-        # Stop the queue listener to make sure all messages have been logged
-        self.queue_listener.stop()
+        if self.status_publisher is not None:
+            self.status_publisher.stop()
 
-        sys.exit(0)
+        self.__print_report()
 
     def __print_report(self):
         print("\n")
@@ -0,0 +1,51 @@
+import logging
+from threading import Lock
+
+from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+
+logger = logging.getLogger(__name__)
+
+
+class PubSubHub(WebSocketsPool):
+    # PubSub connections shared by the accounts of a process for the channel topics
+    # (video-playback-by-id, raid, predictions-channel-v1, ...), which need no auth.
+    # Each channel topic is listened to once, its messages are dispatched to every pool
+    # that subscribed to it. The user topics stay on the pool of each account.
+    __slots__ = ["subscribers", "lock"]
+
+    def __init__(self, connectivity):
+        super().__init__(
+            twitch=None, streamers=[], events_predictions={}, connectivity=connectivity
+        )
+        self.subscribers = {}
+        self.lock = Lock()
+
+    def subscribe(self, pool, topic):
+        key = str(topic)
+        with self.lock:
+            pools = self.subscribers.setdefault(key, [])
+            if pool in pools:
+                return
+            pools.append(pool)
+            if len(pools) == 1:
+                self.submit(topic)
+            else:
+                logger.debug(f"Topic {key} shared by {len(pools)} accounts")
+
+    def unsubscribe(self, pool):
+        # The hub keeps listening, a topic without subscribers costs nothing but a slot
+        with self.lock:
+            for pools in self.subscribers.values():
+                if pool in pools:
+                    pools.remove(pool)
+
+    def auth_token(self):
+        return None
+
+    def dispatch(self, message):
+        with self.lock:
+            pools = list(
+                self.subscribers.get(f"{message.topic}.{message.topic_user}", [])
+            )
+        for pool in pools:
+            pool.dispatch(message)
@@ -1,5 +1,7 @@
 from enum import Enum, auto
 
+from TwitchChannelPointsMiner.classes.Clock import Clock
+
 
 class Priority(Enum):
     ORDER = auto()
@@ -21,7 +23,12 @@ class FollowersOrder(Enum):
 # Empty object shared between class
 class Settings(object):
     __slots__ = ["logger", "streamer_settings",
-                 "enable_analytics", "disable_ssl_cert_verification", "disable_at_in_nickname"]
+                 "enable_analytics", "disable_ssl_cert_verification", "disable_at_in_nickname",
+                 "clock"]
+
+
+# Replaced by a VirtualClock in the simulation
+Settings.clock = Clock()
 
 
 class Events(Enum):
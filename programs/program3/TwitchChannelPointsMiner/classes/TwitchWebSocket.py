@@ -1,9 +1,9 @@
 import json
 import logging
-import time
 
 from websocket import WebSocketApp, WebSocketConnectionClosedException
 
+from TwitchChannelPointsMiner.classes.Settings import Settings
 from TwitchChannelPointsMiner.utils import create_nonce
 
 logger = logging.getLogger(__name__)
@@ -32,8 +32,8 @@ class TwitchWebSocket(WebSocketApp):
         self.last_message_timestamp = None
         self.last_message_type_channel = None
 
-        self.last_pong = time.time()
-        self.last_ping = time.time()
+        self.last_pong = Settings.clock.time()
+        self.last_ping = Settings.clock.time()
 
     # def close(self):
     #     self.forced_close = True
@@ -48,7 +48,7 @@ class TwitchWebSocket(WebSocketApp):
 
     def ping(self):
         self.send({"type": "PING"})
-        self.last_ping = time.time()
+        self.last_ping = Settings.clock.time()
 
     def send(self, request):
         try:
@@ -59,7 +59,7 @@ class TwitchWebSocket(WebSocketApp):
             self.is_closed = True
 
     def elapsed_last_pong(self):
-        return (time.time() - self.last_pong) // 60
+        return (Settings.clock.time() - self.last_pong) // 60
 
     def elapsed_last_ping(self):
-        return (time.time() - self.last_ping) // 60
+        return (Settings.clock.time() - self.last_ping) // 60
@@ -1,36 +1,49 @@
 import json
 import logging
 import random
-import time
 # import os
-from threading import Thread, Timer
+from threading import Thread
 # from pathlib import Path
 
-from dateutil import parser
-
 from TwitchChannelPointsMiner.classes.entities.CommunityGoal import CommunityGoal
 from TwitchChannelPointsMiner.classes.entities.EventPrediction import EventPrediction
 from TwitchChannelPointsMiner.classes.entities.Message import Message
 from TwitchChannelPointsMiner.classes.entities.Raid import Raid
 from TwitchChannelPointsMiner.classes.Settings import Events, Settings
+from TwitchChannelPointsMiner.classes.StopEvent import StopEvent
 from TwitchChannelPointsMiner.classes.TwitchWebSocket import TwitchWebSocket
 from TwitchChannelPointsMiner.constants import WEBSOCKET
-from TwitchChannelPointsMiner.utils import (
-    get_streamer_index,
-    internet_connection_available,
-)
+from TwitchChannelPointsMiner.utils import get_streamer_index
 
 logger = logging.getLogger(__name__)
 
 
 class WebSocketsPool:
-    __slots__ = ["ws", "twitch", "streamers", "events_predictions"]
-
-    def __init__(self, twitch, streamers, events_predictions):
+    __slots__ = [
+        "ws",
+        "twitch",
+        "streamers",
+        "events_predictions",
+        "hub",
+        "connectivity",
+        "stop_event",
+    ]
+
+    def __init__(
+        self, twitch, streamers, events_predictions, hub=None, connectivity=None
+    ):
         self.ws = []
         self.twitch = twitch
+        # ConnectivityMonitor of the process, the reconnections wait for it
+        self.connectivity = (
+            connectivity if connectivity is not None else twitch.shared.connectivity
+        )
+        # Set by end(), the pings and the reconnections wait on it
+        self.stop_event = StopEvent()
         self.streamers = streamers
         self.events_predictions = events_predictions
+        # PubSubHub shared by the accounts of the process, it listens to the channel topics
+        self.hub = hub
 
     """
     API Limits
@@ -40,6 +53,10 @@ class WebSocketsPool:
     """
 
     def submit(self, topic):
+        if self.hub is not None and topic.is_user_topic() is False:
+            self.hub.subscribe(self, topic)
+            return
+
         # Check if we need to create a new WebSocket instance
         if self.ws == [] or len(self.ws[-1].topics) >= 50:
             self.ws.append(self.__new(len(self.ws)))
@@ -55,7 +72,10 @@ class WebSocketsPool:
         if self.ws[index].is_opened is False:
             self.ws[index].pending_topics.append(topic)
         else:
-            self.ws[index].listen(topic, self.twitch.twitch_login.get_auth_token())
+            self.ws[index].listen(topic, self.auth_token())
+
+    def auth_token(self):
+        return self.twitch.twitch_login.get_auth_token()
 
     def __new(self, index):
         return TwitchWebSocket(
@@ -86,10 +106,27 @@ class WebSocketsPool:
         thread_ws.start()
 
     def end(self):
+        self.stop_event.set()
+        if self.hub is not None:
+            self.hub.unsubscribe(self)
         for index in range(0, len(self.ws)):
             self.ws[index].forced_close = True
             self.ws[index].close()
 
+    def check_connections(self):
+        # Do an external control for WebSocket. Check if the thread is running
+        # Check if is not None because maybe we have already created a new connection on array+1 and now index is None
+        for index in range(0, len(self.ws)):
+            if (
+                self.ws[index].is_reconnecting is False
+                and self.ws[index].elapsed_last_ping() > 10
+                and self.connectivity.is_ready() is True
+            ):
+                logger.info(
+                    f"#{index} - The last PING was sent more than 10 minutes ago. Reconnecting to the WebSocket..."
+                )
+                WebSocketsPool.handle_reconnection(self.ws[index])
+
     @staticmethod
     def on_open(ws):
         def run():
@@ -97,14 +134,15 @@ class WebSocketsPool:
             ws.ping()
 
             for topic in ws.pending_topics:
-                ws.listen(topic, ws.twitch.twitch_login.get_auth_token())
+                ws.listen(topic, ws.parent_pool.auth_token())
 
             while ws.is_closed is False:
                 # Else: the ws is currently in reconnecting phase, you can't do ping or other operation.
                 # Probably this ws will be closed very soon with ws.is_closed = True
                 if ws.is_reconnecting is False:
                     ws.ping()  # We need ping for keep the connection alive
-                    time.sleep(random.uniform(25, 30))
+                    if ws.parent_pool.stop_event.sleep(random.uniform(25, 30)):
+                        break
 
                     if ws.elapsed_last_pong() > 5:
                         logger.info(
@@ -145,22 +183,24 @@ class WebSocketsPool:
                 logger.info(
                     f"#{ws.index} - Reconnecting to Twitch PubSub server in ~60 seconds"
                 )
-                time.sleep(30)
+                # Why not create a new ws on the same array index? Let's try.
+                self = ws.parent_pool
+                if self.stop_event.sleep(30):
+                    return
 
-                while internet_connection_available() is False:
-                    random_sleep = random.randint(1, 3)
+                if self.connectivity.is_ready() is False:
                     logger.warning(
-                        f"#{ws.index} - No internet connection available! Retry after {random_sleep}m"
+                        f"#{ws.index} - No internet connection available! Waiting for it to come back"
                     )
-                    time.sleep(random_sleep * 60)
+                    if self.connectivity.wait(stop_event=self.stop_event) is False:
+                        return  # Closed, the miner is ending
 
-                # Why not create a new ws on the same array index? Let's try.
-                self = ws.parent_pool
                 # Create a new connection.
                 self.ws[ws.index] = self.__new(ws.index)
 
                 self.__start(ws.index)  # Start a new thread.
-                time.sleep(30)
+                if self.stop_event.sleep(30):
+                    return
 
                 for topic in ws.topics:
                     self.__submit(ws.index, topic)
@@ -187,243 +227,7 @@ class WebSocketsPool:
             ws.last_message_timestamp = message.timestamp
             ws.last_message_type_channel = message.identifier
 
-            streamer_index = get_streamer_index(ws.streamers, message.channel_id)
-            if streamer_index != -1:
-                try:
-                    if message.topic == "community-points-user-v1":
-                        if message.type in ["points-earned", "points-spent"]:
-                            balance = message.data["balance"]["balance"]
-                            ws.streamers[streamer_index].channel_points = balance
-                            # Analytics switch
-                            if Settings.enable_analytics is True:
-                                ws.streamers[streamer_index].persistent_series(
-                                    event_type=message.data["point_gain"]["reason_code"]
-                                    if message.type == "points-earned"
-                                    else "Spent"
-                                )
-
-                        if message.type == "points-earned":
-                            earned = message.data["point_gain"]["total_points"]
-                            reason_code = message.data["point_gain"]["reason_code"]
-
-                            logger.info(
-                                f"+{earned} → {ws.streamers[streamer_index]} - Reason: {reason_code}.",
-                                extra={
-                                    "emoji": ":rocket:",
-                                    "event": Events.get(f"GAIN_FOR_{reason_code}"),
-                                },
-                            )
-                            ws.streamers[streamer_index].update_history(
-                                reason_code, earned
-                            )
-                            # Analytics switch
-                            if Settings.enable_analytics is True:
-                                ws.streamers[streamer_index].persistent_annotations(
-                                    reason_code, f"+{earned} - {reason_code}"
-                                )
-                        elif message.type == "claim-available":
-                            ws.twitch.claim_bonus(
-                                ws.streamers[streamer_index],
-                                message.data["claim"]["id"],
-                            )
-
-                    elif message.topic == "video-playback-by-id":
-                        # There is stream-up message type, but it's sent earlier than the API updates
-                        if message.type == "stream-up":
-                            ws.streamers[streamer_index].stream_up = time.time()
-                        elif message.type == "stream-down":
-                            if ws.streamers[streamer_index].is_online is True:
-                                ws.streamers[streamer_index].set_offline()
-                        elif message.type == "viewcount":
-                            if ws.streamers[streamer_index].stream_up_elapsed():
-                                ws.twitch.check_streamer_online(
-                                    ws.streamers[streamer_index]
-                                )
-
-                    elif message.topic == "raid":
-                        if message.type == "raid_update_v2":
-                            raid = Raid(
-                                message.message["raid"]["id"],
-                                message.message["raid"]["target_login"],
-                            )
-                            ws.twitch.update_raid(ws.streamers[streamer_index], raid)
-
-                    elif message.topic == "community-moments-channel-v1":
-                        if message.type == "active":
-                            ws.twitch.claim_moment(
-                                ws.streamers[streamer_index], message.data["moment_id"]
-                            )
-
-                    elif message.topic == "predictions-channel-v1":
-
-                        event_dict = message.data["event"]
-                        event_id = event_dict["id"]
-                        event_status = event_dict["status"]
-
-                        current_tmsp = parser.parse(message.timestamp)
-
-                        if (
-                            message.type == "event-created"
-                            and event_id not in ws.events_predictions
-                        ):
-                            if event_status == "ACTIVE":
-                                prediction_window_seconds = float(
-                                    event_dict["prediction_window_seconds"]
-                                )
-                                # Reduce prediction window by 3/6s - Collect more accurate data for decision
-                                prediction_window_seconds = ws.streamers[
-                                    streamer_index
-                                ].get_prediction_window(prediction_window_seconds)
-                                event = EventPrediction(
-                                    ws.streamers[streamer_index],
-                                    event_id,
-                                    event_dict["title"],
-                                    parser.parse(event_dict["created_at"]),
-                                    prediction_window_seconds,
-                                    event_status,
-                                    event_dict["outcomes"],
-                                )
-                                if (
-                                    ws.streamers[streamer_index].is_online
-                                    and event.closing_bet_after(current_tmsp) > 0
-                                ):
-                                    streamer = ws.streamers[streamer_index]
-                                    bet_settings = streamer.settings.bet
-                                    if (
-                                        bet_settings.minimum_points is None
-                                        or streamer.channel_points
-                                        > bet_settings.minimum_points
-                                    ):
-                                        ws.events_predictions[event_id] = event
-                                        start_after = event.closing_bet_after(
-                                            current_tmsp
-                                        )
-
-                                        place_bet_thread = Timer(
-                                            start_after,
-                                            ws.twitch.make_predictions,
-                                            (ws.events_predictions[event_id],),
-                                        )
-                                        place_bet_thread.daemon = True
-                                        place_bet_thread.start()
-
-                                        logger.info(
-                                            f"Place the bet after: {start_after}s for: {ws.events_predictions[event_id]}",
-                                            extra={
-                                                "emoji": ":alarm_clock:",
-                                                "event": Events.BET_START,
-                                            },
-                                        )
-                                    else:
-                                        logger.info(
-                                            f"{streamer} have only {streamer.channel_points} channel points and the minimum for bet is: {bet_settings.minimum_points}",
-                                            extra={
-                                                "emoji": ":pushpin:",
-                                                "event": Events.BET_FILTERS,
-                                            },
-                                        )
-
-                        elif (
-                            message.type == "event-updated"
-                            and event_id in ws.events_predictions
-                        ):
-                            ws.events_predictions[event_id].status = event_status
-                            # Game over we can't update anymore the values... The bet was placed!
-                            if (
-                                ws.events_predictions[event_id].bet_placed is False
-                                and ws.events_predictions[event_id].bet.decision == {}
-                            ):
-                                ws.events_predictions[event_id].bet.update_outcomes(
-                                    event_dict["outcomes"]
-                                )
-
-                    elif message.topic == "predictions-user-v1":
-                        event_id = message.data["prediction"]["event_id"]
-                        if event_id in ws.events_predictions:
-                            event_prediction = ws.events_predictions[event_id]
-                            if (
-                                message.type == "prediction-result"
-                                and event_prediction.bet_confirmed
-                            ):
-                                points = event_prediction.parse_result(
-                                    message.data["prediction"]["result"]
-                                )
-
-                                decision = event_prediction.bet.get_decision()
-                                choice = event_prediction.bet.decision["choice"]
-
-                                logger.info(
-                                    (
-                                        f"{event_prediction} - Decision: {choice}: {decision['title']} "
-                                        f"({decision['color']}) - Result: {event_prediction.result['string']}"
-                                    ),
-                                    extra={
-                                        "emoji": ":bar_chart:",
-                                        "event": Events.get(
-                                            f"BET_{event_prediction.result['type']}"
-                                        ),
-                                    },
-                                )
-
-                                ws.streamers[streamer_index].update_history(
-                                    "PREDICTION", points["gained"]
-                                )
-
-                                # Remove duplicate history records from previous message sent in community-points-user-v1
-                                if event_prediction.result["type"] == "REFUND":
-                                    ws.streamers[streamer_index].update_history(
-                                        "REFUND",
-                                        -points["placed"],
-                                        counter=-1,
-                                    )
-                                elif event_prediction.result["type"] == "WIN":
-                                    ws.streamers[streamer_index].update_history(
-                                        "PREDICTION",
-                                        -points["won"],
-                                        counter=-1,
-                                    )
-
-                                if event_prediction.result["type"]:
-                                    # Analytics switch
-                                    if Settings.enable_analytics is True:
-                                        ws.streamers[
-                                            streamer_index
-                                        ].persistent_annotations(
-                                            event_prediction.result["type"],
-                                            f"{ws.events_predictions[event_id].title}",
-                                        )
-                            elif message.type == "prediction-made":
-                                event_prediction.bet_confirmed = True
-                                # Analytics switch
-                                if Settings.enable_analytics is True:
-                                    ws.streamers[streamer_index].persistent_annotations(
-                                        "PREDICTION_MADE",
-                                        f"Decision: {event_prediction.bet.decision['choice']} - {event_prediction.title}",
-                                    )
-                    elif message.topic == "community-points-channel-v1":
-                        if message.type == "community-goal-created":
-                            # TODO Untested, hard to find this happening live
-                            ws.streamers[streamer_index].add_community_goal(
-                                CommunityGoal.from_pubsub(message.data["community_goal"])
-                            )
-                        elif message.type == "community-goal-updated":
-                            ws.streamers[streamer_index].update_community_goal(
-                                CommunityGoal.from_pubsub(message.data["community_goal"])
-                            )
-                        elif message.type == "community-goal-deleted":
-                            # TODO Untested, not sure what the message format for this is,
-                            #      https://github.com/sammwyy/twitch-ps/blob/master/main.js#L417
-                            #      suggests that it should be just the entire, now deleted, goal model
-                            ws.streamers[streamer_index].delete_community_goal(message.data["community_goal"]["id"])
-
-                        if message.type in ["community-goal-updated", "community-goal-created"]:
-                            ws.twitch.contribute_to_community_goals(ws.streamers[streamer_index])
-
-                except Exception:
-                    logger.error(
-                        f"Exception raised for topic: {message.topic} and message: {message}",
-                        exc_info=True,
-                    )
+            ws.parent_pool.dispatch(message)
 
         elif response["type"] == "RESPONSE" and len(response.get("error", "")) > 0:
             # raise RuntimeError(f"Error while trying to listen for a topic: {response}")
@@ -451,4 +255,249 @@ class WebSocketsPool:
             WebSocketsPool.handle_reconnection(ws)
 
         elif response["type"] == "PONG":
-            ws.last_pong = time.time()
+            ws.last_pong = Settings.clock.time()
+
+    def dispatch(self, message):
+        # A PubSubHub calls this too, for the channel topics it listens to for this pool
+        WebSocketsPool.handle_message(self, message)
+
+    @staticmethod
+    def handle_message(ws, message):
+        # ws: anything with the twitch, streamers and events_predictions of an account
+        streamer_index = get_streamer_index(ws.streamers, message.channel_id)
+        if streamer_index != -1:
+            try:
+                if message.topic == "community-points-user-v1":
+                    if message.type in ["points-earned", "points-spent"]:
+                        balance = message.data["balance"]["balance"]
+                        ws.streamers[streamer_index].channel_points = balance
+                        # Analytics switch
+                        if Settings.enable_analytics is True:
+                            ws.streamers[streamer_index].persistent_series(
+                                event_type=message.data["point_gain"]["reason_code"]
+                                if message.type == "points-earned"
+                                else "Spent"
+                            )
+
+                    if message.type == "points-earned":
+                        earned = message.data["point_gain"]["total_points"]
+                        reason_code = message.data["point_gain"]["reason_code"]
+
+                        logger.info(
+                            f"+{earned} → {ws.streamers[streamer_index]} - Reason: {reason_code}.",
+                            extra={
+                                "emoji": ":rocket:",
+                                "event": Events.get(f"GAIN_FOR_{reason_code}"),
+                            },
+                        )
+                        ws.streamers[streamer_index].update_history(
+                            reason_code, earned
+                        )
+                        # Analytics switch
+                        if Settings.enable_analytics is True:
+                            ws.streamers[streamer_index].persistent_annotations(
+                                reason_code, f"+{earned} - {reason_code}"
+                            )
+                    elif message.type == "claim-available":
+                        ws.twitch.claim_bonus(
+                            ws.streamers[streamer_index],
+                            message.data["claim"]["id"],
+                        )
+
+                elif message.topic == "video-playback-by-id":
+                    # There is stream-up message type, but it's sent earlier than the API updates
+                    if message.type == "stream-up":
+                        ws.streamers[streamer_index].stream_up = Settings.clock.time()
+                    elif message.type == "stream-down":
+                        if ws.streamers[streamer_index].is_online is True:
+                            ws.streamers[streamer_index].set_offline()
+                    elif message.type == "viewcount":
+                        if ws.streamers[streamer_index].stream_up_elapsed():
+                            ws.twitch.check_streamer_online(
+                                ws.streamers[streamer_index]
+                            )
+
+                elif message.topic == "raid":
+                    if message.type == "raid_update_v2":
+                        raid = Raid(
+                            message.message["raid"]["id"],
+                            message.message["raid"]["target_login"],
+                        )
+                        ws.twitch.update_raid(ws.streamers[streamer_index], raid)
+
+                elif message.topic == "community-moments-channel-v1":
+                    if message.type == "active":
+                        ws.twitch.claim_moment(
+                            ws.streamers[streamer_index], message.data["moment_id"]
+                        )
+
+                elif message.topic == "predictions-channel-v1":
+
+                    event_dict = message.data["event"]
+                    event_id = event_dict["id"]
+                    event_status = event_dict["status"]
+
+                    from dateutil import parser  # Only the predictions need it
+
+                    current_tmsp = parser.parse(message.timestamp)
+
+                    if (
+                        message.type == "event-created"
+                        and event_id not in ws.events_predictions
+                    ):
+                        if event_status == "ACTIVE":
+                            prediction_window_seconds = float(
+                                event_dict["prediction_window_seconds"]
+                            )
+                            # Reduce prediction window by 3/6s - Collect more accurate data for decision
+                            prediction_window_seconds = ws.streamers[
+                                streamer_index
+                            ].get_prediction_window(prediction_window_seconds)
+                            event = EventPrediction(
+                                ws.streamers[streamer_index],
+                                event_id,
+                                event_dict["title"],
+                                parser.parse(event_dict["created_at"]),
+                                prediction_window_seconds,
+                                event_status,
+                                event_dict["outcomes"],
+                            )
+                            if (
+                                ws.streamers[streamer_index].is_online
+                                and event.closing_bet_after(current_tmsp) > 0
+                            ):
+                                streamer = ws.streamers[streamer_index]
+                                bet_settings = streamer.settings.bet
+                                if (
+                                    bet_settings.minimum_points is None
+                                    or streamer.channel_points
+                                    > bet_settings.minimum_points
+                                ):
+                                    ws.events_predictions[event_id] = event
+                                    start_after = event.closing_bet_after(
+                                        current_tmsp
+                                    )
+
+                                    Settings.clock.call_later(
+                                        start_after,
+                                        ws.twitch.make_predictions,
+                                        (ws.events_predictions[event_id],),
+                                    )
+
+                                    logger.info(
+                                        f"Place the bet after: {start_after}s for: {ws.events_predictions[event_id]}",
+                                        extra={
+                                            "emoji": ":alarm_clock:",
+                                            "event": Events.BET_START,
+                                        },
+                                    )
+                                else:
+                                    logger.info(
+                                        f"{streamer} have only {streamer.channel_points} channel points and the minimum for bet is: {bet_settings.minimum_points}",
+                                        extra={
+                                            "emoji": ":pushpin:",
+                                            "event": Events.BET_FILTERS,
+                                        },
+                                    )
+
+                    elif (
+                        message.type == "event-updated"
+                        and event_id in ws.events_predictions
+                    ):
+                        ws.events_predictions[event_id].status = event_status
+                        # Game over we can't update anymore the values... The bet was placed!
+                        if (
+                            ws.events_predictions[event_id].bet_placed is False
+                            and ws.events_predictions[event_id].bet.decision == {}
+                        ):
+                            ws.events_predictions[event_id].bet.update_outcomes(
+                                event_dict["outcomes"]
+                            )
+
+                elif message.topic == "predictions-user-v1":
+                    event_id = message.data["prediction"]["event_id"]
+                    if event_id in ws.events_predictions:
+                        event_prediction = ws.events_predictions[event_id]
+                        if (
+                            message.type == "prediction-result"
+                            and event_prediction.bet_confirmed
+                        ):
+                            points = event_prediction.parse_result(
+                                message.data["prediction"]["result"]
+                            )
+
+                            decision = event_prediction.bet.get_decision()
+                            choice = event_prediction.bet.decision["choice"]
+
+                            logger.info(
+                                (
+                                    f"{event_prediction} - Decision: {choice}: {decision['title']} "
+                                    f"({decision['color']}) - Result: {event_prediction.result['string']}"
+                                ),
+                                extra={
+                                    "emoji": ":bar_chart:",
+                                    "event": Events.get(
+                                        f"BET_{event_prediction.result['type']}"
+                                    ),
+                                },
+                            )
+
+                            ws.streamers[streamer_index].update_history(
+                                "PREDICTION", points["gained"]
+                            )
+
+                            # Remove duplicate history records from previous message sent in community-points-user-v1
+                            if event_prediction.result["type"] == "REFUND":
+                                ws.streamers[streamer_index].update_history(
+                                    "REFUND",
+                                    -points["placed"],
+                                    counter=-1,
+                                )
+                            elif event_prediction.result["type"] == "WIN":
+                                ws.streamers[streamer_index].update_history(
+                                    "PREDICTION",
+                                    -points["won"],
+                                    counter=-1,
+                                )
+
+                            if event_prediction.result["type"]:
+                                # Analytics switch
+                                if Settings.enable_analytics is True:
+                                    ws.streamers[
+                                        streamer_index
+                                    ].persistent_annotations(
+                                        event_prediction.result["type"],
+                                        f"{ws.events_predictions[event_id].title}",
+                                    )
+                        elif message.type == "prediction-made":
+                            event_prediction.bet_confirmed = True
+                            # Analytics switch
+                            if Settings.enable_analytics is True:
+                                ws.streamers[streamer_index].persistent_annotations(
+                                    "PREDICTION_MADE",
+                                    f"Decision: {event_prediction.bet.decision['choice']} - {event_prediction.title}",
+                                )
+                elif message.topic == "community-points-channel-v1":
+                    if message.type == "community-goal-created":
+                        # TODO Untested, hard to find this happening live
+                        ws.streamers[streamer_index].add_community_goal(
+                            CommunityGoal.from_pubsub(message.data["community_goal"])
+                        )
+                    elif message.type == "community-goal-updated":
+                        ws.streamers[streamer_index].update_community_goal(
+                            CommunityGoal.from_pubsub(message.data["community_goal"])
+                        )
+                    elif message.type == "community-goal-deleted":
+                        # TODO Untested, not sure what the message format for this is,
+                        #      https://github.com/sammwyy/twitch-ps/blob/master/main.js#L417
+                        #      suggests that it should be just the entire, now deleted, goal model
+                        ws.streamers[streamer_index].delete_community_goal(message.data["community_goal"]["id"])
+
+                    if message.type in ["community-goal-updated", "community-goal-created"]:
+                        ws.twitch.contribute_to_community_goals(ws.streamers[streamer_index])
+
+            except Exception:
+                logger.error(
+                    f"Exception raised for topic: {message.topic} and message: {message}",
+                    exc_info=True,
+                )
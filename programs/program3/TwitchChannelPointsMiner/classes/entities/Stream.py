@@ -1,6 +1,5 @@
 import json
 import logging
-import time
 from base64 import b64encode
 
 from TwitchChannelPointsMiner.classes.Settings import Settings
@@ -62,7 +61,7 @@ class Stream(object):
         self.drops_tags = (
             DROP_ID in [tag["id"] for tag in self.tags] and self.game != {}
         )
-        self.__last_update = time.time()
+        self.__last_update = Settings.clock.time()
 
         logger.debug(f"Update: {self}")
 
@@ -92,7 +91,7 @@ class Stream(object):
         return self.__last_update == 0 or self.update_elapsed() >= 120
 
     def update_elapsed(self):
-        return 0 if self.__last_update == 0 else (time.time() - self.__last_update)
+        return 0 if self.__last_update == 0 else (Settings.clock.time() - self.__last_update)
 
     def init_watch_streak(self):
         self.watch_streak_missing = True
@@ -102,6 +101,6 @@ class Stream(object):
     def update_minute_watched(self):
         if self.__minute_watched_timestamp != 0:
             self.minute_watched += round(
-                (time.time() - self.__minute_watched_timestamp) / 60, 5
+                (Settings.clock.time() - self.__minute_watched_timestamp) / 60, 5
             )
-        self.__minute_watched_timestamp = time.time()
+        self.__minute_watched_timestamp = Settings.clock.time()
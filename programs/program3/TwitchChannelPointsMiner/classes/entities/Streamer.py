@@ -1,10 +1,10 @@
 import json
 import logging
 import os
-import time
 from datetime import datetime
 from threading import Lock
 
+from TwitchChannelPointsMiner.classes.AnalyticsStore import AnalyticsStore
 from TwitchChannelPointsMiner.classes.Chat import ChatPresence, ThreadChat
 from TwitchChannelPointsMiner.classes.entities.Bet import BetSettings, DelayMode
 from TwitchChannelPointsMiner.classes.entities.Stream import Stream
@@ -88,6 +88,7 @@ class Streamer(object):
         "history",
         "streamer_url",
         "mutex",
+        "analytics_path",
     ]
 
     def __init__(self, username, settings=None):
@@ -114,6 +115,9 @@ class Streamer(object):
 
         self.mutex = Lock()
 
+        # Analytics folder of the account watching this streamer, Settings.analytics_path if None
+        self.analytics_path = None
+
     def __repr__(self):
         return f"Streamer(username={self.username}, channel_id={self.channel_id}, channel_points={_millify(self.channel_points)})"
 
@@ -126,7 +130,7 @@ class Streamer(object):
 
     def set_offline(self):
         if self.is_online is True:
-            self.offline_at = time.time()
+            self.offline_at = Settings.clock.time()
             self.is_online = False
 
         self.toggle_chat()
@@ -141,7 +145,7 @@ class Streamer(object):
 
     def set_online(self):
         if self.is_online is False:
-            self.online_at = time.time()
+            self.online_at = Settings.clock.time()
             self.is_online = True
             self.stream.init_watch_streak()
 
@@ -174,7 +178,7 @@ class Streamer(object):
             self.stream.watch_streak_missing = False
 
     def stream_up_elapsed(self):
-        return self.stream_up == 0 or ((time.time() - self.stream_up) > 120)
+        return self.stream_up == 0 or ((Settings.clock.time() - self.stream_up) > 120)
 
     def drops_condition(self):
         return (
@@ -238,7 +242,7 @@ class Streamer(object):
 
     def __save_json(self, key, data={}, event_type="Watch"):
         # https://stackoverflow.com/questions/4676195/why-do-i-need-to-multiply-unix-timestamps-by-1000-in-javascript
-        now = datetime.now().replace(microsecond=0)
+        now = Settings.clock.now().replace(microsecond=0)
         data.update({"x": round(datetime.timestamp(now) * 1000)})
 
         if key == "series":
@@ -246,7 +250,9 @@ class Streamer(object):
             if event_type is not None:
                 data.update({"z": event_type.replace("_", " ").title()})
 
-        fname = os.path.join(Settings.analytics_path, f"{self.username}.json")
+        fname = os.path.join(
+            self.analytics_path or Settings.analytics_path, f"{self.username}.json"
+        )
         temp_fname = fname + ".temp"  # Temporary file name
 
         with self.mutex:
@@ -261,6 +267,8 @@ class Streamer(object):
             # Replace the original file with the temporary file
             os.replace(temp_fname, fname)
 
+        AnalyticsStore.notify()
+
     def leave_chat(self):
         if self.irc_chat is not None:
             self.irc_chat.stop()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+
+# Serve a local Twitch (GQL, PubSub, usher, spade, IRC) for end-to-end tests of the miner.
+# The streams follow fixtures like simulate.py's, on the wall clock from the start of the server.
+# Point a miner at it with the printed variables, e.g.
+#   python fake_twitch.py --streamers 50 --cookies myaccount --latency 0.05 --error-rate 0.01
+#   eval "$(python fake_twitch.py --print-env)" && python run.py   # in another shell
+# The counters are at /_fake/stats, a message is published at once by POSTing
+# {"topic": ..., "channel": username, "type": ..., "data": {...}} to /_fake/publish.
+
+import argparse
+import json
+import logging
+import signal
+import threading
+
+from TwitchChannelPointsMiner.FakeTwitch import FakeTwitch
+from TwitchChannelPointsMiner.Simulation import generate_fixtures
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Serve a local Twitch for the miner")
+    arg_parser.add_argument("--host", default="127.0.0.1", help="(default: 127.0.0.1)")
+    arg_parser.add_argument("--port", type=int, default=8080, help="HTTP and PubSub port (default: 8080)")
+    arg_parser.add_argument("--irc-port", type=int, default=6667, help="(default: 6667)")
+    arg_parser.add_argument("--streamers", type=int, default=50, help="generated streamers (default: 50)")
+    arg_parser.add_argument("--hours", type=float, default=24, help="hours of generated streams (default: 24)")
+    arg_parser.add_argument("--seed", type=int, default=0, help="seed of the streams and the errors (default: 0)")
+    arg_parser.add_argument("--fixtures", help="JSON fixtures instead of generated streams")
+    arg_parser.add_argument("--latency", type=float, default=0, help="seconds added to every HTTP answer")
+    arg_parser.add_argument("--jitter", type=float, default=0, help="up to that many more seconds, at random")
+    arg_parser.add_argument("--error-rate", type=float, default=0, help="share of HTTP requests answered with a 503")
+    arg_parser.add_argument(
+        "--reconnect-every", type=float, help="send RECONNECT to PubSub clients that many seconds after they connect"
+    )
+    arg_parser.add_argument("--cookies", metavar="USERNAME", help="write cookies/USERNAME.pkl for the fake account")
+    arg_parser.add_argument("--print-env", action="store_true", help="print the variables for the miner and exit")
+    arg_parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = arg_parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(asctime)s %(name)s %(message)s",
+    )
+
+    if args.fixtures is not None:
+        with open(args.fixtures, encoding="utf-8") as f:
+            fixtures = json.load(f)
+    else:
+        fixtures = generate_fixtures(args.streamers, args.hours, args.seed)
+
+    fake = FakeTwitch(
+        fixtures,
+        host=args.host,
+        port=args.port,
+        irc_port=args.irc_port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        reconnect_every=args.reconnect_every,
+        seed=args.seed,
+    )
+    if args.print_env:
+        print("\n".join(f"export {name}={value}" for name, value in fake.env().items()))
+    else:
+        if args.cookies is not None:
+            logging.info(f"Cookies written to {fake.write_cookies(args.cookies)}")
+        fake.start()
+        logging.info(f"Fake Twitch on {fake.url()}, IRC on {args.host}:{fake.irc_port}")
+        for name, value in fake.env().items():
+            logging.info(f"export {name}={value}")
+        stopped = threading.Event()
+        signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+        signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+        while stopped.wait(1) is False:
+            pass
+        print(json.dumps(fake.stats(), indent=2))
+        fake.stop()
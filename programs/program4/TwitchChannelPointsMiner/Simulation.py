@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+
+import json
+import logging
+import random
+import time
+from base64 import b64decode
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlparse
+
+import requests
+from requests.models import Response
+
+from TwitchChannelPointsMiner.classes.Chat import ChatPresence
+from TwitchChannelPointsMiner.classes.Clock import VirtualClock
+from TwitchChannelPointsMiner.classes.entities.Message import Message
+from TwitchChannelPointsMiner.classes.entities.Streamer import (
+    Streamer,
+    StreamerSettings,
+)
+from TwitchChannelPointsMiner.classes.Exceptions import StreamerDoesNotExistException
+from TwitchChannelPointsMiner.classes.Settings import Priority, Settings
+from TwitchChannelPointsMiner.classes.SharedResources import SharedResources
+from TwitchChannelPointsMiner.classes.StopEvent import StopEvent
+from TwitchChannelPointsMiner.classes.Twitch import Twitch
+from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+from TwitchChannelPointsMiner.logger import LoggerSettings
+from TwitchChannelPointsMiner.utils import get_user_agent, set_default_settings
+
+logger = logging.getLogger(__name__)
+
+# 2026-01-01 00:00:00 UTC, the virtual clock starts here so that runs are comparable
+SIMULATION_START = 1767225600
+USER_ID = "100000000"
+# Host of the links the simulated Twitch hands out (settings, playlists, segments, spade)
+SIMULATED_CDN = "https://static.twitchcdn.net"
+
+# What the simulated Twitch gives, roughly the real amounts
+WATCH_POINTS = 10  # Every 5 minutes watched
+WATCH_INTERVAL = 5 * 60
+CLAIM_POINTS = 50  # A bonus to claim every 15 minutes watched
+CLAIM_INTERVAL = 15 * 60
+STREAK_POINTS = 450  # Once per stream, after 6 minutes watched
+STREAK_MINUTES = 6
+
+
+def generate_fixtures(streamers=500, hours=24, seed=0):
+    # A day of streams: most channels stream once or twice, for 1 to 6 hours
+    rng = random.Random(seed)
+    duration = int(hours * 60 * 60)
+    fixtures = {"streamers": [], "pubsub": [], "gql": {}}
+    for index in range(0, streamers):
+        online = []
+        for _ in range(rng.choice([0, 1, 1, 1, 2])):
+            start = rng.randrange(-3 * 60 * 60, duration)
+            end = start + rng.randrange(60 * 60, 6 * 60 * 60)
+            if online == [] or start > online[-1][1] + 30 * 60:
+                online.append([max(start, 0), min(end, duration)])
+        online.sort()
+        fixtures["streamers"].append(
+            {
+                "username": f"streamer{index:04d}",
+                "channel_id": str(200000000 + index),
+                "points": rng.randrange(0, 50000),
+                "online": [interval for interval in online if interval[0] < interval[1]],
+            }
+        )
+    return fixtures
+
+
+class SimulatedChannel(object):
+    __slots__ = [
+        "username",
+        "channel_id",
+        "balance",
+        "online",
+        "stream_index",
+        "last_minute",
+        "watched",
+        "stream_watched",
+        "streak_given",
+        "claim_id",
+    ]
+
+    def __init__(self, username, channel_id, balance, online):
+        self.username = username
+        self.channel_id = channel_id
+        self.balance = balance
+        self.online = online  # [[start, end], ...] seconds from the start of the simulation
+        self.stream_index = None  # Index in online of the current stream
+        self.last_minute = 0
+        self.watched = 0
+        self.stream_watched = 0
+        self.streak_given = False
+        self.claim_id = None
+
+
+class SimulatedTwitch(object):
+    # A world model of Twitch built from fixtures: it answers the GQL operations, the main and
+    # channel pages, usher, the playlists and spade, and publishes the PubSub messages the real
+    # Twitch would send (stream up/down, points, bonus claims). Requests are routed by path, so
+    # the same model serves the simulation (SimulatedSession) and fake_twitch.py (FakeTwitch).
+    # Not thread-safe, FakeTwitch calls it under a lock.
+    def __init__(self, fixtures, clock, start, base=SIMULATED_CDN):
+        self.clock = clock
+        self.start = start
+        self.base = base
+        self.channels = {}
+        self.channels_by_id = {}
+        for streamer in fixtures["streamers"]:
+            channel = SimulatedChannel(
+                streamer["username"],
+                streamer["channel_id"],
+                streamer.get("points", 0),
+                streamer.get("online", []),
+            )
+            self.channels[channel.username] = channel
+            self.channels_by_id[channel.channel_id] = channel
+        # Scripted answers, by operation name, in place of the generated ones
+        self.gql = fixtures.get("gql", {})
+        # Scripted messages: {"at": seconds, "topic": ..., "channel": username, "type": ..., "data": {...}}
+        self.pubsub = fixtures.get("pubsub", [])
+        # Called with the data of every PubSub MESSAGE: {"topic": "<topic>.<id>", "message": "<json>"}
+        self.deliver = None
+        self.requests = Counter()
+        self.claims = 0
+
+    # === TIMELINE === #
+    def is_online(self, channel):
+        elapsed = self.clock.time() - self.start
+        for index, (start, end) in enumerate(channel.online):
+            if start <= elapsed < end:
+                if channel.stream_index != index:
+                    channel.stream_index = index
+                    channel.stream_watched = 0
+                    channel.last_minute = 0
+                    channel.streak_given = False
+                return True
+        return False
+
+    def schedule_events(self):
+        # stream-up at the start of every stream, a viewcount every 10 minutes once the miner
+        # stops ignoring them (see Streamer.stream_up_elapsed) and stream-down at the end
+        for channel in self.channels.values():
+            for start, end in channel.online:
+                if start > 0:
+                    self.publish_at(start, "video-playback-by-id", channel.channel_id, "stream-up")
+                for at in range(int(start) + 150, int(end), 10 * 60):
+                    self.publish_at(at, "video-playback-by-id", channel.channel_id, "viewcount")
+                self.publish_at(end, "video-playback-by-id", channel.channel_id, "stream-down")
+
+        for message in self.pubsub:
+            topic_user = (
+                USER_ID
+                if message["topic"].endswith("-user-v1")
+                else self.channels[message["channel"]].channel_id
+            )
+            self.publish_at(
+                message["at"], message["topic"], topic_user, message["type"], message.get("data")
+            )
+
+    def publish_at(self, at, topic, topic_user, message_type, data=None):
+        # at: seconds from the start
+        self.clock.call_later(
+            self.start + at - self.clock.time(),
+            self.publish,
+            (topic, topic_user, message_type, data),
+        )
+
+    def publish(self, topic, topic_user, message_type, data=None):
+        message = {"type": message_type, "server_time": self.clock.time()}
+        if data is not None:
+            data["timestamp"] = self.timestamp()
+            message["data"] = data
+        self.deliver({"topic": f"{topic}.{topic_user}", "message": json.dumps(message)})
+
+    def timestamp(self):
+        return datetime.fromtimestamp(self.clock.time(), timezone.utc).strftime(
+            "%Y-%m-%dT%H:%M:%S.%fZ"
+        )
+
+    def earn(self, channel, reason_code, points):
+        channel.balance += points
+        self.publish(
+            "community-points-user-v1",
+            USER_ID,
+            "points-earned",
+            {
+                "channel_id": channel.channel_id,
+                "point_gain": {"reason_code": reason_code, "total_points": points},
+                "balance": {"balance": channel.balance, "channel_id": channel.channel_id},
+            },
+        )
+
+    # === HTTP === #
+    def answer(self, method, path, body=None):
+        # body: the decoded JSON of a GQL request, the form fields of a spade request
+        # Returns (status code, text)
+        if path == "/gql":
+            return 200, json.dumps(self.answer_gql(body))
+        if path.startswith("/api/channel/hls/"):
+            self.requests["usher"] += 1
+            login = path.rsplit("/", 1)[-1][: -len(".m3u8")]
+            return 200, f"#EXTM3U\n{self.base}/v1/playlist/{login}.m3u8"
+        if path.startswith("/v1/playlist/"):
+            self.requests["playlist"] += 1
+            login = path.rsplit("/", 1)[-1][: -len(".m3u8")]
+            return 200, f"#EXTM3U\n{self.base}/v1/segment/{login}.ts\n"
+        if path.startswith("/v1/segment/"):
+            self.requests["segment"] += 1
+            return 200, ""
+        if path.startswith("/config/settings."):
+            self.requests["settings"] += 1
+            return 200, f'{{"spade_url":"{self.base}/track"}}'
+        if path == "/track" and method == "POST":
+            self.requests["minute-watched"] += 1
+            return self.minute_watched(body), ""
+        if path in ["", "/"]:
+            self.requests["client version"] += 1
+            return 200, 'window.__twilightBuildID="00000000-0000-4000-8000-000000000000";'
+        if path.count("/") == 1 and path[1:] in self.channels:
+            self.requests["channel page"] += 1
+            return 200, f'<script src="{self.base}/config/settings.sim.js">'
+        self.requests["unknown"] += 1
+        return 404, ""
+
+    def minute_watched(self, data):
+        # data: Stream.encode_payload()
+        properties = json.loads(b64decode(data["data"]))[0]["properties"]
+        channel = self.channels_by_id.get(str(properties["channel_id"]))
+        if channel is None or self.is_online(channel) is False:
+            return 404
+
+        # The time since the previous minute-watched event counts, up to a minute
+        now = self.clock.time()
+        elapsed = min(now - channel.last_minute, 60) if channel.last_minute else 0
+        channel.last_minute = now
+        before = channel.watched
+        channel.watched += elapsed
+        channel.stream_watched += elapsed
+
+        if channel.watched // WATCH_INTERVAL > before // WATCH_INTERVAL:
+            self.earn(channel, "WATCH", WATCH_POINTS)
+        if (
+            channel.watched // CLAIM_INTERVAL > before // CLAIM_INTERVAL
+            and channel.claim_id is None
+        ):
+            channel.claim_id = f"claim-{channel.channel_id}-{int(now)}"
+            self.publish(
+                "community-points-user-v1",
+                USER_ID,
+                "claim-available",
+                {"claim": {"id": channel.claim_id, "channel_id": channel.channel_id}},
+            )
+        if channel.streak_given is False and channel.stream_watched >= STREAK_MINUTES * 60:
+            channel.streak_given = True
+            self.earn(channel, "WATCH_STREAK", STREAK_POINTS)
+        return 204
+
+    # === GQL === #
+    def answer_gql(self, body):
+        # Every operation of constants.GQLOperations, a batch is a list of them
+        if isinstance(body, list):
+            return [self.answer_gql(operation) for operation in body]
+        name = body.get("operationName")
+        variables = body.get("variables", {})
+        self.requests[f"gql {name}"] += 1
+        if name in self.gql:
+            return self.gql[name]
+
+        if name == "ReportMenuItem":
+            channel = self.channels.get(variables["channelLogin"])
+            user = None if channel is None else {"id": channel.channel_id, "login": channel.username}
+            return {"data": {"user": user}}
+
+        if name == "ChannelFollows":
+            edges = [
+                {"cursor": str(index), "node": {"login": username}}
+                for index, username in enumerate(self.channels)
+            ]
+            return {
+                "data": {
+                    "user": {"follows": {"edges": edges, "pageInfo": {"hasNextPage": False}}}
+                }
+            }
+
+        if name == "ChannelPointsContext":
+            channel = self.channels.get(variables["channelLogin"])
+            if channel is None:
+                return {"data": {"community": None}}
+            claim = None if channel.claim_id is None else {"id": channel.claim_id}
+            return {
+                "data": {
+                    "community": {
+                        "channel": {
+                            "self": {
+                                "communityPoints": {
+                                    "balance": channel.balance,
+                                    "activeMultipliers": [],
+                                    "availableClaim": claim,
+                                }
+                            },
+                            "communityPointsSettings": {"goals": []},
+                        }
+                    }
+                }
+            }
+
+        if name in ["VideoPlayerStreamInfoOverlayChannel", "WithIsStreamLiveQuery"]:
+            channel = (
+                self.channels.get(variables["channel"])
+                if name == "VideoPlayerStreamInfoOverlayChannel"
+                else self.channels_by_id.get(str(variables["id"]))
+            )
+            if channel is None or self.is_online(channel) is False:
+                return {"data": {"user": {"stream": None}}}
+            return {
+                "data": {
+                    "user": {
+                        "stream": {
+                            "id": f"{channel.channel_id}{channel.stream_index}",
+                            "tags": [],
+                            "viewersCount": 100,
+                        },
+                        "broadcastSettings": {"title": "Simulated stream", "game": {}},
+                    }
+                }
+            }
+
+        if name == "PlaybackAccessToken":
+            return {"data": {"streamPlaybackAccessToken": {"signature": "sig", "value": "token"}}}
+
+        if name == "ClaimCommunityPoints":
+            channel = self.channels_by_id.get(str(variables["input"]["channelID"]))
+            if channel is not None and channel.claim_id == variables["input"]["claimID"]:
+                channel.claim_id = None
+                self.claims += 1
+                # The real PubSub answers after the GQL request, not inside it
+                self.clock.call_later(0.5, self.earn, (channel, "CLAIM", CLAIM_POINTS))
+            return {"data": {"claimCommunityPoints": {"claim": None}}}
+
+        if name == "ModViewChannelQuery":
+            return {"data": {"user": {"self": {"isModerator": False}}}}
+
+        # No drops campaigns and no community goals unless the fixtures script them
+        if name == "Inventory":
+            return {"data": {"currentUser": {"inventory": {"dropCampaignsInProgress": None}}}}
+        if name == "ViewerDropsDashboard":
+            return {"data": {"currentUser": {"dropCampaigns": []}}}
+        if name == "DropCampaignDetails":
+            return {"data": {"user": None}}
+        if name == "DropsHighlightService_AvailableDrops":
+            return {"data": {"channel": {"viewerDropCampaigns": None}}}
+        if name == "DropsPage_ClaimDropRewards":
+            return {"data": {"claimDropRewards": None}}
+        if name == "UserPointsContribution":
+            return {
+                "data": {
+                    "user": {"channel": {"self": {"communityPoints": {"goalContributions": []}}}}
+                }
+            }
+        if name == "ContributeCommunityPointsCommunityGoal":
+            return {"data": {"contributeCommunityPointsCommunityGoal": {"error": None}}}
+        if name == "MakePrediction":
+            return {"data": {"makePrediction": {"error": None}}}
+
+        # JoinRaid, CommunityMomentCallout_Claim: the miner doesn't read the answer
+        return {"data": {}}
+
+
+class SimulatedSession(requests.Session):
+    # In place of the shared HTTP session in a simulation: nothing is prepared or sent,
+    # SimulatedTwitch reads the bodies as the miner passes them (json=, data=)
+    def __init__(self, world):
+        super().__init__()
+        self.world = world
+
+    def request(self, method, url, data=None, json=None, **kwargs):
+        status, content = self.world.answer(
+            method, urlparse(url).path, json if json is not None else data
+        )
+        response = Response()
+        response.url = url
+        response.status_code = status
+        response._content = content.encode()
+        response.encoding = "utf-8"
+        return response
+
+
+class Simulation(object):
+    # Runs the scheduling of one account (the minute watcher and the PubSub handling) against a
+    # SimulatedTwitch on a VirtualClock: a day of mining takes seconds, and the same fixtures
+    # give the same results. Threads, login, IRC and the analytics are left out.
+    __slots__ = [
+        "fixtures",
+        "hours",
+        "priority",
+        "streamer_settings",
+        "clock",
+        "world",
+        "twitch",
+        "streamers",
+        "pool",
+    ]
+
+    def __init__(
+        self,
+        fixtures: dict,
+        hours: float = 24,
+        priority: list = [Priority.STREAK, Priority.DROPS, Priority.ORDER],
+        streamer_settings: StreamerSettings = None,
+    ):
+        self.fixtures = fixtures
+        self.hours = hours
+        self.priority = priority if isinstance(priority, list) else [priority]
+        self.streamer_settings = (
+            streamer_settings
+            if streamer_settings is not None
+            else StreamerSettings(
+                claim_drops=False, community_goals=False, chat=ChatPresence.NEVER
+            )
+        )
+        self.clock = None
+        self.world = None
+        self.twitch = None
+        self.streamers = []
+        self.pool = None
+
+    def run(self):
+        started = time.perf_counter()
+        previous = (Settings.clock, getattr(Settings, "logger", None))
+        self.clock = VirtualClock(SIMULATION_START)
+        Settings.clock = self.clock
+        Settings.logger = LoggerSettings(less=True)
+        Settings.enable_analytics = False
+        self.streamer_settings.default()
+        self.streamer_settings.bet.default()
+        Settings.streamer_settings = self.streamer_settings
+        try:
+            self.__setup()
+            self.world.schedule_events()
+            self.clock.schedule(SIMULATION_START + self.hours * 60 * 60, self.__stop)
+            # The minute watcher drives the virtual clock until the stop scheduled at the end
+            self.twitch.send_minute_watched_events(self.streamers, self.priority)
+        finally:
+            Settings.clock, Settings.logger = previous
+        return self.report(time.perf_counter() - started)
+
+    def __setup(self):
+        shared = SharedResources()
+        self.world = SimulatedTwitch(self.fixtures, self.clock, SIMULATION_START)
+        self.world.deliver = self.__deliver
+        shared.http = SimulatedSession(self.world)
+
+        self.twitch = Twitch(
+            "simulation", get_user_agent("CHROME"), shared=shared, stop_event=StopEvent()
+        )
+        self.twitch.twitch_login.cookies = [
+            {"name": "auth-token", "value": "simulation"},
+            {"name": "persistent", "value": f"{USER_ID}%3A%3Asimulation"},
+        ]
+
+        for streamer in self.fixtures["streamers"]:
+            try:
+                streamer = Streamer(streamer["username"])
+                streamer.channel_id = self.twitch.get_channel_id(streamer.username)
+                streamer.settings = set_default_settings(
+                    streamer.settings, self.streamer_settings
+                )
+                streamer.settings.bet = set_default_settings(
+                    streamer.settings.bet, self.streamer_settings.bet
+                )
+                self.streamers.append(streamer)
+            except StreamerDoesNotExistException:
+                logger.info(f"Streamer {streamer.username} does not exist")
+        for streamer in self.streamers:
+            self.twitch.load_channel_points_context(streamer)
+            self.twitch.check_streamer_online(streamer)
+
+        self.pool = WebSocketsPool(
+            twitch=self.twitch, streamers=self.streamers, events_predictions={}
+        )
+
+    def __deliver(self, data):
+        WebSocketsPool.handle_message(self.pool, Message(data))
+
+    def __stop(self):
+        self.twitch.running = False
+        self.twitch.stop_event.set()
+
+    def report(self, wall_time):
+        gained = Counter()
+        for streamer in self.streamers:
+            for reason, history in streamer.history.items():
+                gained[reason] += history["amount"]
+        streams = sum(len(s.get("online", [])) for s in self.fixtures["streamers"])
+        streaks = sum(
+            1
+            for streamer in self.streamers
+            for reason, history in streamer.history.items()
+            if reason == "WATCH_STREAK"
+            for _ in range(history["counter"])
+        )
+        return {
+            "streamers": len(self.streamers),
+            "simulated_hours": self.hours,
+            "wall_time": round(wall_time, 2),
+            "streams": streams,
+            "watch_streaks": streaks,
+            "minutes_watched": round(
+                sum(channel.watched for channel in self.world.channels.values()) / 60
+            ),
+            "bonus_claimed": self.world.claims,
+            "points_gained": dict(gained),
+            "requests": dict(sorted(self.world.requests.items())),
+        }
@@ -0,0 +1,84 @@
+import logging
+import select
+import socket
+
+from irc.bot import SingleServerIRCBot
+
+from TwitchChannelPointsMiner.constants import IRC, IRC_PORT
+from TwitchChannelPointsMiner.classes.Settings import Events, Settings
+
+logger = logging.getLogger(__name__)
+
+# Longest wait for IRC data, the scheduled commands of the bot (reconnections) run in between
+IDLE_TIMEOUT = 5
+
+
+class ClientIRC(SingleServerIRCBot):
+    def __init__(self, username, token, channel):
+        self.token = token
+        self.channel = "#" + channel
+        self.__active = False
+        # die() writes to it to end the wait for IRC data at once
+        self.__wakeup_reader, self.__wakeup_writer = socket.socketpair()
+
+        super(ClientIRC, self).__init__(
+            [(IRC, IRC_PORT, f"oauth:{token}")], username, username
+        )
+
+    def on_welcome(self, client, event):
+        client.join(self.channel)
+
+    def start(self):
+        self.__active = True
+        self._connect()
+        while self.__active:
+            try:
+                # reactor.process_once() with the wake-up socket in the select()
+                readable, _, _ = select.select(
+                    self.reactor.sockets + [self.__wakeup_reader], [], [], IDLE_TIMEOUT
+                )
+                if self.__wakeup_reader in readable:
+                    readable.remove(self.__wakeup_reader)
+                    self.__wakeup_reader.recv(64)
+                self.reactor.process_data(readable)
+                self.reactor.process_timeout()
+            except Exception as e:
+                logger.error(
+                    f"Exception raised: {e}. Thread is active: {self.__active}"
+                )
+        self.__wakeup_reader.close()
+        self.__wakeup_writer.close()
+
+    def die(self, msg="Bye, cruel world!"):
+        self.connection.disconnect(msg)
+        self.__active = False
+        try:
+            self.__wakeup_writer.send(b"\0")
+        except OSError:
+            pass  # start() already returned
+
+    """
+    def on_join(self, connection, event):
+        logger.info(f"Event: {event}", extra={"emoji": ":speech_balloon:"})
+    """
+
+    # """
+    def on_pubmsg(self, connection, event):
+        msg = event.arguments[0]
+        mention = None
+
+        if Settings.disable_at_in_nickname is True:
+            mention = f"{self._nickname.lower()}"
+        else:
+            mention = f"@{self._nickname.lower()}"
+
+        # also self._realname
+        # if msg.startswith(f"@{self._nickname}"):
+        if mention != None and mention in msg.lower():
+            # nickname!username@nickname.tmi.twitch.tv
+            nick = event.source.split("!", 1)[0]
+            # chan = event.target
+
+            logger.info(f"{nick} at {self.channel} wrote: {msg}", extra={
+                        "emoji": ":speech_balloon:", "event": Events.CHAT_MENTION})
+    # """
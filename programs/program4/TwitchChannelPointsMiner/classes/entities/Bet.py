@@ -2,10 +2,8 @@ import copy
 from enum import Enum, auto
 from random import uniform
 
-from millify import millify
-
 #from TwitchChannelPointsMiner.utils import char_decision_as_index, float_round
-from TwitchChannelPointsMiner.utils import float_round
+from TwitchChannelPointsMiner.utils import _millify, float_round
 
 
 class Strategy(Enum):
@@ -194,7 +192,7 @@ class Bet(object):
         self.__clear_outcomes()
 
     def __repr__(self):
-        return f"Bet(total_users={millify(self.total_users)}, total_points={millify(self.total_points)}), decision={self.decision})\n\t\tOutcome A({self.get_outcome(0)})\n\t\tOutcome B({self.get_outcome(1)})"
+        return f"Bet(total_users={_millify(self.total_users, 0)}, total_points={_millify(self.total_points, 0)}), decision={self.decision})\n\t\tOutcome A({self.get_outcome(0)})\n\t\tOutcome B({self.get_outcome(1)})"
 
     def get_decision(self, parsed=False):
         #decision = self.outcomes[0 if self.decision["choice"] == "A" else 1]
@@ -203,7 +201,7 @@ class Bet(object):
 
     @staticmethod
     def __parse_outcome(outcome):
-        return f"{outcome['title']} ({outcome['color']}), Points: {millify(outcome[OutcomeKeys.TOTAL_POINTS])}, Users: {millify(outcome[OutcomeKeys.TOTAL_USERS])} ({outcome[OutcomeKeys.PERCENTAGE_USERS]}%), Odds: {outcome[OutcomeKeys.ODDS]} ({outcome[OutcomeKeys.ODDS_PERCENTAGE]}%)"
+        return f"{outcome['title']} ({outcome['color']}), Points: {_millify(outcome[OutcomeKeys.TOTAL_POINTS], 0)}, Users: {_millify(outcome[OutcomeKeys.TOTAL_USERS], 0)} ({outcome[OutcomeKeys.PERCENTAGE_USERS]}%), Odds: {outcome[OutcomeKeys.ODDS]} ({outcome[OutcomeKeys.ODDS_PERCENTAGE]}%)"
 
     def get_outcome(self, index):
         return Bet.__parse_outcome(self.outcomes[index])
@@ -1,10 +1,14 @@
-# Twitch endpoints
-URL = "https://www.twitch.tv"               # Browser, Apps
+import os
+
+# Twitch endpoints, TWITCH_MINER_* in the environment replaces them (e.g. with fake_twitch.py)
+URL = os.environ.get("TWITCH_MINER_URL", "https://www.twitch.tv")  # Browser, Apps
 # URL = "https://m.twitch.tv"               # Mobile Browser
 # URL = "https://android.tv.twitch.tv"      # TV
-IRC = "irc.chat.twitch.tv"
-IRC_PORT = 6667
-WEBSOCKET = "wss://pubsub-edge.twitch.tv/v1"
+GQL_URL = os.environ.get("TWITCH_MINER_GQL_URL", "https://gql.twitch.tv")
+USHER_URL = os.environ.get("TWITCH_MINER_USHER_URL", "https://usher.ttvnw.net")
+IRC = os.environ.get("TWITCH_MINER_IRC", "irc.chat.twitch.tv")
+IRC_PORT = int(os.environ.get("TWITCH_MINER_IRC_PORT", 6667))
+WEBSOCKET = os.environ.get("TWITCH_MINER_WEBSOCKET", "wss://pubsub-edge.twitch.tv/v1")
 CLIENT_ID = "ue6666qo983tsx6so1t0vnawi233wa"        # TV
 # CLIENT_ID = "kimne78kx3ncx6brgo4mv6wki5h1ko"      # Browser
 # CLIENT_ID = "r8s4dac0uhzifbpu9sjdiwzctle17ff"     # Mobile Browser
@@ -38,8 +42,8 @@ GITHUB_url = (
 
 
 class GQLOperations:
-    url = "https://gql.twitch.tv/gql"
-    integrity_url = "https://gql.twitch.tv/integrity"
+    url = f"{GQL_URL}/gql"
+    integrity_url = f"{GQL_URL}/integrity"
     WithIsStreamLiveQuery = {
         "operationName": "WithIsStreamLiveQuery",
         "extensions": {
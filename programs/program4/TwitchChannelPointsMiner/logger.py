@@ -1,25 +1,33 @@
+from __future__ import annotations
+
 import logging
 import os
 import platform
 import queue
-import pytz
 import sys
 from datetime import datetime
 from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
 from pathlib import Path
+from threading import Condition
+from typing import TYPE_CHECKING
 
-import emoji
 from colorama import Fore, init
 
-from TwitchChannelPointsMiner.classes.Discord import Discord
-from TwitchChannelPointsMiner.classes.Webhook import Webhook
-from TwitchChannelPointsMiner.classes.Matrix import Matrix
 from TwitchChannelPointsMiner.classes.Settings import Events
-from TwitchChannelPointsMiner.classes.Telegram import Telegram
-from TwitchChannelPointsMiner.classes.Pushover import Pushover
-from TwitchChannelPointsMiner.classes.Gotify import Gotify
 from TwitchChannelPointsMiner.utils import remove_emoji
 
+if TYPE_CHECKING:
+    # Only for the annotations, a notifier module is loaded by the run.py that configures it
+    from TwitchChannelPointsMiner.classes.Discord import Discord
+    from TwitchChannelPointsMiner.classes.Gotify import Gotify
+    from TwitchChannelPointsMiner.classes.Matrix import Matrix
+    from TwitchChannelPointsMiner.classes.Pushover import Pushover
+    from TwitchChannelPointsMiner.classes.Telegram import Telegram
+    from TwitchChannelPointsMiner.classes.Webhook import Webhook
+
+# Set by a supervisor that indexes the console output: prefix event messages with "[EVENT_NAME] "
+TAG_EVENTS = os.environ.get("TWITCH_MINER_LOG_EVENTS") == "1"
+
 
 # Fore: BLACK, RED, GREEN, YELLOW, BLUE, MAGENTA, CYAN, WHITE, RESET.
 class ColorPalette(object):
@@ -128,6 +136,8 @@ class FileFormatter(logging.Formatter):
         self.settings = settings
         self.timezone = None
         if settings.time_zone:
+            import pytz
+
             try:
                 self.timezone = pytz.timezone(settings.time_zone)
                 logging.info(f"File logger time zone set to: {self.timezone}")
@@ -149,6 +159,8 @@ class GlobalFormatter(logging.Formatter):
         self.settings = settings
         self.timezone = None
         if settings.time_zone:
+            import pytz
+
             try:
                 self.timezone = pytz.timezone(settings.time_zone)
                 logging.info(
@@ -175,6 +187,8 @@ class GlobalFormatter(logging.Formatter):
             and self.settings.emoji is True
             and record.emoji_is_present is False
         ):
+            import emoji  # Slow to import, not needed when emoji are off
+
             record.msg = emoji.emojize(
                 f"{record.emoji}  {record.msg.strip()}", language="alias"
             )
@@ -203,6 +217,14 @@ class GlobalFormatter(logging.Formatter):
                     f"{self.settings.color_palette.get(record.event)}{record.msg}"
                 )
 
+            if (
+                TAG_EVENTS is True
+                and record.event is not None
+                and getattr(record, "event_tag_is_present", False) is False
+            ):
+                record.msg = f"[{record.event.name}] {record.msg}"
+                record.event_tag_is_present = True
+
         return super().format(record)
 
     def telegram(self, record):
@@ -277,6 +299,30 @@ class GlobalFormatter(logging.Formatter):
             self.settings.gotify.send(record.msg, record.event)
 
 
+class LogFileNotifier(logging.Handler):
+    # Runs after the file handler, wakes up the /log/stream clients of the analytics server
+    __changed = Condition()
+    __generation = 0
+
+    def emit(self, record):
+        with LogFileNotifier.__changed:
+            LogFileNotifier.__generation += 1
+            LogFileNotifier.__changed.notify_all()
+
+    @classmethod
+    def generation(cls) -> int:
+        with cls.__changed:
+            return cls.__generation
+
+    @classmethod
+    def wait(cls, generation, timeout) -> bool:
+        # True if a line was written after `generation` was read
+        with cls.__changed:
+            return cls.__changed.wait_for(
+                lambda: cls.__generation != generation, timeout
+            )
+
+
 def configure_loggers(username, settings):
     if settings.colored is True:
         init(autoreset=True)
@@ -344,10 +390,11 @@ def configure_loggers(username, settings):
             )
         )
         file_handler.setLevel(settings.file_level)
+        file_notifier = LogFileNotifier(settings.file_level)
 
         # Add logger handlers to the logger queue and start the process
         queue_listener = QueueListener(
-            logger_queue, file_handler, console_handler, respect_handler_level=True
+            logger_queue, file_handler, file_notifier, console_handler, respect_handler_level=True
         )
         queue_listener.start()
         return logs_file, queue_listener
@@ -1,3 +1,5 @@
+import json
+import logging
 import platform
 import re
 import socket
@@ -8,12 +10,20 @@ from os import path
 from random import randrange
 
 import requests
-from millify import millify
 
+from TwitchChannelPointsMiner.classes.Settings import Settings
 from TwitchChannelPointsMiner.constants import USER_AGENTS, GITHUB_url
 
+logger = logging.getLogger(__name__)
+
+# The version check runs in the background, it must not hang on a slow network anyway
+VERSION_CHECK_TIMEOUT = 10
+VERSION_CACHE_TTL = 6 * 60 * 60
+
 
 def _millify(input, precision=2):
+    from millify import millify
+
     return millify(input, precision)
 
 
@@ -36,7 +46,7 @@ def server_time(message_data):
             message_data["server_time"], timezone.utc).isoformat()
         + "Z"
         if message_data is not None and "server_time" in message_data
-        else datetime.fromtimestamp(time.time(), timezone.utc).isoformat() + "Z"
+        else datetime.fromtimestamp(Settings.clock.time(), timezone.utc).isoformat() + "Z"
     )
 
 
@@ -148,11 +158,11 @@ def set_default_settings(settings, defaults):
 
 
 def internet_connection_available(host="8.8.8.8", port=53, timeout=3):
+    # The timeout is the probe's own, socket.setdefaulttimeout() would change every socket
     try:
-        socket.setdefaulttimeout(timeout)
-        socket.socket(socket.AF_INET, socket.SOCK_STREAM).connect((host, port))
+        socket.create_connection((host, port), timeout=timeout).close()
         return True
-    except socket.error:
+    except OSError:
         return False
 
 
@@ -186,14 +196,24 @@ def init2dict(content):
     return dict(re.findall(r"""__([a-z]+)__ = "([^"]+)""", content))
 
 
-def check_versions():
+def get_current_version():
     try:
         current_version = init2dict(read("__init__.py"))
-        current_version = (
-            current_version["version"] if "version" in current_version else "0.0.0"
-        )
+        return current_version["version"] if "version" in current_version else "0.0.0"
     except Exception:
-        current_version = "0.0.0"
+        return "0.0.0"
+
+
+def get_github_version(timeout=VERSION_CHECK_TIMEOUT, cache_file=None):
+    # The answer is cached in cache_file, so that restarts don't ask GitHub every time
+    if cache_file is not None:
+        try:
+            with open(cache_file, encoding="utf-8") as f:
+                cached = json.load(f)
+            if time.time() - cached["checked"] < VERSION_CACHE_TTL:
+                return cached["version"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
     try:
         r = requests.get(
             "/".join(
@@ -201,12 +221,23 @@ def check_versions():
                     s.strip("/")
                     for s in [GITHUB_url, "TwitchChannelPointsMiner", "__init__.py"]
                 ]
-            )
+            ),
+            timeout=timeout,
         )
         github_version = init2dict(r.text)
         github_version = (
             github_version["version"] if "version" in github_version else "0.0.0"
         )
     except Exception:
-        github_version = "0.0.0"
-    return current_version, github_version
+        return "0.0.0"
+    if cache_file is not None and github_version != "0.0.0":
+        try:
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump({"checked": time.time(), "version": github_version}, f)
+        except OSError:
+            pass
+    return github_version
+
+
+def check_versions(timeout=VERSION_CHECK_TIMEOUT, cache_file=None):
+    return get_current_version(), get_github_version(timeout, cache_file)
@@ -36,9 +36,11 @@ setuptools.setup(
         "colorama",
         "flask",
         "irc",
-        "pandas",
         "pytz"
     ],
+    extras_require={
+        "pandas": ["pandas"],
+    },
     long_description=read("README.md"),
     long_description_content_type="text/markdown",
     classifiers=[
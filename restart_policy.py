@@ -0,0 +1,175 @@
+"""
+Automatic restart of crashed programs.
+A program that keeps dying is restarted with a growing delay and given up on after too many crashes in a row.
+"""
+
+import os
+import time
+from collections import deque
+
+# Environment variable telling the miner where to write its heartbeat
+HEARTBEAT_FILE_ENV = 'TWITCH_MINER_HEARTBEAT_FILE'
+
+# When to restart: never, only after a non-zero exit or a failed health check, or after every exit
+RESTART_MODES = ('never', 'on-failure', 'always')
+
+
+class RestartPolicy:
+    """Restart settings of one program, times are in seconds"""
+
+    def __init__(self, mode='on-failure', backoff_initial=5, backoff_max=300, backoff_factor=2,
+                 max_restarts=5, crash_window=600, stable_after=300,
+                 log_timeout=None, heartbeat_file=None, heartbeat_timeout=None):
+        if mode not in RESTART_MODES:
+            raise ValueError(f"Неизвестный режим перезапуска: {mode}")
+        self.mode = mode
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.backoff_factor = backoff_factor
+        # More than max_restarts crashes within crash_window is a crash loop
+        self.max_restarts = max_restarts
+        self.crash_window = crash_window
+        # A run that lasted this long resets the backoff
+        self.stable_after = stable_after
+        # Liveness checks, None disables them. The heartbeat is only checked once the program
+        # wrote its first one: a login waiting for the user or a long streamer list may take any time
+        self.log_timeout = log_timeout
+        self.heartbeat_file = heartbeat_file
+        self.heartbeat_timeout = heartbeat_timeout
+
+    @classmethod
+    def from_dict(cls, options):
+        return cls(**(options or {}))
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def heartbeat_path(self, program_dir):
+        if not self.heartbeat_file or not self.heartbeat_timeout:
+            return None
+        return os.path.join(program_dir, self.heartbeat_file)
+
+
+class RestartTracker:
+    """Restart state of one program: crash history, pending restart, accumulated downtime"""
+
+    def __init__(self, policy=None):
+        self.policy = policy or RestartPolicy()
+        self.restarts = 0            # automatic restarts since the supervisor started
+        self.crashes = deque()       # times of the recent crashes, for crash-loop detection
+        self.delay = 0               # backoff used for the last scheduled restart
+        self.next_restart = None     # time of the pending restart
+        self.gave_up = False         # crash loop detected, waiting for a manual start
+        self.started_at = None
+        self.down_since = None
+        self.total_downtime = 0.0
+        self.last_failure = None     # reason of the last restart
+        self.kill_reason = None      # set when a failed liveness check killed the program
+
+    def started(self, now=None):
+        """The program is running again"""
+        now = now if now is not None else time.time()
+        if self.down_since is not None:
+            self.total_downtime += now - self.down_since
+            self.down_since = None
+        self.started_at = now
+        self.next_restart = None
+
+    def manual_start(self):
+        """A start requested by the user forgets the crash history"""
+        self.crashes.clear()
+        self.delay = 0
+        self.gave_up = False
+
+    def auto_start(self):
+        """The pending restart is happening"""
+        self.restarts += 1
+
+    def cancel_restart(self):
+        """The pending restart can't happen, wait for a manual start"""
+        self.next_restart = None
+
+    def stopped(self):
+        """Stopped on purpose, no more downtime and no restart"""
+        if self.down_since is not None:
+            self.total_downtime += time.time() - self.down_since
+        self.down_since = None
+        self.next_restart = None
+        self.started_at = None
+
+    def exited(self, returncode, reason=None, now=None):
+        """The program ended on its own, returns the restart delay or None when it stays down"""
+        now = now if now is not None else time.time()
+        policy = self.policy
+        self.down_since = now
+        self.next_restart = None
+
+        failed = reason is not None or returncode != 0
+        if policy.mode == 'never' or (policy.mode == 'on-failure' and not failed):
+            self.down_since = None
+            return None
+        self.last_failure = reason or f"код выхода {returncode}"
+
+        if self.started_at is not None and now - self.started_at >= policy.stable_after:
+            # It ran fine for a while, start over with the shortest delay
+            self.delay = 0
+        self.started_at = None
+
+        self.crashes.append(now)
+        while self.crashes and now - self.crashes[0] > policy.crash_window:
+            self.crashes.popleft()
+        if len(self.crashes) > policy.max_restarts:
+            self.gave_up = True
+            return None
+
+        if self.delay:
+            self.delay = min(self.delay * policy.backoff_factor, policy.backoff_max)
+        else:
+            self.delay = policy.backoff_initial
+        self.next_restart = now + self.delay
+        return self.delay
+
+    def due(self, now=None):
+        """True once the pending restart should happen"""
+        now = now if now is not None else time.time()
+        return self.next_restart is not None and now >= self.next_restart
+
+    def liveness_failure(self, last_output, program_dir, now=None):
+        """Reason why a running program looks hung, None while it is healthy"""
+        now = now if now is not None else time.time()
+        policy = self.policy
+        if self.started_at is None:
+            return None
+
+        if policy.log_timeout:
+            last_output = max(last_output or 0, self.started_at)
+            if now - last_output > policy.log_timeout:
+                return f"нет вывода {int(now - last_output)} с"
+
+        path = policy.heartbeat_path(program_dir)
+        if path is not None:
+            try:
+                last_beat = os.stat(path).st_mtime
+            except OSError:
+                last_beat = None
+            if last_beat is None or last_beat < self.started_at:
+                # No beat from this run yet, the program is still starting
+                return None
+            if now - last_beat > policy.heartbeat_timeout:
+                return f"heartbeat устарел на {int(now - last_beat)} с"
+        return None
+
+    def to_dict(self, now=None):
+        now = now if now is not None else time.time()
+        downtime = self.total_downtime
+        if self.down_since is not None:
+            downtime += now - self.down_since
+        return {
+            'mode': self.policy.mode,
+            'restarts': self.restarts,
+            'recent_crashes': len(self.crashes),
+            'next_restart': self.next_restart,
+            'gave_up': self.gave_up,
+            'last_failure': self.last_failure,
+            'downtime': round(downtime, 1)
+        }
@@ -12,10 +12,21 @@ import time
 import subprocess
 import signal
 from datetime import datetime
-from collections import deque
 from flask import Flask, render_template, request, jsonify, Response
 import json
 
+from log_buffer import LogBuffer
+from log_store import LOG_EVENTS_ENV, LogStore
+from output_pump import OutputPump
+from fork_server import DEFAULT_PRELOAD, FORK_SERVER_ENV, PRELOAD_ENV, ForkServer, ForkServerError
+from status_channel import STATUS_FD_ENV, MinerState, open_status_pipe
+from telemetry import ResourceSampler
+from restart_policy import HEARTBEAT_FILE_ENV, RestartPolicy, RestartTracker
+from program_registry import CONFIG_FILE, ProgramRegistry, RegistryError
+from supervisor_daemon import DEFAULT_SOCKET, SOCKET_ENV, RemoteProgramManager, SupervisorServer
+from concurrent.futures import ThreadPoolExecutor, wait
+from analytics_service import DISABLE_MINER_ANALYTICS_ENV, AnalyticsIndex, create_analytics_blueprint
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,246 +36,544 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Restart crashed miners with backoff. The heartbeat check is opt-in per program in programs.json,
+# e.g. "restart": {"heartbeat_file": "heartbeat", "heartbeat_timeout": 300}: the miner touches it
+# from its main loop, which only starts after the login and the streamers are loaded
+DEFAULT_RESTART_POLICY = {
+    'mode': 'on-failure'
+}
+
 class ProgramManager:
     """Enhanced program manager with better streaming support"""
     
-    def __init__(self):
+    def __init__(self, config_path=CONFIG_FILE):
+        # Programs come from programs.json (created on the first run) and can be added at runtime
+        self.registry = ProgramRegistry(config_path)
         self.programs = {
-            1: {
-                'name': 'timoshka',
-                'path': 'programs/program1',
-                'script': 'run.py',
-                'process': None,
-                'logs': deque(maxlen=1000),
-                'status': 'остановлен',
-                'last_update': None
-            },
-            2: {
-                'name': 'shaurma', 
-                'path': 'programs/program2',
-                'script': 'run.py',
-                'process': None,
-                'logs': deque(maxlen=1000),
-                'status': 'остановлен',
-                'last_update': None
-            },
-            3: {
-                'name': 'XOMIKO',
-                'path': 'programs/program3', 
-                'script': 'run.py',
-                'process': None,
-                'logs': deque(maxlen=1000),
-                'status': 'остановлен',
-                'last_update': None
-            },
-            4: {
-                'name': 'danya',
-                'path': 'programs/program4',
-                'script': 'run.py', 
-                'process': None,
-                'logs': deque(maxlen=1000),
-                'status': 'остановлен',
-                'last_update': None
-            }
+            program_id: self._new_program(config)
+            for program_id, config in self.registry.load().items()
         }
         self.logger = logging.getLogger(f"{__name__}.ProgramManager")
-        self.lock = threading.Lock()
+        # Each program has its own state lock, a slow stop never blocks the other programs
+        # Start and stop run in the background, the API only records the transition
+        self.executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='program-op')
+
+        # Journal of status changes and log lines of every program, read by /api/events
+        self.events = LogBuffer(5000)
+
+        # Searchable history of every program's output on disk
+        self.log_store = LogStore(os.environ.get('LOG_STORE_DIR', 'log_store'))
+
+        # Optional: programs are forked from an interpreter that already imported their dependencies
+        self.fork_server = None
+        if os.environ.get(FORK_SERVER_ENV) == '1':
+            preload = os.environ.get(PRELOAD_ENV)
+            self.fork_server = ForkServer(preload.split(',') if preload else DEFAULT_PRELOAD)
+
+        # One thread reads the output of every program
+        self.output_pump = OutputPump(self._on_output, self._on_output_eof)
+
+        # CPU, memory, threads, FDs and IO of every program's process tree, pushed to /api/events
+        self.sampler = ResourceSampler(
+            self._running_pids,
+            interval=float(os.environ.get('METRICS_INTERVAL', 5)),
+            capacity=int(os.environ.get('METRICS_HISTORY', 720)),
+            on_sample=self._on_metrics
+        )
         
         # Start monitoring thread
         self.monitoring = True
         self.monitor_thread = threading.Thread(target=self._monitor_programs, daemon=True)
         self.monitor_thread.start()
 
+    @staticmethod
+    def _new_program(config):
+        """Runtime state of a program described by a registry config"""
+        try:
+            policy = RestartPolicy.from_dict({**DEFAULT_RESTART_POLICY, **config.get('restart', {})})
+        except (TypeError, ValueError) as e:
+            raise RegistryError(f"Неверные параметры перезапуска: {str(e)}")
+        return {
+            'name': config['name'],
+            'path': config['path'],
+            'script': config['script'],
+            'process': None,
+            'logs': LogBuffer(1000),
+            'status': 'остановлен',
+            'last_update': None,
+            'last_output': None,
+            'restart': RestartTracker(policy),
+            'state': MinerState(),  # Published by the miner over its status pipe
+            'operation': None,  # Future of the last start or stop
+            'reap': None,  # Process whose output closed before it exited, reaped by the monitor
+            'lock': threading.Lock()
+        }
+
+    def add_program(self, config):
+        """Register a new program and persist it, returns (program_id, status); raises RegistryError"""
+        self._new_program(self.registry.validate(config))  # Reject bad restart options before saving
+        config = self.registry.add(config)
+        program_id = config['id']
+        self.programs[program_id] = self._new_program(config)
+        self.logger.info(f"Программа {program_id} добавлена: {config['path']}")
+        status = self._program_status(self.programs[program_id])
+        self.events.append({'type': 'added', 'program_id': program_id, **status})
+        return program_id, status
+
+    def remove_program(self, program_id):
+        """Unregister a stopped program, returns False if it is unknown or still running"""
+        program = self.programs.get(program_id)
+        if program is None:
+            return False
+        with program['lock']:
+            if program['status'] in ('запущен', 'запускается', 'останавливается') or \
+                    (program['process'] and program['process'].poll() is None):
+                return False
+            program['restart'].stopped()
+            self.registry.remove(program_id)
+            del self.programs[program_id]
+        self.logger.info(f"Программа {program_id} удалена")
+        self.events.append({'type': 'removed', 'program_id': program_id})
+        return True
+
+    def get_program_paths(self):
+        """Directories of every registered program"""
+        return [program['path'] for program in list(self.programs.values())]
+
     def get_programs_status(self):
         """Get current status of all programs"""
-        with self.lock:
-            status = {}
-            for program_id, program in self.programs.items():
-                status[program_id] = {
-                    'name': program['name'],
-                    'status': program['status'],
-                    'pid': program['process'].pid if program['process'] and program['process'].poll() is None else None,
-                    'last_update': program['last_update']
-                }
-            return status
-
-    def start_program(self, program_id):
-        """Start a specific program"""
+        status = {}
+        for program_id, program in list(self.programs.items()):
+            with program['lock']:
+                status[program_id] = self._program_status(program)
+        return status
+
+    def _program_status(self, program):
+        return {
+            'name': program['name'],
+            'status': program['status'],
+            'pid': program['process'].pid if program['process'] and program['process'].poll() is None else None,
+            'last_update': program['last_update'],
+            'restart': program['restart'].to_dict(),
+            'state': program['state'].summary()
+        }
+
+    def _running_pids(self):
+        """PIDs of the programs whose process is alive"""
+        pids = {}
+        for program_id, program in list(self.programs.items()):
+            process = program['process']
+            if process and process.poll() is None:
+                pids[program_id] = process.pid
+        return pids
+
+    def get_program_metrics(self, program_id, since=0):
+        """Resource time series of a program"""
+        if program_id not in self.programs:
+            return None
+        return {
+            'interval': self.sampler.interval,
+            'latest': self.sampler.latest(program_id),
+            'series': self.sampler.metrics(program_id, since)
+        }
+
+    def _on_metrics(self, timestamp, samples):
+        """One round of resource samples, a single event for every program"""
+        self.events.append({'type': 'metrics', 'timestamp': timestamp, 'samples': samples})
+
+    def get_program_state(self, program_id):
+        """Last state published by the miner: points, streamers, watched streams and queues"""
+        if program_id not in self.programs:
+            return None
+        return self.programs[program_id]['state'].to_dict()
+
+    def _set_status(self, program_id, status):
+        """Change the status of a program and publish it to the event stream"""
+        program = self.programs[program_id]
+        program['status'] = status
+        program['last_update'] = datetime.now().isoformat()
+        self.events.append({'type': 'status', 'program_id': program_id, **self._program_status(program)})
+
+    def start_program(self, program_id, manual=True):
+        """Start a specific program in the background, returns the Future of the operation or None"""
         if program_id not in self.programs:
             self.logger.error(f"Программа {program_id} не найдена")
-            return False
-            
-        with self.lock:
-            program = self.programs[program_id]
-            
+            return None
+
+        program = self.programs[program_id]
+        with program['lock']:
+            if program['status'] in ('запускается', 'останавливается'):
+                self.logger.warning(f"Программа {program_id} уже {program['status']}")
+                return None
             if program['process'] and program['process'].poll() is None:
                 self.logger.warning(f"Программа {program_id} уже запущена")
-                return False
-                
-            try:
-                program_dir = os.path.abspath(program['path'])
-                script_path = os.path.join(program_dir, program['script'])
-                
-                if not os.path.exists(script_path):
-                    self.logger.error(f"Скрипт не найден: {script_path}")
-                    return False
-                
-                # Start the process
+                return None
+
+            program_dir = os.path.abspath(program['path'])
+            script_path = os.path.join(program_dir, program['script'])
+            if not os.path.exists(script_path):
+                self.logger.error(f"Скрипт не найден: {script_path}")
+                return None
+
+            if manual:
+                program['restart'].manual_start()
+            else:
+                program['restart'].auto_start()
+            self._set_status(program_id, 'запускается')
+            program['operation'] = self.executor.submit(self._start_process, program_id, program_dir, script_path)
+            return program['operation']
+
+    def _start_process(self, program_id, program_dir, script_path):
+        program = self.programs[program_id]
+        status_pipe, status_fd = None, None
+        try:
+            # Analytics are served by the supervisor, don't let every miner bind its own server
+            env = dict(os.environ)
+            env[DISABLE_MINER_ANALYTICS_ENV] = '1'
+            # Event names in the console output make them searchable
+            env[LOG_EVENTS_ENV] = '1'
+            heartbeat_path = program['restart'].policy.heartbeat_path(program_dir)
+            if heartbeat_path is not None:
+                env[HEARTBEAT_FILE_ENV] = heartbeat_path
+            # Structured state goes through its own pipe, the console output stays for humans
+            status_pipe, status_fd = open_status_pipe()
+            env[STATUS_FD_ENV] = str(status_fd)
+
+            process = None
+            if self.fork_server is not None:
+                try:
+                    process = self.fork_server.spawn(script_path, program_dir, env, pass_fds=(status_fd,))
+                except ForkServerError as e:
+                    self.logger.warning(f"Программа {program_id} запускается без fork-сервера: {str(e)}")
+            if process is None:
                 process = subprocess.Popen(
                     [sys.executable, script_path],
                     cwd=program_dir,
+                    env=env,
                     stdout=subprocess.PIPE,
                     stderr=subprocess.STDOUT,
-                    universal_newlines=True,
-                    bufsize=1
+                    pass_fds=(status_fd,)
                 )
-                
+            os.close(status_fd)
+            status_fd = None
+
+            with program['lock']:
                 program['process'] = process
-                program['status'] = 'запущен'
-                program['last_update'] = datetime.now().isoformat()
-                
-                # Start log monitoring thread for this program
-                log_thread = threading.Thread(
-                    target=self._monitor_program_output,
-                    args=(program_id,),
-                    daemon=True
-                )
-                log_thread.start()
-                
-                self.logger.info(f"Программа {program_id} запущена (PID: {process.pid})")
-                self._add_log(program_id, f"Программа запущена (PID: {process.pid})")
-                return True
-                
-            except Exception as e:
-                self.logger.error(f"Ошибка запуска программы {program_id}: {str(e)}")
-                program['status'] = 'ошибка'
-                program['last_update'] = datetime.now().isoformat()
-                self._add_log(program_id, f"Ошибка запуска: {str(e)}")
-                return False
+                program['restart'].started()
+                program['state'].reset()
+                self._set_status(program_id, 'запущен')
+
+            # Hand the pipes over to the output pump thread
+            self.output_pump.add((program_id, process), process.stdout)
+            # A record cut short by the miner's exit is dropped, not parsed
+            self.output_pump.add((program_id, process), status_pipe, self._on_status, lambda owner: None,
+                                 flush_partial=False)
+
+            self.logger.info(f"Программа {program_id} запущена (PID: {process.pid})")
+            self._add_log(program_id, f"Программа запущена (PID: {process.pid})")
+            return True
+
+        except Exception as e:
+            # Popen failed before the pipe was handed over
+            if status_fd is not None:
+                os.close(status_fd)
+            if status_pipe is not None:
+                status_pipe.close()
+            self.logger.error(f"Ошибка запуска программы {program_id}: {str(e)}")
+            self._add_log(program_id, f"Ошибка запуска: {str(e)}")
+            with program['lock']:
+                self._schedule_restart(program_id, None, f"ошибка запуска: {str(e)}")
+            return False
 
     def stop_program(self, program_id):
-        """Stop a specific program"""
+        """Stop a specific program in the background, returns the Future of the operation or None"""
         if program_id not in self.programs:
             self.logger.error(f"Программа {program_id} не найдена")
-            return False
-            
-        with self.lock:
-            program = self.programs[program_id]
-            
-            if not program['process'] or program['process'].poll() is not None:
+            return None
+
+        program = self.programs[program_id]
+        with program['lock']:
+            if program['status'] == 'останавливается':
+                self.logger.warning(f"Программа {program_id} уже останавливается")
+                return None
+            if program['status'] == 'запускается':
+                self.logger.warning(f"Программа {program_id} еще запускается")
+                return None
+
+            # A stop requested by the user also cancels a pending restart
+            program['restart'].stopped()
+            process = program['process']
+            if not process or process.poll() is not None:
                 self.logger.warning(f"Программа {program_id} не запущена")
-                program['status'] = 'остановлен'
-                program['last_update'] = datetime.now().isoformat()
-                return True
-                
+                self._set_status(program_id, 'остановлен')
+                return self.executor.submit(lambda: True)
+
+            self._set_status(program_id, 'останавливается')
+            program['operation'] = self.executor.submit(self._stop_process, program_id, process)
+            return program['operation']
+
+    def _stop_process(self, program_id, process):
+        program = self.programs[program_id]
+        pid = process.pid
+        try:
+            # Try graceful termination first
+            process.terminate()
+
+            # Wait for process to terminate, without holding any lock
             try:
-                process = program['process']
-                pid = process.pid
-                
-                # Try graceful termination first
-                process.terminate()
-                
-                # Wait for process to terminate
-                try:
-                    process.wait(timeout=5)
-                    self.logger.info(f"Программа {program_id} остановлена корректно")
-                except subprocess.TimeoutExpired:
-                    # Force kill if graceful termination failed
-                    process.kill()
-                    process.wait()
-                    self.logger.warning(f"Программа {program_id} принудительно остановлена")
-                
-                program['status'] = 'остановлен'
-                program['last_update'] = datetime.now().isoformat()
-                self._add_log(program_id, f"Программа остановлена (PID: {pid})")
-                return True
-                
-            except Exception as e:
-                self.logger.error(f"Ошибка остановки программы {program_id}: {str(e)}")
-                self._add_log(program_id, f"Ошибка остановки: {str(e)}")
-                return False
+                process.wait(timeout=5)
+                self.logger.info(f"Программа {program_id} остановлена корректно")
+            except subprocess.TimeoutExpired:
+                # Force kill if graceful termination failed
+                process.kill()
+                process.wait()
+                self.logger.warning(f"Программа {program_id} принудительно остановлена")
+
+            with program['lock']:
+                self._set_status(program_id, 'остановлен')
+            self._add_log(program_id, f"Программа остановлена (PID: {pid})")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"Ошибка остановки программы {program_id}: {str(e)}")
+            with program['lock']:
+                self._set_status(program_id, 'запущен' if process.poll() is None else 'остановлен')
+            self._add_log(program_id, f"Ошибка остановки: {str(e)}")
+            return False
+
+    def shutdown(self, timeout=None):
+        """Stop every program, the background threads, the log history and the fork server"""
+        self.monitoring = False
+        self.stop_all(timeout)
+        self.sampler.stop(timeout=self.sampler.interval)
+        self.log_store.close(timeout)
+        if self.fork_server is not None:
+            # The preloaded interpreter and its socket would outlive the supervisor
+            self.fork_server.close()
+
+    def stop_all(self, timeout=None):
+        """Stop every program in parallel and wait for all of them"""
+        futures = []
+        for program_id, program in list(self.programs.items()):
+            operation = program['operation']
+            if program['status'] == 'запускается' and operation is not None:
+                # Let the start finish, then stop it like the others
+                wait([operation], timeout=timeout)
+            # A stop already in progress is waited for as well
+            future = self.stop_program(program_id) or program['operation']
+            if future is not None:
+                futures.append(future)
+        wait(futures, timeout=timeout)
 
     def get_program_logs(self, program_id):
         """Get logs for a specific program"""
         if program_id not in self.programs:
             return []
-        with self.lock:
-            return list(self.programs[program_id]['logs'])
+        return self.programs[program_id]['logs'].lines()
 
-    def get_recent_logs(self, program_id, since_time=None):
-        """Get recent logs since a specific time"""
+    def get_logs_after(self, program_id, after_seq=0, limit=None):
+        """Get log entries newer than the client's cursor, returns (entries, last_seq)"""
         if program_id not in self.programs:
-            return []
-        
-        with self.lock:
-            logs = list(self.programs[program_id]['logs'])
-            if since_time:
-                # Filter logs newer than since_time
-                filtered_logs = []
-                for log in logs:
-                    if log.startswith('[') and ']' in log:
-                        try:
-                            log_time_str = log.split(']')[0][1:]
-                            log_time = datetime.fromisoformat(log_time_str.replace(' ', 'T'))
-                            if log_time > since_time:
-                                filtered_logs.append(log)
-                        except:
-                            # If parsing fails, include the log
-                            filtered_logs.append(log)
-                return filtered_logs
-            return logs[-10:]  # Return last 10 logs
+            return [], 0
+        logs = self.programs[program_id]['logs']
+        entries = logs.after(after_seq, limit)
+        return entries, entries[-1].seq if entries else logs.last_seq
+
+    def stream_program_logs(self, program_id, after_seq=None, keepalive=15):
+        """Generator that yields new log entries for a program, None every `keepalive` idle seconds"""
+        if program_id not in self.programs:
+            return
+
+        # Subscribers sleep until _add_log() appends something, idle clients cost nothing
+        subscription = self.programs[program_id]['logs'].subscribe(after_seq, backlog=50)
+        while True:
+            entries, missed = subscription.poll(timeout=keepalive)
+            if missed:
+                self.logger.warning(f"Поток логов программы {program_id} пропустил {missed} строк")
+            if not entries:
+                yield None
+            for entry in entries:
+                yield entry
+
+    def snapshot(self, backlog=200, metrics_backlog=120):
+        """Status, recent logs and resource samples of every program, sent to a dashboard when it (re)connects"""
+        metrics_since = time.time() - self.sampler.interval * metrics_backlog
+        return {
+            'type': 'snapshot',
+            'programs': self.get_programs_status(),
+            'logs': {
+                program_id: [{'seq': entry.seq, 'line': entry.line} for entry in program['logs'].tail(backlog)]
+                for program_id, program in list(self.programs.items())
+            },
+            'states': {
+                program_id: program['state'].to_dict()['state']
+                for program_id, program in list(self.programs.items())
+            },
+            'metrics': {
+                program_id: self.sampler.metrics(program_id, metrics_since)
+                for program_id in list(self.programs)
+            }
+        }
+
+    def stream_events(self, after_seq=None, keepalive=15):
+        """Generator of (cursor, events) batches for every program, (cursor, []) every `keepalive` idle seconds"""
+        if after_seq is None or after_seq > self.events.last_seq:
+            # New dashboard, or one resuming from before a supervisor restart (sequences start over):
+            # start with a snapshot, then only changes
+            after_seq = self.events.last_seq
+            yield after_seq, [self.snapshot()]
+
+        subscription = self.events.subscribe(after_seq)
+        while True:
+            entries, missed = subscription.poll(timeout=keepalive)
+            if missed:
+                # The client was too far behind to resume, resynchronize it
+                yield subscription.cursor, [self.snapshot()]
+                continue
+            yield subscription.cursor, [entry.line for entry in entries]
 
     def clear_program_logs(self, program_id):
         """Clear logs for a specific program"""
         if program_id in self.programs:
-            with self.lock:
-                self.programs[program_id]['logs'].clear()
-                self._add_log(program_id, "Логи очищены")
+            self.programs[program_id]['logs'].clear()
+            self._add_log(program_id, "Логи очищены")
 
     def _add_log(self, program_id, message):
         """Add a log entry for a program"""
+        self._add_logs(program_id, [message])
+
+    def _add_logs(self, program_id, messages):
+        """Add a batch of log entries for a program with a single timestamp"""
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        log_entry = f"[{timestamp}] {message}"
-        self.programs[program_id]['logs'].append(log_entry)
+        log_entries = [f"[{timestamp}] {message}" for message in messages]
+        last_seq = self.programs[program_id]['logs'].extend(log_entries)
         self.programs[program_id]['last_update'] = datetime.now().isoformat()
+        first_seq = last_seq - len(log_entries) + 1
+        self.events.extend([
+            {'type': 'log', 'program_id': program_id, 'seq': first_seq + index, 'line': log_entry}
+            for index, log_entry in enumerate(log_entries)
+        ])
+        # Only queued here, the writes happen in the log store's thread
+        self.log_store.append(program_id, time.time(), log_entries)
 
-    def _monitor_program_output(self, program_id):
-        """Monitor output from a specific program"""
-        program = self.programs[program_id]
-        process = program['process']
-        
-        try:
-            while process.poll() is None:
-                line = process.stdout.readline()
-                if line:
-                    with self.lock:
-                        self._add_log(program_id, line.strip())
-                else:
-                    time.sleep(0.1)
-        except Exception as e:
-            self.logger.error(f"Ошибка мониторинга программы {program_id}: {str(e)}")
-        finally:
-            # Process has ended
-            if process.poll() is not None:
-                with self.lock:
-                    program['status'] = 'остановлен'
-                    program['last_update'] = datetime.now().isoformat()
-                    self._add_log(program_id, f"Программа завершена с кодом {process.returncode}")
+    def search_logs(self, program_id, criteria, before=None, limit=100):
+        """Page of the program's log history matching `criteria` (text, level, logger, event, streamer), newest first"""
+        if program_id not in self.programs:
+            return None
+        return self.log_store.search(program_id, before=before, limit=limit, **criteria)
+
+    def get_log_facets(self, program_id):
+        """Levels, functions, events and streamers present in the program's log history"""
+        if program_id not in self.programs:
+            return None
+        return self.log_store.facets(program_id)
+
+    def _on_output(self, owner, lines):
+        """Lines read by the output pump"""
+        program_id, process = owner
+        program = self.programs.get(program_id)
+        if program is not None:
+            program['last_output'] = time.time()
+            self._add_logs(program_id, lines)
+
+    def _on_status(self, owner, lines):
+        """Snapshots and deltas read from the status pipe of a program"""
+        program_id, process = owner
+        program = self.programs.get(program_id)
+        if program is None or program['process'] is not process:
+            return
+        events = []
+        for line in lines:
+            if not line:
+                continue
+            message = program['state'].apply_line(line)
+            if message is not None:
+                events.append({'type': 'state', 'program_id': program_id, 'message': message})
+        if events:
+            self.events.extend(events)
+
+    def _on_output_eof(self, owner):
+        """The program closed its output, usually because it ended"""
+        program_id, process = owner
+        program = self.programs.get(program_id)
+        if program is None:
+            return
+        with program['lock']:
+            if process.poll() is None:
+                # The pipe usually closes just before the exit status is available, but a program may
+                # also keep running without its output: the monitor reaps it, no thread waits for it
+                program['reap'] = process
+                return
+            self._finish_program(program_id, process)
+
+    def _finish_program(self, program_id, process):
+        """The program ended after closing its output, called with the program lock held"""
+        self._add_log(program_id, f"Программа завершена с кодом {process.returncode}")
+        # A stop in progress reports the exit itself
+        if self.programs[program_id]['process'] is process and self.programs[program_id]['status'] == 'запущен':
+            self._program_exited(program_id, process)
+
+    def _program_exited(self, program_id, process):
+        """A running program ended on its own, called with the program lock held"""
+        tracker = self.programs[program_id]['restart']
+        reason, tracker.kill_reason = tracker.kill_reason, None
+        self._schedule_restart(program_id, process.returncode, reason)
+
+    def _schedule_restart(self, program_id, returncode, reason):
+        """Apply the restart policy after a crash, called with the program lock held"""
+        tracker = self.programs[program_id]['restart']
+        delay = tracker.exited(returncode, reason)
+        if delay is not None:
+            self._set_status(program_id, 'ошибка')
+            self._add_log(program_id, f"Сбой ({tracker.last_failure}), перезапуск через {delay} с")
+        elif tracker.gave_up:
+            self._set_status(program_id, 'ошибка')
+            self._add_log(program_id, f"Слишком много сбоев подряд ({tracker.last_failure}), автоперезапуск отключен")
+            self.logger.error(f"Программа {program_id} падает в цикле, автоперезапуск отключен")
+        else:
+            self._set_status(program_id, 'ошибка' if returncode is None else 'остановлен')
+
+    def _check_liveness(self, program_id, program):
+        """Kill a running program that stopped writing output or heartbeats, called with the program lock held"""
+        tracker = program['restart']
+        reason = tracker.liveness_failure(program['last_output'], os.path.abspath(program['path']))
+        if reason is None or tracker.kill_reason is not None:
+            return
+        tracker.kill_reason = reason
+        self.logger.warning(f"Программа {program_id} не отвечает ({reason}), перезапуск")
+        self._add_log(program_id, f"Программа не отвечает ({reason}), перезапуск")
+        program['process'].kill()
 
     def _monitor_programs(self):
         """Background thread to monitor program status"""
         while self.monitoring:
             try:
-                with self.lock:
-                    for program_id, program in self.programs.items():
+                due = []
+                for program_id, program in list(self.programs.items()):
+                    with program['lock']:
+                        reap = program['reap']
+                        if reap is not None and reap.poll() is not None:
+                            program['reap'] = None
+                            self._finish_program(program_id, reap)
                         process = program['process']
-                        if process and process.poll() is not None:
-                            # Process has ended
-                            if program['status'] == 'запущен':
-                                program['status'] = 'остановлен'
-                                program['last_update'] = datetime.now().isoformat()
+                        if program['status'] == 'запущен' and process:
+                            if process.poll() is not None:
+                                # Process has ended and the output pump didn't report it yet
+                                if program['reap'] is process:
+                                    program['reap'] = None
                                 self._add_log(program_id, f"Программа неожиданно завершилась с кодом {process.returncode}")
-                
+                                self._program_exited(program_id, process)
+                            else:
+                                self._check_liveness(program_id, program)
+                        elif program['status'] == 'ошибка' and program['restart'].due():
+                            due.append(program_id)
+
+                for program_id in due:
+                    self.logger.info(f"Автоматический перезапуск программы {program_id}")
+                    if self.start_program(program_id, manual=False) is None:
+                        # Can't be started at all (missing script...), wait for the user
+                        self.programs[program_id]['restart'].cancel_restart()
+
                 time.sleep(2)  # Check every 2 seconds
                 
             except Exception as e:
@@ -276,8 +585,16 @@ class ProgramManager:
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-12345")
 
-# Initialize program manager
-program_manager = ProgramManager()
+# Initialize program manager: web workers started with SUPERVISOR_SOCKET talk to the daemon (`python run.py daemon`)
+DAEMON_MODE = __name__ == '__main__' and sys.argv[1:2] == ['daemon']
+if os.environ.get(SOCKET_ENV) and not DAEMON_MODE:
+    program_manager = RemoteProgramManager(os.environ[SOCKET_ENV])
+else:
+    program_manager = ProgramManager()
+
+# One analytics service for every account's analytics/<username>/ store
+analytics_index = AnalyticsIndex(program_manager.get_program_paths)
+app.register_blueprint(create_analytics_blueprint(analytics_index))
 
 @app.route('/')
 def index():
@@ -285,18 +602,49 @@ def index():
     programs = program_manager.get_programs_status()
     return render_template('index.html', programs=programs)
 
+@app.route('/programs/<int:program_id>/card')
+def program_card(program_id):
+    """Dashboard card of one program, inserted by the page when a program is added"""
+    status = program_manager.get_programs_status().get(program_id)
+    if status is None:
+        return jsonify({'status': 'error', 'message': f'Программа {program_id} не найдена'}), 404
+    return render_template('_program_card.html', program_id=program_id, program=status)
+
 @app.route('/api/programs/status')
 def get_programs_status():
     """API endpoint to get current status of all programs"""
     return jsonify(program_manager.get_programs_status())
 
+@app.route('/api/programs', methods=['POST'])
+def add_program():
+    """Register a new program: {"name", "path", "script", "restart"}"""
+    try:
+        program_id, status = program_manager.add_program(request.get_json(silent=True))
+        return jsonify({'status': 'success', 'message': f'Программа {program_id} добавлена',
+                        'program_id': program_id, 'program': status}), 201
+    except RegistryError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        app.logger.error(f"Ошибка добавления программы: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/programs/<int:program_id>', methods=['DELETE'])
+def remove_program(program_id):
+    """Unregister a stopped program"""
+    try:
+        if program_manager.remove_program(program_id):
+            return jsonify({'status': 'success', 'message': f'Программа {program_id} удалена'})
+        return jsonify({'status': 'error', 'message': f'Программа {program_id} не найдена или еще работает'}), 400
+    except Exception as e:
+        app.logger.error(f"Ошибка удаления программы {program_id}: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @app.route('/api/programs/<int:program_id>/start', methods=['POST'])
 def start_program(program_id):
     """Start a specific program"""
     try:
-        success = program_manager.start_program(program_id)
-        if success:
-            return jsonify({'status': 'success', 'message': f'Программа {program_id} запущена'})
+        if program_manager.start_program(program_id):
+            return jsonify({'status': 'success', 'message': f'Программа {program_id} запускается'}), 202
         else:
             return jsonify({'status': 'error', 'message': f'Не удалось запустить программу {program_id}'}), 400
     except Exception as e:
@@ -307,9 +655,8 @@ def start_program(program_id):
 def stop_program(program_id):
     """Stop a specific program"""
     try:
-        success = program_manager.stop_program(program_id)
-        if success:
-            return jsonify({'status': 'success', 'message': f'Программа {program_id} остановлена'})
+        if program_manager.stop_program(program_id):
+            return jsonify({'status': 'success', 'message': f'Программа {program_id} останавливается'}), 202
         else:
             return jsonify({'status': 'error', 'message': f'Не удалось остановить программу {program_id}'}), 400
     except Exception as e:
@@ -320,24 +667,115 @@ def stop_program(program_id):
 def get_program_logs(program_id):
     """Get logs for a specific program"""
     try:
-        since_param = request.args.get('since')
-        since_time = None
-        if since_param:
-            try:
-                since_time = datetime.fromisoformat(since_param)
-            except:
-                pass
-        
-        if since_time:
-            logs = program_manager.get_recent_logs(program_id, since_time)
-        else:
-            logs = program_manager.get_program_logs(program_id)
-        
-        return jsonify({'logs': logs, 'timestamp': datetime.now().isoformat()})
+        after_seq = request.args.get('after_seq', default=0, type=int)
+        entries, last_seq = program_manager.get_logs_after(program_id, after_seq)
+
+        return jsonify({
+            'logs': [entry.line for entry in entries],
+            'last_seq': last_seq,
+            'timestamp': datetime.now().isoformat()
+        })
     except Exception as e:
         app.logger.error(f"Ошибка получения логов программы {program_id}: {str(e)}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
+@app.route('/logs/search')
+def log_search():
+    """Log history search page"""
+    programs = program_manager.get_programs_status()
+    return render_template('log_search.html', programs=programs)
+
+@app.route('/api/programs/<int:program_id>/logs/search')
+def search_program_logs(program_id):
+    """Search the log history: q, level, logger, event, streamer; `before` is the cursor of the next page"""
+    try:
+        criteria = {
+            'text': request.args.get('q'),
+            'level': request.args.get('level'),
+            'logger': request.args.get('logger'),
+            'event': request.args.get('event'),
+            'streamer': request.args.get('streamer')
+        }
+        before = request.args.get('before', type=int)
+        limit = min(request.args.get('limit', default=100, type=int), 1000)
+        page = program_manager.search_logs(program_id, criteria, before, limit)
+        if page is None:
+            return jsonify({'status': 'error', 'message': f'Программа {program_id} не найдена'}), 404
+        return jsonify(page)
+    except Exception as e:
+        app.logger.error(f"Ошибка поиска по логам программы {program_id}: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/programs/<int:program_id>/logs/facets')
+def program_log_facets(program_id):
+    """Values available for the search filters"""
+    facets = program_manager.get_log_facets(program_id)
+    if facets is None:
+        return jsonify({'status': 'error', 'message': f'Программа {program_id} не найдена'}), 404
+    return jsonify(facets)
+
+@app.route('/api/programs/<int:program_id>/state')
+def get_program_state(program_id):
+    """Last state published by the miner over its status pipe"""
+    try:
+        state = program_manager.get_program_state(program_id)
+        if state is None:
+            return jsonify({'status': 'error', 'message': f'Программа {program_id} не найдена'}), 404
+        return jsonify(state)
+    except Exception as e:
+        app.logger.error(f"Ошибка получения состояния программы {program_id}: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/programs/<int:program_id>/metrics')
+def get_program_metrics(program_id):
+    """Resource usage time series of a program, `since` is a unix timestamp"""
+    try:
+        since = request.args.get('since', default=0, type=float)
+        metrics = program_manager.get_program_metrics(program_id, since)
+        if metrics is None:
+            return jsonify({'status': 'error', 'message': f'Программа {program_id} не найдена'}), 404
+        return jsonify(metrics)
+    except Exception as e:
+        app.logger.error(f"Ошибка получения метрик программы {program_id}: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@app.route('/api/programs/<int:program_id>/logs/stream')
+def stream_program_logs(program_id):
+    """Stream logs for a specific program using Server-Sent Events"""
+    # EventSource sends the last received id back when it reconnects
+    after_seq = request.headers.get('Last-Event-ID', type=int)
+
+    def generate():
+        try:
+            for entry in program_manager.stream_program_logs(program_id, after_seq):
+                if entry is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"id: {entry.seq}\ndata: {entry.line}\n\n"
+        except Exception as e:
+            app.logger.error(f"Ошибка потока логов программы {program_id}: {str(e)}")
+            yield f"data: Ошибка: {str(e)}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/events')
+def stream_events():
+    """Status changes and log lines of every program multiplexed on one Server-Sent Events stream"""
+    # EventSource sends the last received id back when it reconnects
+    after_seq = request.headers.get('Last-Event-ID', type=int)
+
+    def generate():
+        try:
+            for cursor, events in program_manager.stream_events(after_seq):
+                if events:
+                    yield f"id: {cursor}\ndata: {json.dumps(events)}\n\n"
+                else:
+                    yield ": keep-alive\n\n"
+        except Exception as e:
+            app.logger.error(f"Ошибка потока событий: {str(e)}")
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
 @app.route('/api/programs/<int:program_id>/clear_logs', methods=['POST'])
 def clear_program_logs(program_id):
     """Clear logs for a specific program"""
@@ -350,20 +788,36 @@ def clear_program_logs(program_id):
 
 def signal_handler(signum, frame):
     """Handle shutdown signals"""
+    if isinstance(program_manager, RemoteProgramManager):
+        # The programs belong to the daemon, only this web process exits
+        sys.exit(0)
+
     logger.info("Получен сигнал завершения, останавливаем все программы...")
-    program_manager.monitoring = False
     
-    # Stop all running programs
-    for program_id in program_manager.programs:
-        program_manager.stop_program(program_id)
+    # Stop all running programs in parallel
+    program_manager.shutdown()
     
     logger.info("Все программы остановлены")
     sys.exit(0)
 
+def run_daemon():
+    """Own the programs and serve them to the web workers over a Unix socket"""
+    socket_path = os.environ.get(SOCKET_ENV, DEFAULT_SOCKET)
+    server = SupervisorServer(program_manager, socket_path)
+    logger.info(f"Демон супервизора слушает {socket_path}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
 if __name__ == '__main__':
     # Register signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+
+    if DAEMON_MODE:
+        run_daemon()
+        sys.exit(0)
     
     logger.info("Запуск Python Program Manager...")
     logger.info("Веб-интерфейс будет доступен по адресу: http://0.0.0.0:5000")
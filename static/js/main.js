@@ -1,130 +1,214 @@
 // Program monitoring and management functionality
 
-let statusUpdateInterval;
-let logUpdateIntervals = {};
-let lastLogTimestamps = {};
+let eventSource = null;
+let lastLogSeqs = {};
+
+// Resource usage history shown on every card, filled by the snapshot and the 'metrics' events
+const METRICS_POINTS = 120;
+let metricsHistory = {};
+
+// Miner state (points, streamers, watched streams) rebuilt from snapshots and deltas
+let programStates = {};
 
 function initializeProgramMonitoring() {
-    // Load initial logs for all programs
-    [1, 2, 3, 4].forEach(programId => {
-        loadProgramLogs(programId);
-        startLogPolling(programId);
+    // One connection for the status and logs of every program.
+    // EventSource reconnects by itself and resumes from the last event id.
+    eventSource = new EventSource('/api/events');
+    eventSource.onmessage = event => {
+        JSON.parse(event.data).forEach(handleEvent);
+    };
+    eventSource.onerror = () => {
+        console.error('Event stream disconnected, reconnecting...');
+    };
+}
+
+function setProgramMetrics(programId, series) {
+    // Time series of the snapshot: {timestamps: [...], field: [...]}
+    metricsHistory[programId] = series.timestamps.map((timestamp, i) => {
+        const sample = {timestamp: timestamp};
+        Object.keys(series).forEach(field => {
+            if (field !== 'timestamps') sample[field] = series[field][i];
+        });
+        return sample;
+    }).slice(-METRICS_POINTS);
+    renderProgramMetrics(programId);
+}
+
+function addProgramMetrics(timestamp, samples) {
+    Object.keys(samples).forEach(programId => {
+        const history = metricsHistory[programId] || (metricsHistory[programId] = []);
+        history.push({timestamp: timestamp, ...samples[programId]});
+        history.splice(0, Math.max(history.length - METRICS_POINTS, 0));
+        renderProgramMetrics(programId);
     });
-    
-    // Start status monitoring
-    startStatusMonitoring();
 }
 
-function loadProgramLogs(programId) {
-    fetch(`/api/programs/${programId}/logs`)
-        .then(response => response.json())
-        .then(data => {
-            const logsContainer = document.getElementById(`logs-${programId}`);
-            if (data.logs && data.logs.length > 0) {
-                logsContainer.innerHTML = data.logs.map(log => 
-                    `<div class="log-line">${escapeHtml(log)}</div>`
-                ).join('');
-                scrollToBottom(logsContainer);
-            } else {
-                logsContainer.innerHTML = '<div class="text-muted">Нет доступных логов</div>';
-            }
-            
-            // Store timestamp for future polling
-            if (data.timestamp) {
-                lastLogTimestamps[programId] = data.timestamp;
-            }
+function renderProgramMetrics(programId) {
+    const history = metricsHistory[programId] || [];
+    const latest = history[history.length - 1];
+    const setText = (name, text) => {
+        const element = document.getElementById(`metric-${name}-${programId}`);
+        if (element) element.textContent = text;
+    };
+    if (latest) {
+        setText('cpu', `${latest.cpu_percent.toFixed(1)}%`);
+        setText('rss', formatBytes(latest.rss));
+        setText('threads', latest.threads);
+        setText('fds', latest.fds);
+        setText('connections', latest.connections);
+    }
+
+    const sparkline = document.getElementById(`sparkline-${programId}`);
+    if (!sparkline) return;
+    drawSparkline(sparkline.querySelector('.sparkline-rss'), history.map(point => point.rss));
+    drawSparkline(sparkline.querySelector('.sparkline-threads'), history.map(point => point.threads));
+}
+
+function drawSparkline(polyline, values) {
+    const max = Math.max(...values, 1);
+    const step = 100 / Math.max(METRICS_POINTS - 1, 1);
+    const offset = 100 - (values.length - 1) * step;
+    polyline.setAttribute('points', values.map((value, i) =>
+        `${(offset + i * step).toFixed(2)},${(20 - value / max * 19).toFixed(2)}`
+    ).join(' '));
+}
+
+function formatBytes(bytes) {
+    const units = ['B', 'KB', 'MB', 'GB'];
+    let unit = 0;
+    while (bytes >= 1024 && unit < units.length - 1) {
+        bytes /= 1024;
+        unit++;
+    }
+    return `${bytes.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+}
+
+function handleEvent(event) {
+    if (event.type === 'snapshot') {
+        // Programs may have been added or removed while we were disconnected
+        programCardIds().forEach(programId => {
+            if (!(programId in event.programs)) removeProgramCard(programId);
+        });
+        Object.keys(event.programs).forEach(programId => {
+            if (!document.getElementById(`program-card-${programId}`)) insertProgramCard(programId);
+            updateProgramStatus(programId, event.programs[programId]);
+        });
+        Object.keys(event.logs).forEach(programId => {
+            renderProgramLogs(programId, event.logs[programId].map(entry => entry.line));
+            const entries = event.logs[programId];
+            lastLogSeqs[programId] = entries.length > 0 ? entries[entries.length - 1].seq : 0;
+        });
+        programStates = event.states || {};
+        Object.keys(programStates).forEach(renderProgramState);
+        metricsHistory = {};
+        Object.keys(event.metrics || {}).forEach(programId => {
+            setProgramMetrics(programId, event.metrics[programId]);
+        });
+    } else if (event.type === 'metrics') {
+        addProgramMetrics(event.timestamp, event.samples);
+    } else if (event.type === 'state') {
+        applyStateMessage(event.program_id, event.message);
+    } else if (event.type === 'status') {
+        updateProgramStatus(event.program_id, event);
+    } else if (event.type === 'added') {
+        lastLogSeqs[event.program_id] = 0;
+        insertProgramCard(event.program_id);
+    } else if (event.type === 'removed') {
+        removeProgramCard(event.program_id);
+    } else if (event.type === 'log') {
+        // The snapshot may already contain the line
+        if (event.seq > (lastLogSeqs[event.program_id] || 0)) {
+            appendProgramLogs(event.program_id, [event.line]);
+            lastLogSeqs[event.program_id] = event.seq;
+        }
+    }
+}
+
+function programCardIds() {
+    return Array.from(document.querySelectorAll('.program-card[data-program-id]'))
+        .map(card => card.dataset.programId);
+}
+
+function insertProgramCard(programId) {
+    // The card markup lives in one server-side template
+    fetch(`/programs/${programId}/card`)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP ${response.status}`);
+            return response.text();
+        })
+        .then(html => {
+            if (document.getElementById(`program-card-${programId}`)) return;
+            document.getElementById('programs-grid').insertAdjacentHTML('beforeend', html);
+            loadProgramLogs(programId);
+            renderProgramMetrics(programId);
+            renderProgramState(programId);
         })
         .catch(error => {
-            console.error(`Error loading logs for program ${programId}:`, error);
-            const logsContainer = document.getElementById(`logs-${programId}`);
-            logsContainer.innerHTML = '<div class="text-danger">Ошибка загрузки логов</div>';
+            console.error(`Error loading card for program ${programId}:`, error);
         });
 }
 
-function startLogPolling(programId) {
-    // Clear existing interval if any
-    if (logUpdateIntervals[programId]) {
-        clearInterval(logUpdateIntervals[programId]);
+function removeProgramCard(programId) {
+    const card = document.getElementById(`program-card-${programId}`);
+    if (card) card.remove();
+    delete lastLogSeqs[programId];
+    delete metricsHistory[programId];
+    delete programStates[programId];
+}
+
+function renderProgramLogs(programId, logs) {
+    const logsContainer = document.getElementById(`logs-${programId}`);
+    if (!logsContainer) return;
+    if (logs.length > 0) {
+        logsContainer.innerHTML = logs.map(log =>
+            `<div class="log-line">${escapeHtml(log)}</div>`
+        ).join('');
+        scrollToBottom(logsContainer);
+    } else {
+        logsContainer.innerHTML = '<div class="text-muted">Нет доступных логов</div>';
     }
-    
-    // Poll for new logs every 2 seconds
-    logUpdateIntervals[programId] = setInterval(() => {
-        pollForNewLogs(programId);
-    }, 2000);
 }
 
-function pollForNewLogs(programId) {
-    const sinceParam = lastLogTimestamps[programId] ? `?since=${encodeURIComponent(lastLogTimestamps[programId])}` : '';
-    
-    fetch(`/api/programs/${programId}/logs${sinceParam}`)
+function appendProgramLogs(programId, logs) {
+    const logsContainer = document.getElementById(`logs-${programId}`);
+    if (!logsContainer) return;
+    logs.forEach(log => {
+        const logDiv = document.createElement('div');
+        logDiv.className = 'log-line';
+        logDiv.textContent = log;
+        logsContainer.appendChild(logDiv);
+    });
+
+    // Keep only last 500 lines for performance
+    const logLines = logsContainer.querySelectorAll('.log-line');
+    for (let i = 0; i < logLines.length - 500; i++) {
+        logLines[i].remove();
+    }
+
+    scrollToBottom(logsContainer);
+}
+
+function loadProgramLogs(programId) {
+    fetch(`/api/programs/${programId}/logs`)
         .then(response => response.json())
         .then(data => {
-            if (data.logs && data.logs.length > 0) {
-                const logsContainer = document.getElementById(`logs-${programId}`);
-                
-                // If this is the first load or we have new logs
-                if (!sinceParam || data.logs.length > 0) {
-                    if (!sinceParam) {
-                        // Full reload
-                        logsContainer.innerHTML = data.logs.map(log => 
-                            `<div class="log-line">${escapeHtml(log)}</div>`
-                        ).join('');
-                    } else {
-                        // Append new logs
-                        data.logs.forEach(log => {
-                            const logDiv = document.createElement('div');
-                            logDiv.className = 'log-line';
-                            logDiv.textContent = log;
-                            logsContainer.appendChild(logDiv);
-                        });
-                        
-                        // Keep only last 500 lines for performance
-                        const logLines = logsContainer.querySelectorAll('.log-line');
-                        while (logLines.length > 500) {
-                            logLines[0].remove();
-                        }
-                    }
-                    
-                    scrollToBottom(logsContainer);
-                }
-            }
-            
-            // Update timestamp for next poll
-            if (data.timestamp) {
-                lastLogTimestamps[programId] = data.timestamp;
-            }
+            renderProgramLogs(programId, data.logs || []);
+            lastLogSeqs[programId] = data.last_seq;
         })
         .catch(error => {
-            console.error(`Error polling logs for program ${programId}:`, error);
+            console.error(`Error loading logs for program ${programId}:`, error);
+            const logsContainer = document.getElementById(`logs-${programId}`);
+            logsContainer.innerHTML = '<div class="text-danger">Ошибка загрузки логов</div>';
         });
 }
 
-function startStatusMonitoring() {
-    function updateStatus() {
-        fetch('/api/programs/status')
-            .then(response => response.json())
-            .then(data => {
-                Object.keys(data).forEach(programId => {
-                    const program = data[programId];
-                    updateProgramStatus(programId, program);
-                });
-            })
-            .catch(error => {
-                console.error('Error updating program status:', error);
-            });
-    }
-    
-    // Update immediately and then every 3 seconds
-    updateStatus();
-    statusUpdateInterval = setInterval(updateStatus, 3000);
-}
-
 function updateProgramStatus(programId, program) {
     const statusIndicator = document.getElementById(`status-${programId}`);
     const statusText = document.getElementById(`status-text-${programId}`);
     const pidElement = document.getElementById(`pid-${programId}`);
     const startBtn = document.getElementById(`start-btn-${programId}`);
     const stopBtn = document.getElementById(`stop-btn-${programId}`);
+    const removeBtn = document.getElementById(`remove-btn-${programId}`);
     
     if (statusIndicator) {
         statusIndicator.className = `status-indicator status-${program.status}`;
@@ -138,9 +222,20 @@ function updateProgramStatus(programId, program) {
         pidElement.textContent = program.pid || 'N/A';
     }
     
+    if (program.restart) {
+        updateRestartInfo(programId, program.restart);
+    }
+
     // Update button states
+    if (removeBtn) {
+        removeBtn.disabled = program.status !== 'остановлен' && program.status !== 'ошибка';
+    }
     if (startBtn && stopBtn) {
-        if (program.status === 'запущен') {
+        if (program.status === 'запускается' || program.status === 'останавливается') {
+            // Transition in progress, wait for the next status event
+            startBtn.disabled = true;
+            stopBtn.disabled = true;
+        } else if (program.status === 'запущен') {
             startBtn.disabled = true;
             stopBtn.disabled = false;
         } else {
@@ -150,6 +245,59 @@ function updateProgramStatus(programId, program) {
     }
 }
 
+function applyStateMessage(programId, message) {
+    if (message.type === 'snapshot') {
+        programStates[programId] = message.state;
+    } else {
+        const state = programStates[programId];
+        if (!state || !state.streamers) return;  // Wait for the next snapshot
+        Object.entries(message.changes).forEach(([key, value]) => {
+            if (key === 'streamers') {
+                Object.entries(value).forEach(([username, fields]) => {
+                    state.streamers[username] = Object.assign(state.streamers[username] || {}, fields);
+                });
+            } else if (key === 'removed_streamers') {
+                value.forEach(username => delete state.streamers[username]);
+            } else {
+                state[key] = value;
+            }
+        });
+    }
+    renderProgramState(programId);
+}
+
+function renderProgramState(programId) {
+    const element = document.getElementById(`miner-state-${programId}`);
+    const state = programStates[programId];
+    if (!element) return;
+    if (!state || !state.streamers) {
+        element.textContent = '';
+        return;
+    }
+    const streamers = Object.values(state.streamers);
+    const points = streamers.reduce((total, streamer) => total + (streamer.points || 0), 0);
+    const online = streamers.filter(streamer => streamer.online).length;
+    const watching = (state.watching || []).join(', ') || '-';
+    element.textContent = `Баллы: ${points.toLocaleString()} | Онлайн: ${online}/${streamers.length} | Смотрит: ${watching}`;
+}
+
+function updateRestartInfo(programId, restart) {
+    const restartsElement = document.getElementById(`restarts-${programId}`);
+    const downtimeElement = document.getElementById(`downtime-${programId}`);
+    const infoElement = document.getElementById(`restart-info-${programId}`);
+    if (restartsElement) restartsElement.textContent = restart.restarts;
+    if (downtimeElement) downtimeElement.textContent = `${Math.round(restart.downtime)} с`;
+    if (!infoElement) return;
+    if (restart.gave_up) {
+        infoElement.textContent = `Автоперезапуск отключен: ${restart.last_failure}`;
+    } else if (restart.next_restart) {
+        const time = new Date(restart.next_restart * 1000).toLocaleTimeString();
+        infoElement.textContent = `Сбой: ${restart.last_failure}, перезапуск в ${time}`;
+    } else {
+        infoElement.textContent = '';
+    }
+}
+
 function startProgram(programId) {
     showAlert('info', `Запуск программы ${programId}...`);
     
@@ -190,6 +338,56 @@ function stopProgram(programId) {
     });
 }
 
+function addProgram(event) {
+    event.preventDefault();
+    const form = event.target;
+    const config = {
+        name: form.elements.name.value,
+        path: form.elements.path.value,
+        script: form.elements.script.value || 'run.py'
+    };
+
+    fetch('/api/programs', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify(config)
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'success') {
+            // The card arrives with the 'added' event
+            form.reset();
+            showAlert('success', data.message);
+        } else {
+            showAlert('danger', data.message);
+        }
+    })
+    .catch(error => {
+        console.error('Error adding program:', error);
+        showAlert('danger', 'Ошибка добавления программы');
+    });
+}
+
+function removeProgram(programId) {
+    if (!confirm(`Удалить программу ${programId} из списка? Файлы программы не удаляются.`)) return;
+
+    fetch(`/api/programs/${programId}`, {
+        method: 'DELETE'
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.status === 'success') {
+            showAlert('success', data.message);
+        } else {
+            showAlert('danger', data.message);
+        }
+    })
+    .catch(error => {
+        console.error(`Error removing program ${programId}:`, error);
+        showAlert('danger', `Ошибка удаления программы ${programId}`);
+    });
+}
+
 function clearLogs(programId) {
     if (confirm(`Вы уверены, что хотите очистить логи программы ${programId}?`)) {
         fetch(`/api/programs/${programId}/clear_logs`, {
@@ -216,7 +414,7 @@ function refreshAll() {
     showAlert('info', 'Обновление всех программ...');
     
     // Reload logs for all programs
-    [1, 2, 3, 4].forEach(programId => {
+    programCardIds().forEach(programId => {
         loadProgramLogs(programId);
     });
     
@@ -282,13 +480,7 @@ function escapeHtml(text) {
 
 // Cleanup on page unload
 window.addEventListener('beforeunload', function() {
-    // Clear all log polling intervals
-    Object.values(logUpdateIntervals).forEach(interval => {
-        clearInterval(interval);
-    });
-    
-    // Clear status monitoring interval
-    if (statusUpdateInterval) {
-        clearInterval(statusUpdateInterval);
+    if (eventSource) {
+        eventSource.close();
     }
 });
@@ -0,0 +1,85 @@
+"""
+Structured state published by the miners over a pipe (classes/StatusPublisher.py in the miner).
+The miner writes JSON lines: a full snapshot from time to time and deltas in between.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+
+# Environment variable holding the write end of the pipe inside the miner
+STATUS_FD_ENV = 'TWITCH_MINER_STATUS_FD'
+
+
+def open_status_pipe():
+    """(read end as a binary file, write fd for the child); pass the fd with Popen(pass_fds=...)"""
+    read_fd, write_fd = os.pipe()
+    return os.fdopen(read_fd, 'rb', buffering=0), write_fd
+
+
+class MinerState:
+    """Live state of one miner rebuilt from its snapshots and deltas"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(f"{__name__}.MinerState")
+        self._lock = threading.Lock()
+        self.state = {}
+        self.seq = 0
+        self.updated = None
+
+    def reset(self):
+        with self._lock:
+            self.state = {}
+            self.seq = 0
+            self.updated = None
+
+    def apply_line(self, line):
+        """Apply one JSON line, returns the message or None if it was not a valid one"""
+        try:
+            message = json.loads(line)
+        except ValueError:
+            self.logger.warning(f"Некорректная строка канала состояния: {line[:200]}")
+            return None
+        with self._lock:
+            if message.get('type') == 'snapshot':
+                # The message also goes to the event journal, keep it as it was sent
+                self.state = copy.deepcopy(message['state'])
+            elif message.get('type') == 'delta':
+                if not self.state:
+                    return None  # Wait for the first snapshot
+                self._apply_delta(message['changes'])
+            else:
+                return None
+            self.seq = message.get('seq', self.seq)
+            self.updated = message.get('time')
+        return message
+
+    def _apply_delta(self, changes):
+        for key, value in changes.items():
+            if key == 'streamers':
+                streamers = self.state.setdefault('streamers', {})
+                for username, fields in value.items():
+                    streamers.setdefault(username, {}).update(fields)
+            elif key == 'removed_streamers':
+                for username in value:
+                    self.state.get('streamers', {}).pop(username, None)
+            else:
+                self.state[key] = copy.deepcopy(value)
+
+    def to_dict(self):
+        with self._lock:
+            return {'seq': self.seq, 'updated': self.updated, 'state': copy.deepcopy(self.state)}
+
+    def summary(self):
+        """Totals shown on a dashboard card"""
+        with self._lock:
+            streamers = self.state.get('streamers', {})
+            return {
+                'points': sum(streamer.get('points', 0) for streamer in streamers.values()),
+                'streamers': len(streamers),
+                'online': sum(1 for streamer in streamers.values() if streamer.get('online')),
+                'watching': list(self.state.get('watching', [])),
+                'queues': dict(self.state.get('queues', {}))
+            } if self.state else None
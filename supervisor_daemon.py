@@ -0,0 +1,236 @@
+"""
+Program manager shared over a local Unix socket.
+One daemon (`python run.py daemon`) owns the processes and logs; web workers started with
+SUPERVISOR_SOCKET set (e.g. `gunicorn -k gthread --threads 32 -w 4 run:app`) talk to it
+through RemoteProgramManager.
+
+Protocol: one JSON object per line. A request is {"method": ..., "params": [...]}, the answer
+is {"result": ...} or {"error": ..., "type": ...}. Streaming methods answer with one
+{"result": ...} line per item until the client closes the connection.
+"""
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+
+from log_buffer import LogEntry
+from program_registry import RegistryError
+
+SOCKET_ENV = 'SUPERVISOR_SOCKET'
+DEFAULT_SOCKET = 'supervisor.sock'
+
+# Methods a client may call; start/stop hand back a Future locally, only "accepted or not" goes over the wire
+METHODS = {
+    'get_programs_status': None,
+    'get_program_paths': None,
+    'start_program': lambda future: future is not None,
+    'stop_program': lambda future: future is not None,
+    'stop_all': None,
+    'add_program': None,
+    'remove_program': None,
+    'get_program_metrics': None,
+    'get_program_state': None,
+    'get_program_logs': None,
+    'get_logs_after': None,
+    'clear_program_logs': None,
+    'search_logs': None,
+    'get_log_facets': None,
+    'snapshot': None,
+}
+STREAM_METHODS = ('stream_program_logs', 'stream_events')
+# Calls that change nothing: sent again when the connection broke before the answer came
+READ_ONLY_METHODS = (
+    'get_programs_status', 'get_program_paths', 'get_program_metrics', 'get_program_state',
+    'get_program_logs', 'get_logs_after', 'search_logs', 'get_log_facets', 'snapshot',
+)
+
+# Exceptions re-raised as themselves on the client side
+REMOTE_EXCEPTIONS = {'RegistryError': RegistryError}
+
+
+class SupervisorError(RuntimeError):
+    """The daemon is unreachable or failed to run a call"""
+
+
+def _encode(message):
+    return (json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        manager = self.server.manager
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                method = request['method']
+                params = request.get('params', [])
+                if method in STREAM_METHODS:
+                    self._stream(getattr(manager, method)(*params))
+                    return
+                if method not in METHODS:
+                    raise SupervisorError(f"Метод не разрешен: {method}")
+                result = getattr(manager, method)(*params)
+                if METHODS[method] is not None:
+                    result = METHODS[method](result)
+                response = {'result': result}
+            except Exception as e:
+                response = {'error': str(e), 'type': type(e).__name__}
+            self.wfile.write(_encode(response))
+            self.wfile.flush()
+
+    def _stream(self, items):
+        try:
+            for item in items:
+                self.wfile.write(_encode({'result': item}))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The web worker went away
+        except Exception as e:
+            self.wfile.write(_encode({'error': str(e), 'type': type(e).__name__}))
+        finally:
+            items.close()
+
+
+class SupervisorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves a ProgramManager on a Unix socket, one thread per connection"""
+
+    daemon_threads = True
+
+    def __init__(self, manager, socket_path=DEFAULT_SOCKET):
+        self.manager = manager
+        self.logger = logging.getLogger(f"{__name__}.SupervisorServer")
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Left over by a previous run
+        super().__init__(socket_path, _RequestHandler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+class RemoteProgramManager:
+    """ProgramManager interface backed by the supervisor daemon"""
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        # One connection per thread, gunicorn threads never share a socket
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as e:
+            sock.close()
+            raise SupervisorError(f"Демон супервизора недоступен ({self.socket_path}): {str(e)}")
+        return sock, sock.makefile('rb')
+
+    def _call(self, method, *params):
+        request = _encode({'method': method, 'params': list(params)})
+        for attempt in range(2):
+            connection = getattr(self._local, 'connection', None)
+            if connection is None:
+                connection = self._local.connection = self._connect()
+            sock, reader = connection
+            try:
+                sock.sendall(request)
+            except OSError as e:
+                # The daemon was restarted since the last call, nothing was sent: reconnect once
+                self._disconnect(sock)
+                if attempt:
+                    raise SupervisorError(f"Ошибка связи с демоном супервизора: {str(e)}")
+                continue
+            try:
+                line = reader.readline()
+                if not line:
+                    raise ConnectionResetError("соединение закрыто")
+                break
+            except OSError as e:
+                # The daemon may have run the call before the answer was lost: a start or a stop
+                # must not happen twice, only reads are sent again
+                self._disconnect(sock)
+                if attempt or method not in READ_ONLY_METHODS:
+                    raise SupervisorError(f"Ошибка связи с демоном супервизора: {str(e)}")
+        return self._result(json.loads(line))
+
+    def _disconnect(self, sock):
+        self._local.connection = None
+        sock.close()
+
+    @staticmethod
+    def _result(response):
+        if 'error' in response:
+            raise REMOTE_EXCEPTIONS.get(response.get('type'), SupervisorError)(response['error'])
+        return response['result']
+
+    def _stream(self, method, *params):
+        # Streams hold their own connection until the consumer stops iterating
+        sock, reader = self._connect()
+        try:
+            sock.sendall(_encode({'method': method, 'params': list(params)}))
+            for line in reader:
+                yield self._result(json.loads(line))
+        finally:
+            sock.close()
+
+    def get_programs_status(self):
+        return {int(program_id): status for program_id, status in self._call('get_programs_status').items()}
+
+    def get_program_paths(self):
+        return self._call('get_program_paths')
+
+    def start_program(self, program_id):
+        return self._call('start_program', program_id)
+
+    def stop_program(self, program_id):
+        return self._call('stop_program', program_id)
+
+    def stop_all(self, timeout=None):
+        return self._call('stop_all', timeout)
+
+    def add_program(self, config):
+        program_id, status = self._call('add_program', config)
+        return program_id, status
+
+    def remove_program(self, program_id):
+        return self._call('remove_program', program_id)
+
+    def get_program_metrics(self, program_id, since=0):
+        return self._call('get_program_metrics', program_id, since)
+
+    def get_program_state(self, program_id):
+        return self._call('get_program_state', program_id)
+
+    def get_program_logs(self, program_id):
+        return self._call('get_program_logs', program_id)
+
+    def get_logs_after(self, program_id, after_seq=0, limit=None):
+        entries, last_seq = self._call('get_logs_after', program_id, after_seq, limit)
+        return [LogEntry(*entry) for entry in entries], last_seq
+
+    def clear_program_logs(self, program_id):
+        return self._call('clear_program_logs', program_id)
+
+    def search_logs(self, program_id, criteria, before=None, limit=100):
+        return self._call('search_logs', program_id, criteria, before, limit)
+
+    def get_log_facets(self, program_id):
+        return self._call('get_log_facets', program_id)
+
+    def snapshot(self, backlog=200):
+        return self._call('snapshot', backlog)
+
+    def stream_program_logs(self, program_id, after_seq=None, keepalive=15):
+        for entry in self._stream('stream_program_logs', program_id, after_seq, keepalive):
+            yield LogEntry(*entry) if entry is not None else None
+
+    def stream_events(self, after_seq=None, keepalive=15):
+        for cursor, events in self._stream('stream_events', after_seq, keepalive):
+            yield cursor, events
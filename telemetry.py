@@ -0,0 +1,171 @@
+"""
+Resource telemetry of the supervised programs.
+Every sample sums the whole process tree of a program (the miner and whatever it spawned).
+"""
+
+import logging
+import threading
+import time
+from array import array
+
+import psutil
+
+# Sampled values, in the order they are stored
+FIELDS = ('cpu_percent', 'rss', 'threads', 'fds', 'read_bytes', 'write_bytes', 'connections')
+
+
+class MetricSeries:
+    """Fixed-size ring buffer of samples, one typed array per field"""
+
+    def __init__(self, capacity=720):
+        self.capacity = capacity
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._values = {field: array('d', bytes(8 * capacity)) for field in FIELDS}
+        self._count = 0  # samples ever appended
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return min(self._count, self.capacity)
+
+    def append(self, timestamp, sample):
+        """Store one sample, a dict with a value for every field"""
+        with self._lock:
+            index = self._count % self.capacity
+            self._timestamps[index] = timestamp
+            for field in FIELDS:
+                self._values[field][index] = sample.get(field, 0)
+            self._count += 1
+
+    def since(self, timestamp=0):
+        """Samples newer than `timestamp`, oldest first, as {'timestamps': [...], field: [...]}"""
+        with self._lock:
+            first = max(self._count - self.capacity, 0)
+            indexes = [i % self.capacity for i in range(first, self._count)]
+            indexes = [i for i in indexes if self._timestamps[i] > timestamp]
+            series = {'timestamps': [self._timestamps[i] for i in indexes]}
+            for field in FIELDS:
+                values = self._values[field]
+                series[field] = [values[i] for i in indexes]
+            return series
+
+    def latest(self):
+        """The newest sample as a dict, None before the first one"""
+        with self._lock:
+            if not self._count:
+                return None
+            index = (self._count - 1) % self.capacity
+            sample = {field: self._values[field][index] for field in FIELDS}
+            sample['timestamp'] = self._timestamps[index]
+            return sample
+
+
+class ResourceSampler:
+    """Background thread sampling every running program at a fixed interval"""
+
+    def __init__(self, get_pids, interval=5.0, capacity=720, on_sample=None):
+        # get_pids() returns {program_id: pid} of the programs that are running right now
+        self.get_pids = get_pids
+        # on_sample(timestamp, {program_id: sample}) is called after every round
+        self.on_sample = on_sample
+        self.interval = interval
+        self.capacity = capacity
+        self.series = {}
+        self.logger = logging.getLogger(f"{__name__}.ResourceSampler")
+        # psutil.Process objects are kept between samples, cpu_percent() is relative to the previous call
+        self._processes = {}
+        self._stop = threading.Event()
+
+        self.thread = threading.Thread(target=self._run, name='Resource sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self.thread.join(timeout)
+
+    def metrics(self, program_id, since=0):
+        """Time series of one program, empty when it was never sampled"""
+        series = self.series.get(program_id)
+        if series is None:
+            return {'timestamps': [], **{field: [] for field in FIELDS}}
+        return series.since(since)
+
+    def latest(self, program_id):
+        series = self.series.get(program_id)
+        return series.latest() if series is not None else None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                self.logger.error(f"Ошибка сбора метрик: {str(e)}")
+
+    def sample(self):
+        """Take one sample of every running program"""
+        timestamp = time.time()
+        seen = set()
+        samples = {}
+        for program_id, pid in self.get_pids().items():
+            tree = self._tree(pid)
+            if not tree:
+                continue
+            seen.update(process.pid for process in tree)
+            sample = dict.fromkeys(FIELDS, 0)
+            for process in tree:
+                self._add_process(sample, process)
+            if program_id not in self.series:
+                self.series[program_id] = MetricSeries(self.capacity)
+            self.series[program_id].append(timestamp, sample)
+            samples[program_id] = sample
+
+        # Forget processes that are gone
+        for pid in list(self._processes):
+            if pid not in seen:
+                del self._processes[pid]
+
+        if samples and self.on_sample is not None:
+            self.on_sample(timestamp, samples)
+
+    def _process(self, pid):
+        process = self._processes.get(pid)
+        if process is None:
+            process = psutil.Process(pid)
+            process.cpu_percent()  # The first call only sets the reference point
+            self._processes[pid] = process
+        return process
+
+    def _tree(self, pid):
+        try:
+            root = self._process(pid)
+            children = root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            # Also drops a cached Process whose pid was reused
+            self._processes.pop(pid, None)
+            return []
+        tree = [root]
+        for child in children:
+            try:
+                tree.append(self._process(child.pid))
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
+        return tree
+
+    @staticmethod
+    def _add_process(sample, process):
+        try:
+            with process.oneshot():
+                sample['cpu_percent'] += process.cpu_percent()
+                sample['rss'] += process.memory_info().rss
+                sample['threads'] += process.num_threads()
+                if hasattr(process, 'num_fds'):
+                    sample['fds'] += process.num_fds()
+                else:
+                    sample['fds'] += process.num_handles()
+                if hasattr(process, 'io_counters'):
+                    io = process.io_counters()
+                    sample['read_bytes'] += io.read_bytes
+                    sample['write_bytes'] += io.write_bytes
+                sample['connections'] += len(process.net_connections(kind='inet'))
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            pass
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+# run.py builds its manager at import time: make it a client of a daemon that isn't there,
+# the tests build their own ProgramManager over a temporary programs/ directory
+os.environ.setdefault('SUPERVISOR_SOCKET', os.path.join(os.path.dirname(__file__), 'missing.sock'))
+
+
+def write_program(root, name, script='import time\nprint("started", flush=True)\ntime.sleep(60)\n'):
+    """programs/<name>/run.py under `root`, returns its path relative to root"""
+    path = os.path.join('programs', name)
+    os.makedirs(root / path, exist_ok=True)
+    (root / path / 'run.py').write_text(script)
+    return path
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """ProgramManager over tmp_path/programs with one program, shut down after the test"""
+    import run
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('LOG_STORE_DIR', str(tmp_path / 'log_store'))
+    monkeypatch.setenv('METRICS_INTERVAL', '60')
+    write_program(tmp_path, 'first')
+    manager = run.ProgramManager(str(tmp_path / 'programs.json'))
+    yield manager
+    manager.shutdown(timeout=10)
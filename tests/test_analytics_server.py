@@ -0,0 +1,102 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from TwitchChannelPointsMiner.classes import AnalyticsServer
+from TwitchChannelPointsMiner.classes.Settings import Settings
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Settings, 'analytics_path', str(tmp_path), raising=False)
+    app = Flask(__name__)
+    app.add_url_rule('/json/<string:streamer>', 'json', AnalyticsServer.read_json)
+    app.add_url_rule('/json_all', 'json_all', AnalyticsServer.json_all)
+    return app.test_client()
+
+
+def write(tmp_path, name, points):
+    (tmp_path / f"{name}.json").write_text(json.dumps({
+        'series': [{'x': x, 'y': y, 'z': 'Watch'} for x, y in points], 'annotations': []
+    }))
+
+
+def test_unchanged_file_is_answered_with_304(client, tmp_path):
+    write(tmp_path, 'streamer', [(1000, 10)])
+    response = client.get('/json/streamer', query_string={'startDate': '1970-01-01'})
+    assert response.status_code == 200 and response.headers['ETag']
+
+    again = client.get('/json/streamer', query_string={'startDate': '1970-01-01'},
+                       headers={'If-None-Match': response.headers['ETag']})
+    assert again.status_code == 304 and again.data == b''
+
+    # Another range is another answer
+    other = client.get('/json/streamer', query_string={'startDate': '1970-01-02'},
+                       headers={'If-None-Match': response.headers['ETag']})
+    assert other.status_code == 200
+
+    write(tmp_path, 'streamer', [(1000, 10), (2000, 20)])
+    changed = client.get('/json/streamer', query_string={'startDate': '1970-01-01'},
+                         headers={'If-None-Match': response.headers['ETag']})
+    assert changed.status_code == 200
+    assert [point['y'] for point in changed.get_json()['series']] == [10, 20]
+
+
+def test_json_all_is_streamed_gzipped(client, tmp_path):
+    write(tmp_path, 'alpha', [(1000, 10)])
+    write(tmp_path, 'beta', [(1000, 20)])
+    response = client.get('/json_all', query_string={'startDate': '1970-01-01'}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    datas = json.loads(gzip.decompress(response.data))
+    assert sorted(point['y'] for streamer in datas for point in streamer['data']['series']) == [10, 20]
+
+
+def test_json_all_skips_a_broken_file_with_an_error(client, tmp_path):
+    write(tmp_path, 'alpha', [(1000, 10)])
+    (tmp_path / 'broken.json').write_text('{"series": [')
+    datas = client.get('/json_all', query_string={'startDate': '1970-01-01'}).get_json()
+    assert sorted('error' in streamer['data'] for streamer in datas) == [False, True]
+
+
+def test_missing_streamer_is_404(client):
+    assert client.get('/json/nobody').status_code == 404
+
+
+def test_log_tail_follows_the_cursor(tmp_path):
+    log = tmp_path / 'account.log'
+    log.write_text('first\nsecond\n')
+    text, inode, offset = AnalyticsServer.tail_log(str(log))
+    assert text == 'first\nsecond\n'
+    assert AnalyticsServer.tail_log(str(log), inode, offset)[0] == ''
+
+    with open(log, 'a') as file:
+        file.write('third\npart')
+    text, inode, offset = AnalyticsServer.tail_log(str(log), inode, offset)
+    assert text == 'third\n'  # Only complete lines
+    assert AnalyticsServer.parse_log_cursor(f"{inode}:{offset}") == (inode, offset)
+
+
+def test_log_tail_finishes_the_rotated_file_first(tmp_path):
+    log = tmp_path / 'account.log'
+    log.write_text('old\n')
+    _, inode, offset = AnalyticsServer.tail_log(str(log))
+    with open(log, 'a') as file:
+        file.write('last of the day\n')
+    log.rename(tmp_path / 'account.log.2026-10-18')
+    log.write_text('new day\n')
+
+    text, inode, offset = AnalyticsServer.tail_log(str(log), inode, offset)
+    assert text == 'last of the day\n'
+    text, _, _ = AnalyticsServer.tail_log(str(log), inode, offset)
+    assert text == 'new day\n'
+
+
+def test_new_log_client_starts_at_a_line_boundary(tmp_path, monkeypatch):
+    monkeypatch.setattr(AnalyticsServer, 'MAX_LOG_CHUNK', 16)
+    log = tmp_path / 'account.log'
+    log.write_text('0123456789\nabcdefgh\nijk\n')
+    text, _, offset = AnalyticsServer.tail_log(str(log))
+    assert text == 'abcdefgh\nijk\n' and offset == log.stat().st_size
+    assert AnalyticsServer.parse_log_cursor('garbage') == (None, None)
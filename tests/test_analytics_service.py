@@ -0,0 +1,83 @@
+import json
+
+import pytest
+from flask import Flask
+
+from analytics_service import AnalyticsIndex, create_analytics_blueprint
+
+
+@pytest.fixture
+def program(tmp_path):
+    (tmp_path / 'analytics' / 'account').mkdir(parents=True)
+    return tmp_path
+
+
+@pytest.fixture
+def client(program):
+    app = Flask(__name__)
+    app.register_blueprint(create_analytics_blueprint(AnalyticsIndex(lambda: [str(program)])))
+    return app.test_client()
+
+
+def write(program, series, annotations=()):
+    (program / 'analytics' / 'account' / 'streamer.json').write_text(json.dumps({
+        'series': [{'x': x, 'y': y} for x, y in series],
+        'annotations': [{'x': x} for x in annotations],
+    }))
+
+
+def test_long_poll_cursor_keeps_records_with_the_same_timestamp(client, program):
+    write(program, [(1000, 10)])
+    cursor = client.get('/analytics/account/json/streamer').get_json()['cursor']
+
+    write(program, [(1000, 10), (2000, 20)])
+    delta = client.get('/analytics/account/json/streamer', query_string={'since': cursor}).get_json()
+    assert [point['y'] for point in delta['series']] == [20]
+
+    # The annotation of the same points-earned message, written in the same second
+    write(program, [(1000, 10), (2000, 20)], annotations=[2000])
+    delta = client.get('/analytics/account/json/streamer', query_string={'since': delta['cursor']}).get_json()
+    assert delta['series'] == [] and [a['x'] for a in delta['annotations']] == [2000]
+
+
+def test_event_id_is_the_delta_cursor(client, program):
+    write(program, [(1000, 10), (2000, 20), (2000, 25)])
+    response = client.get('/analytics/account/events/streamer', headers={'Last-Event-ID': '2000:1:0'}, buffered=False)
+    event = next(response.response).decode()
+    response.close()
+    assert event.startswith('id: 2000:2:0\n')
+    assert [point['y'] for point in json.loads(event.split('data: ', 1)[1])['series']] == [25]
+
+
+def test_unknown_streamer_is_404(client):
+    assert client.get('/analytics/account/json/nobody', query_string={'since': '0'}).status_code == 404
+    assert client.get('/analytics/account/events/nobody').status_code == 404
+
+
+def test_accounts_of_every_program_are_indexed(tmp_path):
+    for program, account, points in (('one', 'account', 10), ('two', 'account', 20), ('two', 'other', 5)):
+        path = tmp_path / program / 'analytics' / account
+        path.mkdir(parents=True)
+        (path / 'streamer.json').write_text(json.dumps({'series': [{'x': 1000, 'y': points}]}))
+    index = AnalyticsIndex(lambda: [str(tmp_path / 'one'), str(tmp_path / 'two'), str(tmp_path / 'missing')])
+
+    assert sorted(index.accounts()) == ['account', 'account@two', 'other']
+    assert {entry['account']: entry['points'] for entry in index.summary()} == {
+        'account': 10, 'account@two': 20, 'other': 5
+    }
+
+
+def test_combined_endpoints(client, program):
+    write(program, [(1000, 10)])
+    combined = client.get('/analytics/api/combined', query_string={'startDate': '1970-01-01'}).get_json()
+    assert [(entry['account'], entry['name']) for entry in combined] == [('account', 'streamer')]
+    assert client.get('/analytics/api/combined', query_string={'since': '1000'}).get_json() == []
+    by_streamer = client.get('/analytics/api/combined/streamer', query_string={'startDate': '1970-01-01'}).get_json()
+    assert [entry['data']['series'][0]['y'] for entry in by_streamer] == [10]
+
+
+def test_streamer_names_cant_leave_the_account(client, program):
+    write(program, [(1000, 10)])
+    (program / 'analytics' / 'secret.json').write_text('{}')
+    assert client.get('/analytics/account/json/..%2Fsecret').status_code == 404
+    assert client.get('/analytics/unknown/json/streamer').status_code == 404
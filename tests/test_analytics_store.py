@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from TwitchChannelPointsMiner.classes.AnalyticsStore import (
+    AnalyticsStore,
+    StreamerAnalytics,
+    delta_datas,
+    filter_datas,
+    parse_cursor,
+    wait_for_delta,
+)
+
+
+def ms(day, hour=0):
+    return datetime(2024, 5, day, hour).timestamp() * 1000
+
+
+def analytics(series=(), annotations=()):
+    return StreamerAnalytics({
+        "series": [{"x": x, "y": y, "z": "Watch"} for x, y in series],
+        "annotations": [{"x": x, "label": {"text": "WIN"}} for x in annotations],
+    })
+
+
+def test_range_includes_both_bounds():
+    store = analytics(series=[(ms(1), 10), (ms(2), 20), (ms(3, 23), 30), (ms(4), 40)])
+    datas = filter_datas("2024-05-02", "2024-05-03", store)
+    assert [point["y"] for point in datas["series"]] == [20, 30]
+
+
+def test_unsorted_file_is_sorted_once_at_load():
+    store = analytics(series=[(ms(3), 30), (ms(1), 10), (ms(2), 20)], annotations=[ms(2), ms(1)])
+    assert store.series_x == sorted(store.series_x)
+    assert [a["x"] for a in filter_datas("2024-05-01", "2024-05-01", store)["annotations"]] == [ms(1)]
+
+
+def test_empty_range_is_a_flat_line_at_the_last_balance():
+    store = analytics(series=[(ms(1), 10), (ms(2), 20)])
+    datas = filter_datas("2024-05-10", "2024-05-11", store)
+    assert [(point["y"], point["z"]) for point in datas["series"]] == [(20, "No Stream")] * 2
+    assert datas["series"][0]["x"] == ms(10)
+
+
+def test_empty_range_before_the_first_point_stays_empty():
+    store = analytics(series=[(ms(5), 10)])
+    assert filter_datas("2024-05-01", "2024-05-02", store)["series"] == []
+
+
+def test_delta_returns_records_written_after_the_cursor():
+    store = analytics(series=[(ms(1), 10), (ms(2), 20)], annotations=[ms(2)])
+    delta = delta_datas(parse_cursor(ms(1)), store)
+    assert [point["y"] for point in delta["series"]] == [20]
+    assert [a["x"] for a in delta["annotations"]] == [ms(2)]
+    assert delta_datas(parse_cursor(delta["cursor"]), store) == {"series": [], "annotations": [], "cursor": delta["cursor"]}
+
+
+def test_records_sharing_a_timestamp_are_not_skipped():
+    # A points-earned message writes a point, then an annotation with the same x
+    store = analytics(series=[(ms(1), 10), (ms(2), 20)])
+    delta = delta_datas(parse_cursor(ms(1)), store)
+    assert [point["y"] for point in delta["series"]] == [20]
+
+    store = analytics(series=[(ms(1), 10), (ms(2), 20), (ms(2), 25)], annotations=[ms(2)])
+    delta = delta_datas(parse_cursor(delta["cursor"]), store)
+    assert [point["y"] for point in delta["series"]] == [25]
+    assert [a["x"] for a in delta["annotations"]] == [ms(2)]
+    assert delta["cursor"] == f"{int(ms(2))}:2:1"
+
+
+def test_range_response_carries_the_live_updates_cursor():
+    store = analytics(series=[(ms(1), 10), (ms(1), 15)])
+    cursor = filter_datas("2024-05-01", "2024-05-01", store)["cursor"]
+    assert delta_datas(parse_cursor(cursor), store)["series"] == []
+    store = analytics(series=[(ms(1), 10), (ms(1), 15), (ms(1), 18)])
+    assert [point["y"] for point in delta_datas(parse_cursor(cursor), store)["series"]] == [18]
+
+
+def test_parse_cursor_rejects_garbage():
+    assert parse_cursor("1700000000000") == (1700000000000.0, None, None)
+    assert parse_cursor("1700000000000:2:0") == (1700000000000.0, 2, 0)
+    for cursor in ("abc", "1:2", "1:a:b"):
+        with pytest.raises(ValueError):
+            parse_cursor(cursor)
+
+
+def test_wait_for_delta_wakes_up_on_notify(tmp_path):
+    fname = tmp_path / "streamer.json"
+    fname.write_text(json.dumps({"series": [{"x": ms(1), "y": 10}]}))
+    cursor = parse_cursor(ms(1))
+
+    def write():
+        time.sleep(0.2)
+        fname.write_text(json.dumps({"series": [{"x": ms(1), "y": 10}, {"x": ms(1), "y": 20}]}))
+        AnalyticsStore.notify()
+
+    threading.Thread(target=write).start()
+    started = time.time()
+    # Same x as the cursor and a bare timestamp: everything at it was seen already
+    delta = wait_for_delta(lambda: AnalyticsStore.load(str(fname)), cursor, timeout=0.5, recheck=5)
+    assert delta["series"] == [] and time.time() - started >= 0.5
+
+    fname.write_text(json.dumps({"series": [{"x": ms(1), "y": 10}]}))
+    threading.Thread(target=write).start()
+    started = time.time()
+    delta = wait_for_delta(lambda: AnalyticsStore.load(str(fname)), parse_cursor(f"{ms(1)}:1:0"), timeout=2, recheck=5)
+    assert [point["y"] for point in delta["series"]] == [20]
+    assert time.time() - started < 1
+
+
+def test_wait_for_delta_survives_a_missing_file(tmp_path):
+    delta = wait_for_delta(lambda: AnalyticsStore.load(str(tmp_path / "gone.json")), parse_cursor("5:1:0"))
+    assert delta == {"series": [], "annotations": [], "cursor": "5:1:0"}
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from TwitchChannelPointsMiner.classes import ConnectivityMonitor as connectivity_module
+from TwitchChannelPointsMiner.classes.ConnectivityMonitor import ConnectivityMonitor
+from TwitchChannelPointsMiner.classes.SharedResources import ReadyHTTPAdapter
+from TwitchChannelPointsMiner.classes.StopEvent import StopEvent
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    """Outcomes of the next probes (True/False), every probe is counted"""
+    state = {'reachable': False, 'count': 0}
+
+    def probe(host, port):
+        state['count'] += 1
+        return state['reachable']
+
+    monkeypatch.setattr(connectivity_module, 'internet_connection_available', probe)
+    return state
+
+
+def test_wait_returns_once_a_probe_succeeds(probes):
+    monitor = ConnectivityMonitor(interval=0.05)
+    assert monitor.wait(timeout=0.2) is False
+    probes['reachable'] = True
+    assert monitor.wait(timeout=5) is True
+    assert probes['count'] >= 2
+
+
+def test_failed_requests_start_probing_again(probes):
+    probes['reachable'] = True
+    monitor = ConnectivityMonitor(interval=0.05, failure_threshold=2)
+    monitor.report_success()
+    monitor.report_failure()
+    assert monitor.is_ready() is True  # One failure isn't enough
+    probes['reachable'] = False
+    monitor.report_failure()
+    assert monitor.is_ready() is False
+
+    # A request that gets through settles it without waiting for the probe
+    monitor.report_success()
+    assert monitor.wait(timeout=0) is True
+
+
+def test_stop_event_and_close_end_the_wait(probes):
+    monitor = ConnectivityMonitor(interval=60)
+    stop_event = StopEvent()
+    threading.Timer(0.1, stop_event.set).start()
+    started = time.time()
+    assert monitor.wait(timeout=30, stop_event=stop_event) is False
+    assert time.time() - started < 5
+
+    threading.Timer(0.1, monitor.close).start()
+    assert monitor.wait(timeout=30) is False
+    assert time.time() - started < 10
+
+
+def test_adapter_waits_no_longer_than_the_connect_timeout(probes):
+    adapter = ReadyHTTPAdapter(ConnectivityMonitor(interval=60))
+    request = requests.Request('GET', 'https://twitch.tv/').prepare()
+    started = time.time()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        adapter.send(request, timeout=(0.1, 30))
+    assert time.time() - started < 5
@@ -0,0 +1,31 @@
+def test_new_dashboard_starts_with_a_snapshot(manager):
+    cursor, events = next(manager.stream_events())
+    assert cursor == manager.events.last_seq
+    assert [event['type'] for event in events] == ['snapshot']
+
+
+def test_cursor_from_before_a_restart_gets_a_snapshot(manager):
+    # The journal of this (new) supervisor is behind the id the browser kept
+    stream = manager.stream_events(after_seq=manager.events.last_seq + 500)
+    cursor, events = next(stream)
+    assert [event['type'] for event in events] == ['snapshot']
+
+    manager._add_log(1, 'after the restart')
+    cursor, events = next(stream)
+    assert [event['line'] for event in events if event['type'] == 'log'][-1].endswith('after the restart')
+    assert cursor == manager.events.last_seq
+
+
+def test_resumed_dashboard_only_gets_what_it_missed(manager):
+    manager._add_log(1, 'seen')
+    after_seq = manager.events.last_seq
+    manager._add_log(1, 'missed')
+    cursor, events = next(manager.stream_events(after_seq=after_seq))
+    assert [event['type'] for event in events] == ['log']
+    assert events[0]['line'].endswith('missed')
+
+
+def test_program_log_stream_restarts_a_cursor_from_before_a_restart(manager):
+    manager._add_log(1, 'line')
+    stream = manager.stream_program_logs(1, after_seq=10_000, keepalive=1)
+    assert next(stream).line.endswith('line')
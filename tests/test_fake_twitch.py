@@ -0,0 +1,62 @@
+import json
+
+import pytest
+import requests
+import websocket
+
+from TwitchChannelPointsMiner.FakeTwitch import FakeTwitch
+from TwitchChannelPointsMiner.Simulation import generate_fixtures
+
+
+@pytest.fixture
+def fake():
+    """Fake Twitch with 3 streamers on free ports"""
+    fake = FakeTwitch(generate_fixtures(streamers=3, hours=1), port=0, irc_port=0, seed=0)
+    fake.start()
+    yield fake
+    fake.stop()
+
+
+def gql(fake, operation, **variables):
+    response = requests.post(f"{fake.url()}/gql", json={'operationName': operation, 'variables': variables},
+                             timeout=10)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_gql_answers_from_the_fixtures(fake):
+    user = gql(fake, 'ReportMenuItem', channelLogin='streamer0001')['data']['user']
+    assert user == {'id': '200000001', 'login': 'streamer0001'}
+    assert gql(fake, 'ReportMenuItem', channelLogin='nobody')['data']['user'] is None
+    assert requests.get(f"{fake.url()}/_fake/stats", timeout=10).json()['requests']['gql ReportMenuItem'] == 2
+
+
+def test_pubsub_listen_and_publish(fake):
+    client = websocket.create_connection(fake.env()['TWITCH_MINER_WEBSOCKET'], timeout=10)
+    try:
+        topic = 'community-points-channel-v1.200000001'
+        client.send(json.dumps({'type': 'LISTEN', 'nonce': 'n', 'data': {'topics': [topic]}}))
+        assert json.loads(client.recv()) == {'type': 'RESPONSE', 'nonce': 'n', 'error': ''}
+
+        # User topics need a token
+        client.send(json.dumps({'type': 'LISTEN', 'nonce': 'u', 'data': {'topics': ['community-points-user-v1.1']}}))
+        assert json.loads(client.recv())['error'] == 'ERR_BADAUTH'
+
+        published = requests.post(f"{fake.url()}/_fake/publish", timeout=10, json={
+            'topic': 'community-points-channel-v1', 'channel': 'streamer0001', 'type': 'test', 'data': {}
+        })
+        assert published.status_code == 204
+        message = json.loads(client.recv())
+        assert message['type'] == 'MESSAGE' and message['data']['topic'] == topic
+    finally:
+        client.close()
+
+
+def test_injected_errors():
+    fake = FakeTwitch(generate_fixtures(streamers=1, hours=1), port=0, irc_port=0, error_rate=1, seed=0)
+    fake.start()
+    try:
+        assert requests.get(f"{fake.url()}/_fake/stats", timeout=10).status_code == 503
+        assert fake.stats()['requests']['injected error'] == 1
+    finally:
+        fake.stop()
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+import pytest
+
+from fork_server import ForkServer, ForkServerError
+
+
+@pytest.fixture
+def fork_server():
+    server = ForkServer(modules=('json',))
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def hanging_preload(tmp_path, monkeypatch):
+    """A module whose import never ends, found by the fork server through PYTHONPATH"""
+    (tmp_path / 'hanging_import.py').write_text('import time\ntime.sleep(60)\n')
+    monkeypatch.setenv('PYTHONPATH', str(tmp_path))
+    return ('hanging_import',)
+
+
+def test_spawned_program_gets_its_output_pipe_and_fds(fork_server, tmp_path):
+    script = tmp_path / 'program.py'
+    script.write_text('import os, sys\nprint("hello", flush=True)\nos.write(int(os.environ["FD"]), b"status")\nsys.exit(3)\n')
+    read_fd, write_fd = os.pipe()
+    try:
+        process = fork_server.spawn(str(script), str(tmp_path), {'FD': str(write_fd)}, pass_fds=(write_fd,))
+    finally:
+        os.close(write_fd)
+    assert process.stdout.read() == b'hello\n'
+    assert os.read(read_fd, 100) == b'status'
+    assert process.wait(timeout=10) == 3 and process.poll() == 3
+
+
+def test_poll_doesnt_wait_behind_wait(fork_server, tmp_path):
+    script = tmp_path / 'program.py'
+    script.write_text('import time\ntime.sleep(60)\n')
+    process = fork_server.spawn(str(script), str(tmp_path), {})
+    returncodes = []
+    waiter = threading.Thread(target=lambda: returncodes.append(process.wait(timeout=10)))
+    waiter.start()
+    time.sleep(0.1)
+    started = time.monotonic()
+    for _ in range(20):
+        assert process.poll() is None
+    assert time.monotonic() - started < 0.2
+
+    process.kill()
+    waiter.join()
+    assert returncodes == [-9] and process.poll() == -9
+
+
+def test_hung_preload_gives_up_and_stays_off(hanging_preload):
+    server = ForkServer(modules=hanging_preload, startup_timeout=0.5)
+    started = time.monotonic()
+    with pytest.raises(ForkServerError):
+        server.spawn('run.py', '.', {})
+    assert time.monotonic() - started < 5
+    assert server.process.poll() is not None
+
+    started = time.monotonic()
+    with pytest.raises(ForkServerError):
+        server.spawn('run.py', '.', {})
+    assert time.monotonic() - started < 0.1
+
+
+def test_manager_starts_programs_without_a_hung_fork_server(manager, hanging_preload, tmp_path):
+    manager.fork_server = ForkServer(modules=hanging_preload, startup_timeout=0.5)
+    manager.start_program(1).result(timeout=10)
+    assert manager.programs[1]['status'] == 'запущен'
+    process = manager.programs[1]['process']
+    assert process.stdout is not None and process.poll() is None
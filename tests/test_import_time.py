@@ -0,0 +1,82 @@
+"""
+Cold-start cost of `import TwitchChannelPointsMiner`, measured with -X importtime in fresh interpreters.
+Absolute times depend on the machine, the budgets are relative to the miner's eager dependencies.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+MINER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'programs', 'program1')
+PACKAGE = 'TwitchChannelPointsMiner'
+# Needed by every run, imported by the package itself
+EAGER_DEPENDENCIES = ('requests', 'websocket', 'colorama')
+# Imported at first use only: the chat, the formatters, the watcher and the predictions
+LAZY_MODULES = (
+    'irc.bot',
+    'emoji',
+    'pytz',
+    'validators',
+    'dateutil.parser',
+    'millify',
+    f"{PACKAGE}.classes.ClientIRC",
+    f"{PACKAGE}.classes.Discord",
+    f"{PACKAGE}.classes.Gotify",
+    f"{PACKAGE}.classes.Matrix",
+    f"{PACKAGE}.classes.Pushover",
+    f"{PACKAGE}.classes.Telegram",
+    f"{PACKAGE}.classes.Webhook",
+)
+# Modules loaded on top of the eager dependencies: 41 when this was set, 147 with everything imported eagerly
+MAX_OWN_MODULES = 60
+# Import time over the eager dependencies' one, best of RUNS: 1.2-1.3 when this was set, 2.2-2.6 before
+MAX_TIME_RATIO = 1.75
+RUNS = 8
+
+
+def importtime(statement, startup=()):
+    """({module: cumulative us}, total us of the top-level imports but `startup`) of `statement` in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=MINER_DIR, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    modules = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = int(cumulative)
+        if not name.startswith('  ') and name.strip() not in startup:
+            total += int(cumulative)
+    return modules, total
+
+
+@pytest.fixture(scope='module')
+def startup():
+    """Modules of the interpreter start-up, imported before the statement runs"""
+    return set(importtime('pass')[0])
+
+
+def test_lazy_modules_stay_lazy(startup):
+    modules, _ = importtime(f"import {PACKAGE}")
+    assert [module for module in LAZY_MODULES if module in modules] == []
+
+
+def test_module_count(startup):
+    dependencies = set(importtime(f"import {', '.join(EAGER_DEPENDENCIES)}")[0]) | startup
+    own = set(importtime(f"import {PACKAGE}")[0]) - dependencies
+    assert len(own) <= MAX_OWN_MODULES, sorted(own)
+
+
+def test_import_time_relative_to_dependencies(startup):
+    # Interleaved, and the best run of each: the noise of a busy machine only adds time
+    miner, dependencies = [], []
+    for _ in range(RUNS):
+        miner.append(importtime(f"import {PACKAGE}", startup)[1])
+        dependencies.append(importtime(f"import {', '.join(EAGER_DEPENDENCIES)}", startup)[1])
+    ratio = min(miner) / min(dependencies)
+    assert ratio <= MAX_TIME_RATIO, f"{min(miner) / 1000:.1f} ms, {ratio:.2f}x the eager dependencies"
@@ -0,0 +1,85 @@
+import threading
+import time
+
+from log_buffer import LogBuffer
+
+
+def seqs(entries):
+    return [entry.seq for entry in entries]
+
+
+def test_sequence_numbers_start_at_one():
+    logs = LogBuffer(capacity=4)
+    assert logs.last_seq == 0 and logs.after(0) == []
+    assert logs.append('a') == 1
+    assert logs.extend(['b', 'c']) == 3
+    assert [entry.line for entry in logs.after(1)] == ['b', 'c']
+
+
+def test_ring_drops_the_oldest_entries():
+    logs = LogBuffer(capacity=3)
+    logs.extend(['a', 'b', 'c', 'd', 'e'])
+    assert len(logs) == 3
+    assert seqs(logs.after(0)) == [3, 4, 5]
+    assert logs.lines() == ['c', 'd', 'e']
+    assert seqs(logs.tail(2)) == [4, 5]
+
+
+def test_after_respects_the_limit():
+    logs = LogBuffer(capacity=10)
+    logs.extend(list('abcdef'))
+    assert seqs(logs.after(1, limit=2)) == [2, 3]
+    assert logs.after(6) == []
+
+
+def test_clear_keeps_the_sequence_growing():
+    logs = LogBuffer(capacity=10)
+    logs.extend(['a', 'b'])
+    logs.clear()
+    assert logs.after(0) == [] and len(logs) == 0
+    assert logs.append('c') == 3
+    assert seqs(logs.after(0)) == [3]
+
+
+def test_subscriber_sleeps_until_an_append():
+    logs = LogBuffer(capacity=10)
+    subscription = logs.subscribe()
+    threading.Timer(0.1, logs.append, ['a']).start()
+    started = time.time()
+    entries, missed = subscription.poll(timeout=5)
+    assert [entry.line for entry in entries] == ['a'] and missed == 0
+    assert time.time() - started < 1
+    assert subscription.poll(timeout=0.05) == ([], 0)
+
+
+def test_new_subscriber_starts_with_the_backlog():
+    logs = LogBuffer(capacity=10)
+    logs.extend(list('abcde'))
+    entries, _ = logs.subscribe(backlog=2).poll(timeout=0)
+    assert [entry.line for entry in entries] == ['d', 'e']
+    entries, _ = logs.subscribe(after_seq=4).poll(timeout=0)
+    assert seqs(entries) == [5]
+
+
+def test_slow_subscriber_skips_ahead():
+    logs = LogBuffer(capacity=100)
+    subscription = logs.subscribe(after_seq=0, max_backlog=3)
+    logs.extend([str(i) for i in range(10)])
+    entries, missed = subscription.poll(timeout=0)
+    assert seqs(entries) == [8, 9, 10] and missed == 7
+
+
+def test_lines_that_fell_out_of_the_ring_count_as_missed():
+    logs = LogBuffer(capacity=3)
+    subscription = logs.subscribe(after_seq=0)
+    logs.extend(list('abcde'))
+    entries, missed = subscription.poll(timeout=0)
+    assert seqs(entries) == [3, 4, 5] and missed == 2
+
+
+def test_cursor_ahead_of_the_buffer_starts_over():
+    # Sequences start over when the supervisor restarts, the browser still holds the old id
+    logs = LogBuffer(capacity=10)
+    logs.extend(list('abc'))
+    entries, _ = logs.subscribe(after_seq=500, backlog=2).poll(timeout=0)
+    assert [entry.line for entry in entries] == ['b', 'c']
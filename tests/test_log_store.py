@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+import log_store
+from log_store import LogStore
+
+
+def miner_line(level, function, message, event=None):
+    event = f"[{event}] " if event else ''
+    return f"[2026-10-19 03:50:05] 19/10/26 03:50:05 - {level} - [{function}]: {event}{message}"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(log_store, 'SEGMENT_LINES', 10)
+    store = LogStore(str(tmp_path))
+    yield store
+    store.close()
+
+
+def test_search_pages_through_every_segment_newest_first(store):
+    for i in range(35):
+        store.append(1, 1000 + i, [f"line {i}"])
+    store.flush()
+
+    seen = []
+    before = None
+    while True:
+        page = store.search(1, text='line', before=before, limit=8)
+        seen += [result['line'] for result in page['results']]
+        if page['next'] is None:
+            break
+        before = page['next']
+    assert seen == [f"line {i}" for i in reversed(range(35))]
+
+
+def test_segments_that_cant_match_are_not_read(store):
+    store.append(1, 1000, [miner_line('INFO', 'on_message', f"message {i}") for i in range(20)])
+    store.append(1, 1001, [miner_line('ERROR', 'claim_bonus', 'Streamer(username=somebody) failed')])
+    store.flush()
+
+    page = store.search(1, level='error')
+    assert [result['seq'] for result in page['results']] == [21]
+    assert page['segments_scanned'] == 1
+    assert store.search(1, streamer='SOMEBODY')['results'][0]['seq'] == 21
+    assert store.search(1, text='nothing like this')['segments_scanned'] == 0
+
+
+def test_fields_of_miner_lines_are_indexed(store):
+    store.append(1, 1000, [
+        miner_line('INFO', 'on_message', '+10 points', event='GAIN_FOR_WATCH'),
+        '\x1b[32mcolored\x1b[0m plain output',
+    ])
+    store.flush()
+    assert store.facets(1) == {
+        'levels': ['INFO'], 'loggers': ['on_message'], 'events': ['GAIN_FOR_WATCH'], 'streamers': []
+    }
+    assert store.search(1, event='gain_for_watch')['results'][0]['seq'] == 1
+    assert store.search(1, text='colored plain')['results'][0]['line'] == 'colored plain output'
+
+
+def test_history_survives_a_restart(store, tmp_path):
+    store.append(1, 1000, [f"line {i}" for i in range(15)])
+    store.close()
+
+    reopened = LogStore(str(tmp_path))
+    reopened.append(1, 2000, ['after the restart'])
+    reopened.flush()
+    results = reopened.search(1, limit=2)['results']
+    assert [(result['seq'], result['line']) for result in results] == [(16, 'after the restart'), (15, 'line 14')]
+    reopened.close()
+
+
+def test_programs_are_kept_apart(store):
+    store.append(1, 1000, ['first program'])
+    store.append(2, 1000, ['second program'])
+    store.flush()
+    assert [result['line'] for result in store.search(2)['results']] == ['second program']
+
+
+def test_append_doesnt_wait_for_the_disk(store, monkeypatch):
+    written = []
+    release = threading.Event()
+
+    def slow_append(self, timestamp, lines):
+        release.wait(5)
+        written.extend(lines)
+
+    monkeypatch.setattr(log_store.ProgramLog, 'append', slow_append)
+    for i in range(3):
+        store.append(1, 1000, [f"line {i}"])
+    assert written == []
+    release.set()
+    store.flush()
+    assert written == ['line 0', 'line 1', 'line 2']
@@ -0,0 +1,41 @@
+import importlib
+import signal
+
+import pytest
+
+from TwitchChannelPointsMiner.classes import ConnectivityMonitor as connectivity_module
+from TwitchChannelPointsMiner.classes.Settings import Settings
+from TwitchChannelPointsMiner.logger import LoggerSettings
+
+# The package exports the runner class under the name of its module
+runner_module = importlib.import_module('TwitchChannelPointsMiner.MultiAccountRunner')
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    """Runner in tmp_path that never reaches the network, its signal handlers undone afterwards"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(runner_module, 'check_latest_version', lambda: None)
+    monkeypatch.setattr(connectivity_module, 'internet_connection_available', lambda host, port: True)
+    for name in ('logger', 'streamer_settings', 'enable_analytics'):
+        if hasattr(Settings, name):
+            monkeypatch.setattr(Settings, name, getattr(Settings, name))
+    handlers = {sign: signal.getsignal(sign) for sign in (signal.SIGINT, signal.SIGSEGV, signal.SIGTERM)}
+    runner = runner_module.MultiAccountRunner(logger_settings=LoggerSettings(save=False, less=True))
+    yield runner
+    runner.shared.queue_listener.stop()
+    runner.shared.connectivity.close()
+    for sign, handler in handlers.items():
+        signal.signal(sign, handler)
+
+
+def test_accounts_share_the_process_resources(runner):
+    first = runner.add_account('first', streamers=['a'])
+    second = runner.add_account('second', followers=True)
+
+    assert first.twitch.shared is second.twitch.shared is runner.shared
+    assert runner.shared.pubsub_hub is not None
+    # Each account keeps its own login and its own stop
+    assert first.twitch.twitch_login is not second.twitch.twitch_login
+    assert first.stop_event is not second.stop_event
+    assert [options['followers'] for _, options in runner.accounts] == [False, True]
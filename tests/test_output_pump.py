@@ -0,0 +1,72 @@
+import os
+import threading
+
+from output_pump import OutputPump
+
+
+class Collector:
+    def __init__(self):
+        self.lines = []
+        self.eofs = []
+        self.done = threading.Event()
+
+    def on_lines(self, owner, lines):
+        self.lines.extend((owner, line) for line in lines)
+
+    def on_eof(self, owner):
+        self.eofs.append(owner)
+        self.done.set()
+
+
+def pipe():
+    read_fd, write_fd = os.pipe()
+    return os.fdopen(read_fd, 'rb', buffering=0), write_fd
+
+
+def test_lines_are_split_and_the_last_one_flushed_at_eof():
+    collector = Collector()
+    pump = OutputPump(collector.on_lines, collector.on_eof)
+    stream, write_fd = pipe()
+    pump.add('a', stream)
+    os.write(write_fd, 'one\ntw'.encode())
+    os.write(write_fd, 'o\nпоследняя'.encode())
+    os.close(write_fd)
+    assert collector.done.wait(5)
+    assert collector.lines == [('a', 'one'), ('a', 'two'), ('a', 'последняя')]
+    assert collector.eofs == ['a']
+
+
+def test_failing_callbacks_dont_stop_the_pump():
+    collector = Collector()
+    calls = []
+
+    def failing_lines(owner, lines):
+        calls.append(lines)
+        raise RuntimeError('broken handler')
+
+    def failing_eof(owner):
+        calls.append('eof')
+        raise RuntimeError('broken handler')
+
+    pump = OutputPump(collector.on_lines, collector.on_eof)
+    broken, broken_fd = pipe()
+    pump.add('broken', broken, on_lines=failing_lines, on_eof=failing_eof)
+    os.write(broken_fd, b'first\n')
+    os.write(broken_fd, b'second\n')
+
+    # The failing handler neither closes its pipe nor kills the thread reading the others
+    stream, write_fd = pipe()
+    pump.add('ok', stream)
+    os.write(write_fd, b'still read\n')
+    os.close(write_fd)
+    assert collector.done.wait(5)
+    assert collector.lines == [('ok', 'still read')]
+
+    os.close(broken_fd)
+    for _ in range(50):
+        if 'eof' in calls:
+            break
+        threading.Event().wait(0.1)
+    assert [line for batch in calls[:-1] for line in batch] == ['first', 'second']
+    assert calls[-1] == 'eof' and calls.count('eof') == 1
+    assert pump.thread.is_alive()
@@ -0,0 +1,54 @@
+import time
+
+from conftest import write_program
+
+# Ignores SIGTERM: the stop has to wait for the kill
+STUBBORN = ('import signal, time\nsignal.signal(signal.SIGTERM, signal.SIG_IGN)\n'
+            'print("started", flush=True)\ntime.sleep(60)\n')
+
+
+def wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline
+        time.sleep(0.02)
+
+
+def test_start_and_stop_run_in_the_background(manager):
+    operation = manager.start_program(1)
+    assert manager.get_programs_status()[1]['status'] in ('запускается', 'запущен')
+    assert operation.result(timeout=10) is True
+    status = manager.get_programs_status()[1]
+    assert status['status'] == 'запущен' and status['pid']
+
+    # A second start of a running program is refused, not queued
+    assert manager.start_program(1) is None
+
+    assert manager.stop_program(1).result(timeout=10) is True
+    status = manager.get_programs_status()[1]
+    assert status['status'] == 'остановлен' and status['pid'] is None
+
+
+def test_slow_stop_does_not_block_other_programs(manager, tmp_path):
+    program_id, _ = manager.add_program({'name': 'stubborn', 'path': write_program(tmp_path, 'stubborn', STUBBORN)})
+    assert manager.start_program(program_id).result(timeout=10)
+    wait_for(lambda: any('started' in line for line in manager.get_program_logs(program_id)))
+
+    stopping = manager.stop_program(program_id)
+    # The stubborn program waits for its kill, the other one starts and answers meanwhile
+    started = time.time()
+    assert manager.start_program(1).result(timeout=10) is True
+    assert manager.get_programs_status()[program_id]['status'] == 'останавливается'
+    assert time.time() - started < 4
+    assert manager.stop_program(program_id) is None  # Already stopping
+
+    assert stopping.result(timeout=15) is True
+    assert manager.get_programs_status()[program_id]['status'] == 'остановлен'
+
+
+def test_running_program_cant_be_removed(manager):
+    manager.start_program(1).result(timeout=10)
+    assert manager.remove_program(1) is False
+    manager.stop_program(1).result(timeout=10)
+    assert manager.remove_program(1) is True
+    assert 1 not in manager.get_programs_status()
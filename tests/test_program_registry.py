@@ -0,0 +1,86 @@
+import json
+import os
+
+import pytest
+
+from conftest import write_program
+from program_registry import ProgramRegistry, RegistryError
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def saved(root):
+    return json.loads((root / 'programs.json').read_text())
+
+
+def test_first_run_seeds_the_config_from_the_example(root):
+    (root / 'programs.example.json').write_text(json.dumps({
+        'next_id': 3,
+        'programs': [{'id': 2, 'name': 'timoshka', 'path': 'programs/program1', 'script': 'run.py'}],
+    }))
+    write_program(root, 'program1')
+    assert {program_id: config['name'] for program_id, config in ProgramRegistry().load().items()} == {2: 'timoshka'}
+    assert saved(root)['next_id'] == 3
+
+
+def test_scanned_programs_keep_their_ids(root):
+    write_program(root, 'b')
+    assert [config['name'] for config in ProgramRegistry().load().values()] == ['b']
+    assert [config['name'] for config in saved(root)['programs']] == ['b']
+
+    # A directory that sorts first no longer renumbers the others
+    write_program(root, 'a')
+    assert ProgramRegistry().load() == {1: {'id': 1, 'name': 'b', 'path': os.path.join('programs', 'b'), 'script': 'run.py'}}
+
+
+def test_ids_are_never_reused(root):
+    write_program(root, 'a')
+    registry = ProgramRegistry()
+    registry.load()
+    write_program(root, 'b')
+    assert registry.add({'name': 'second', 'path': 'programs/b'})['id'] == 2
+    assert registry.remove(2) and not registry.remove(2)
+
+    registry = ProgramRegistry()
+    assert list(registry.load()) == [1]
+    assert registry.add({'name': 'again', 'path': 'programs/b'})['id'] == 3
+
+
+def test_duplicates_are_rejected(root):
+    write_program(root, 'a')
+    registry = ProgramRegistry()
+    registry.load()
+    with pytest.raises(RegistryError):
+        registry.add({'name': 'same', 'path': str(root / 'programs' / 'a')})
+
+
+@pytest.mark.parametrize('config', [
+    {'name': 'outside', 'path': '/tmp'},
+    {'name': 'parent', 'path': 'programs/..'},
+    {'name': 'script', 'path': 'programs/a', 'script': '../../run.py'},
+    {'name': 'missing', 'path': 'programs/missing'},
+    {'path': 'programs/a'},
+    {'name': 'restart', 'path': 'programs/a', 'restart': 'always'},
+])
+def test_invalid_programs_are_rejected(root, config):
+    write_program(root, 'a')
+    registry = ProgramRegistry()
+    registry.load()
+    registry.remove(1)
+    with pytest.raises(RegistryError):
+        registry.add(config)
+
+
+def test_symlink_out_of_programs_is_rejected(root, tmp_path_factory):
+    outside = tmp_path_factory.mktemp('outside')
+    (outside / 'run.py').write_text('')
+    (root / 'programs').mkdir()
+    os.symlink(outside, root / 'programs' / 'link')
+    registry = ProgramRegistry()
+    assert registry.load() == {}
+    with pytest.raises(RegistryError):
+        registry.add({'name': 'link', 'path': 'programs/link'})
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from TwitchChannelPointsMiner.classes.ConnectivityMonitor import ConnectivityMonitor
+from TwitchChannelPointsMiner.classes.entities.PubsubTopic import PubsubTopic
+from TwitchChannelPointsMiner.classes.PubSubHub import PubSubHub
+from TwitchChannelPointsMiner.classes.WebSocketsPool import WebSocketsPool
+
+
+class RecordingHub(PubSubHub):
+    """Hub that records the topics it would listen to instead of connecting"""
+    __slots__ = ["listened"]
+
+    def __init__(self):
+        super().__init__(ConnectivityMonitor())
+        self.listened = []
+
+    def submit(self, topic):
+        self.listened.append(str(topic))
+
+
+class RecordingPool:
+    def __init__(self):
+        self.messages = []
+
+    def dispatch(self, message):
+        self.messages.append(message)
+
+
+def test_channel_topic_is_listened_to_once_for_every_account():
+    hub = RecordingHub()
+    streamer = SimpleNamespace(channel_id='123')
+    first, second = RecordingPool(), RecordingPool()
+    hub.subscribe(first, PubsubTopic('raid', streamer=streamer))
+    hub.subscribe(second, PubsubTopic('raid', streamer=streamer))
+    hub.subscribe(second, PubsubTopic('raid', streamer=streamer))
+    assert hub.listened == ['raid.123']
+
+    message = SimpleNamespace(topic='raid', topic_user='123')
+    hub.dispatch(message)
+    assert first.messages == [message] and second.messages == [message]
+
+    hub.unsubscribe(first)
+    hub.dispatch(message)
+    assert len(first.messages) == 1 and len(second.messages) == 2
+    hub.dispatch(SimpleNamespace(topic='raid', topic_user='456'))  # Nobody listens
+    assert len(second.messages) == 2
+
+
+def test_pool_hands_channel_topics_to_the_hub():
+    hub = RecordingHub()
+    pool = WebSocketsPool(twitch=None, streamers=[], events_predictions={}, hub=hub,
+                          connectivity=hub.connectivity)
+    pool.submit(PubsubTopic('video-playback-by-id', streamer=SimpleNamespace(channel_id='7')))
+    assert hub.listened == ['video-playback-by-id.7']
+    assert pool.ws == []  # No connection of its own
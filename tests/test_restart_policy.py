@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from restart_policy import RestartPolicy, RestartTracker
+
+
+def tracker(**options):
+    return RestartTracker(RestartPolicy(**options))
+
+
+def test_backoff_grows_up_to_the_maximum():
+    restarts = tracker(backoff_initial=5, backoff_factor=2, backoff_max=30, max_restarts=10)
+    delays = []
+    for now in range(0, 50, 10):
+        restarts.started(now)
+        delays.append(restarts.exited(1, now=now + 1))
+    assert delays == [5, 10, 20, 30, 30]
+    assert restarts.next_restart == 41 + 30
+    assert not restarts.due(70) and restarts.due(71)
+
+
+def test_stable_run_resets_the_backoff():
+    restarts = tracker(backoff_initial=5, stable_after=100)
+    restarts.started(0)
+    assert restarts.exited(1, now=1) == 5
+    restarts.started(10)
+    assert restarts.exited(1, now=11) == 10
+    restarts.started(20)
+    assert restarts.exited(1, now=200) == 5
+
+
+def test_crash_loop_gives_up_until_a_manual_start():
+    restarts = tracker(max_restarts=2, crash_window=60)
+    for now in (0, 10):
+        restarts.started(now)
+        assert restarts.exited(1, now=now + 1) is not None
+    restarts.started(20)
+    assert restarts.exited(1, now=21) is None
+    assert restarts.gave_up and restarts.next_restart is None
+
+    restarts.manual_start()
+    restarts.started(30)
+    assert not restarts.gave_up and restarts.exited(1, now=31) == 5
+
+
+def test_old_crashes_leave_the_window():
+    restarts = tracker(max_restarts=1, crash_window=60)
+    restarts.started(0)
+    assert restarts.exited(1, now=1) is not None
+    restarts.started(100)
+    assert restarts.exited(1, now=101) is not None
+
+
+@pytest.mark.parametrize('mode, returncode, restarted', [
+    ('never', 1, False),
+    ('on-failure', 0, False),
+    ('on-failure', 1, True),
+    ('always', 0, True),
+])
+def test_modes(mode, returncode, restarted):
+    restarts = tracker(mode=mode)
+    restarts.started(0)
+    assert (restarts.exited(returncode, now=1) is not None) == restarted
+
+
+def test_failed_liveness_check_counts_as_a_failure():
+    restarts = tracker()
+    restarts.started(0)
+    assert restarts.exited(0, reason='нет вывода', now=1) == 5
+    assert restarts.last_failure == 'нет вывода'
+
+
+def test_downtime_is_accumulated():
+    restarts = tracker()
+    restarts.started(0)
+    restarts.exited(1, now=10)
+    restarts.started(25)
+    assert restarts.to_dict(now=30)['downtime'] == 15
+
+
+def test_log_timeout():
+    restarts = tracker(log_timeout=60)
+    restarts.started(0)
+    assert restarts.liveness_failure(None, '.', now=50) is None
+    assert restarts.liveness_failure(None, '.', now=61) is not None
+    assert restarts.liveness_failure(100, '.', now=150) is None
+
+
+def test_heartbeat_is_only_checked_after_the_first_beat(tmp_path):
+    restarts = tracker(heartbeat_file='heartbeat', heartbeat_timeout=60)
+    restarts.started(1000)
+    # A program still logging in hasn't written one yet
+    assert restarts.liveness_failure(None, str(tmp_path), now=5000) is None
+
+    beat = tmp_path / 'heartbeat'
+    beat.write_text('')
+    os.utime(beat, (900, 900))  # Left by the previous run
+    assert restarts.liveness_failure(None, str(tmp_path), now=5000) is None
+
+    os.utime(beat, (1100, 1100))
+    assert restarts.liveness_failure(None, str(tmp_path), now=1150) is None
+    assert restarts.liveness_failure(None, str(tmp_path), now=1200) is not None
+
+
+def test_heartbeat_is_opt_in():
+    assert RestartPolicy().heartbeat_path('.') is None
+    assert RestartPolicy(heartbeat_file='heartbeat').heartbeat_path('.') is None
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        RestartPolicy(mode='sometimes')
@@ -0,0 +1,39 @@
+from threading import Event
+
+from TwitchChannelPointsMiner.classes.Clock import VirtualClock
+from TwitchChannelPointsMiner.classes.Settings import Settings
+from TwitchChannelPointsMiner.Simulation import Simulation, generate_fixtures
+
+
+def test_virtual_clock_runs_due_callbacks_in_order():
+    clock = VirtualClock(start=100)
+    calls = []
+    clock.schedule(130, calls.append, ('late',))
+    clock.call_later(10, calls.append, ('first',))
+    clock.call_later(10, calls.append, ('second',))  # Same time, scheduling order
+    clock.schedule(50, calls.append, ('past',))  # Runs right away
+
+    assert clock.wait(Event(), 20) is False
+    assert calls == ['past', 'first', 'second']
+    assert clock.time() == 120
+
+    event = Event()
+    clock.call_later(5, event.set)
+    assert clock.wait(event, 60) is True
+    # The wait ended at the callback that set the event
+    assert clock.time() == 125 and calls == ['past', 'first', 'second']
+
+
+def test_simulation_is_deterministic():
+    def run():
+        report = Simulation(generate_fixtures(streamers=10, hours=3, seed=1), hours=3).run()
+        del report['wall_time']
+        return report
+
+    clock = Settings.clock
+    first = run()
+    assert first['streamers'] == 10
+    assert first['points_gained'].get('WATCH', 0) > 0
+    assert run() == first
+    # The real clock is back once the simulation ends
+    assert Settings.clock is clock
@@ -0,0 +1,73 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+from output_pump import OutputPump
+from status_channel import MinerState
+from TwitchChannelPointsMiner.classes.StatusPublisher import StatusPublisher
+
+
+def fake_miner(streamers=1):
+    return SimpleNamespace(
+        username='account', running=True, twitch=SimpleNamespace(streamers_watching=[]),
+        streamers=[SimpleNamespace(username=f"streamer{i}", channel_points=100, is_online=True) for i in range(streamers)],
+        ws_pool=None, events_predictions={}, queue_listener=None,
+    )
+
+
+def test_state_is_rebuilt_from_snapshots_and_deltas():
+    state = MinerState()
+    assert state.apply_line('{"type": "delta", "changes": {"running": false}}') is None  # Before any snapshot
+    state.apply_line(json.dumps({'type': 'snapshot', 'seq': 1, 'state': {
+        'streamers': {'a': {'points': 1, 'online': True}, 'b': {'points': 2, 'online': False}},
+    }}))
+    state.apply_line(json.dumps({'type': 'delta', 'seq': 2, 'changes': {
+        'streamers': {'a': {'points': 5}}, 'removed_streamers': ['b'], 'running': False,
+    }}))
+    assert state.to_dict() == {'seq': 2, 'updated': None, 'state': {
+        'streamers': {'a': {'points': 5, 'online': True}}, 'running': False,
+    }}
+    assert state.summary()['points'] == 5
+    assert state.apply_line('{"type": "snaps') is None
+
+
+def test_unterminated_last_record_is_dropped():
+    records, done = [], threading.Event()
+    pump = OutputPump(lambda owner, lines: records.extend(lines), lambda owner: done.set())
+    read_fd, write_fd = os.pipe()
+    pump.add('miner', os.fdopen(read_fd, 'rb', buffering=0), flush_partial=False)
+    os.write(write_fd, b'{"type": "snapshot"}\n{"type": "del')
+    os.close(write_fd)
+    assert done.wait(5)
+    assert records == ['{"type": "snapshot"}']
+
+
+def test_stop_finishes_a_partly_written_record():
+    read_fd, write_fd = os.pipe()
+    fcntl.fcntl(write_fd, fcntl.F_SETPIPE_SZ, 16384)
+    os.set_blocking(write_fd, False)
+    # Only the beginning of the final message fits in the pipe: one free page. A write of at
+    # most PIPE_BUF bytes is all or nothing, the message has to be larger to be cut
+    filler = b'x' * (fcntl.fcntl(write_fd, fcntl.F_GETPIPE_SZ) - 4097) + b'\n'
+    os.write(write_fd, filler)
+
+    publisher = StatusPublisher(fake_miner(streamers=200), write_fd, interval=2)
+    received = []
+
+    def read_later():
+        time.sleep(0.3)
+        with os.fdopen(read_fd, 'rb') as pipe:
+            received.extend(pipe.read().split(b'\n'))
+
+    reader = threading.Thread(target=read_later)
+    reader.start()
+    started = time.time()
+    publisher.stop()
+    reader.join(5)
+    assert time.time() - started < 2
+    assert received[0] == filler[:-1] and received[-1] == b''
+    message = json.loads(received[1])
+    assert message['final'] is True and len(message['state']['streamers']) == 200
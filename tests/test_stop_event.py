@@ -0,0 +1,28 @@
+import threading
+import time
+
+from TwitchChannelPointsMiner.classes.StopEvent import StopEvent
+
+
+def test_sleep_ends_as_soon_as_the_miner_stops():
+    stop_event = StopEvent()
+    assert stop_event.sleep(0.01) is False
+
+    threading.Timer(0.1, stop_event.set).start()
+    started = time.time()
+    assert stop_event.sleep(30) is True
+    assert time.time() - started < 5
+    assert stop_event.sleep(30) is True  # Already set, no wait at all
+
+
+def test_callbacks_run_on_set_until_removed():
+    stop_event = StopEvent()
+    calls = []
+    kept, removed = (lambda: calls.append('kept')), (lambda: calls.append('removed'))
+    stop_event.add_callback(kept)
+    stop_event.add_callback(removed)
+    stop_event.remove_callback(removed)
+    stop_event.remove_callback(removed)  # Removing twice is harmless
+
+    stop_event.set()
+    assert calls == ['kept']
@@ -0,0 +1,93 @@
+import json
+import socket
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from program_registry import RegistryError
+from supervisor_daemon import RemoteProgramManager, SupervisorError, SupervisorServer
+
+
+class FakeManager:
+    def __init__(self):
+        self.started = []
+
+    def get_programs_status(self):
+        return {1: {'status': 'остановлен'}}
+
+    def start_program(self, program_id):
+        self.started.append(program_id)
+        return Future() if program_id == 1 else None
+
+    def remove_program(self, program_id):
+        raise RegistryError(f"Программа {program_id} не найдена")
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'supervisor.sock')
+
+
+@pytest.fixture
+def daemon(socket_path):
+    manager = FakeManager()
+    server = SupervisorServer(manager, socket_path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield manager
+    server.shutdown()
+    server.server_close()
+
+
+def serve(socket_path, answers):
+    """Raw daemon: one connection per item of `answers`, a line to answer or None to hang up unanswered"""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    requests = []
+    hung_up = threading.Semaphore(0)
+
+    def run():
+        for answer in answers:
+            connection, _ = listener.accept()
+            with connection, connection.makefile('rb') as reader:
+                requests.append(json.loads(reader.readline())['method'])
+                if answer is not None:
+                    connection.sendall((json.dumps({'result': answer}) + '\n').encode())
+            hung_up.release()
+        listener.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return requests, hung_up
+
+
+def test_calls_reach_the_manager(daemon, socket_path):
+    remote = RemoteProgramManager(socket_path)
+    assert remote.get_programs_status() == {1: {'status': 'остановлен'}}
+    assert remote.start_program(1) is True and remote.start_program(2) is False
+    assert daemon.started == [1, 2]
+    with pytest.raises(RegistryError):
+        remote.remove_program(3)
+
+
+def test_lost_answer_of_a_start_is_not_sent_again(socket_path):
+    requests, _ = serve(socket_path, [None, True])
+    with pytest.raises(SupervisorError):
+        RemoteProgramManager(socket_path).start_program(1)
+    assert requests == ['start_program']
+
+
+def test_lost_answer_of_a_read_is_sent_again(socket_path):
+    requests, _ = serve(socket_path, [None, {'1': {}}])
+    assert RemoteProgramManager(socket_path).get_programs_status() == {1: {}}
+    assert requests == ['get_programs_status'] * 2
+
+
+def test_start_after_a_daemon_restart_reconnects(socket_path):
+    # Every connection is closed after one answer, like a daemon that went away in between
+    requests, hung_up = serve(socket_path, [{'1': {}}, True])
+    remote = RemoteProgramManager(socket_path)
+    remote.get_programs_status()
+    assert hung_up.acquire(timeout=5)
+    assert remote.start_program(1) is True
+    assert requests == ['get_programs_status', 'start_program']
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+from telemetry import FIELDS, MetricSeries, ResourceSampler
+
+
+def test_series_keeps_the_newest_samples():
+    series = MetricSeries(capacity=3)
+    assert series.latest() is None
+    for timestamp in range(1, 6):
+        series.append(timestamp, {'rss': timestamp * 10})
+
+    assert len(series) == 3
+    samples = series.since()
+    assert samples['timestamps'] == [3, 4, 5]
+    assert samples['rss'] == [30, 40, 50]
+    assert samples['threads'] == [0, 0, 0]
+    assert series.since(4)['timestamps'] == [5]
+    assert series.latest()['rss'] == 50 and series.latest()['timestamp'] == 5
+
+
+def test_sample_sums_the_process_tree():
+    parent = subprocess.Popen([sys.executable, '-c',
+                               'import subprocess, sys, time\n'
+                               'child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])\n'
+                               'print(child.pid, flush=True)\ntime.sleep(60)\n'],
+                              stdout=subprocess.PIPE)
+    try:
+        child_pid = int(parent.stdout.readline())
+        rounds = []
+        sampler = ResourceSampler(lambda: {1: parent.pid, 2: 999999999}, interval=3600,
+                                  on_sample=lambda timestamp, samples: rounds.append(samples))
+        sampler.stop()
+        sampler.sample()
+
+        # Both interpreters are counted, the missing pid is skipped
+        assert list(rounds[0]) == [1]
+        latest = sampler.latest(1)
+        assert latest['threads'] >= 2
+        assert latest['rss'] > 0
+        assert set(sampler._processes) == {parent.pid, child_pid}
+        assert sampler.metrics(2) == {'timestamps': [], **{field: [] for field in FIELDS}}
+
+        os.kill(child_pid, 9)
+        parent.kill()
+        parent.wait()
+        sampler.sample()
+        # Gone processes are forgotten and no round is reported
+        assert sampler._processes == {}
+        assert len(rounds) == 1
+    finally:
+        parent.kill()
+        parent.wait()
@@ -0,0 +1,55 @@
+import importlib
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from TwitchChannelPointsMiner import utils
+
+# The package exports the miner class under the name of its module
+miner_module = importlib.import_module('TwitchChannelPointsMiner.TwitchChannelPointsMiner')
+
+
+def test_github_version_is_cached(tmp_path, monkeypatch):
+    requests_made = []
+
+    def get(url, timeout):
+        requests_made.append(url)
+        return SimpleNamespace(text='__version__ = "9.9.9"\n')
+
+    monkeypatch.setattr(utils.requests, 'get', get)
+    cache_file = str(tmp_path / 'latest_version.json')
+    assert utils.get_github_version(cache_file=cache_file) == '9.9.9'
+    assert utils.get_github_version(cache_file=cache_file) == '9.9.9'
+    assert len(requests_made) == 1
+
+    # An old answer is asked for again
+    with open(cache_file, 'w') as f:
+        json.dump({'checked': time.time() - utils.VERSION_CACHE_TTL - 1, 'version': '1.0.0'}, f)
+    assert utils.get_github_version(cache_file=cache_file) == '9.9.9'
+    assert len(requests_made) == 2
+
+
+def test_failed_check_is_not_cached(tmp_path, monkeypatch):
+    def get(url, timeout):
+        raise OSError('offline')
+
+    monkeypatch.setattr(utils.requests, 'get', get)
+    cache_file = tmp_path / 'latest_version.json'
+    assert utils.get_github_version(cache_file=str(cache_file)) == '0.0.0'
+    assert not cache_file.exists()
+
+
+def test_version_check_does_not_block_the_start(tmp_path, monkeypatch):
+    answer = threading.Event()
+
+    def get_github_version(cache_file):
+        answer.wait(10)
+        return '0.0.0'
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(miner_module, 'get_github_version', get_github_version)
+    started = time.time()
+    miner_module.check_latest_version()
+    assert time.time() - started < 1
+    answer.set()